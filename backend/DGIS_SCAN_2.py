@@ -76,6 +76,9 @@ except ImportError:
     def sanitize_search(text):
         return True, text, ""
 
+# Cache de miembros: columnas normalizadas e índices (local module)
+from member_cache import add_normalized_columns, add_unique_name_columns
+
 
 # ============================================================================
 # CONFIGURACIÓN
@@ -359,6 +362,172 @@ class ServerDiscovery:
             self.logger.error(f"Error exportando: {e}")
 
 
+# ============================================================================
+# DESCARGA DE MIEMBROS POR JERARQUÍA
+# ============================================================================
+
+class HierarchyFetchError(Exception):
+    """Una o más jerarquías no se pudieron descargar
+    
+    `failed` son los HIERARCHY_UNIQUE_NAME que fallaron y `partial` los
+    miembros de las que sí se descargaron (nunca deben tomarse como completos).
+    """
+    
+    def __init__(self, failed: List[str], partial: pd.DataFrame):
+        super().__init__(f"{len(failed)} jerarquías no se pudieron descargar: {', '.join(failed[:5])}")
+        self.failed = failed
+        self.partial = partial
+
+
+class MemberFetcher:
+    """Descarga miembros con consultas DMV restringidas por jerarquía
+    
+    En lugar de un solo `SELECT * FROM $system.MDSCHEMA_MEMBERS` (todas las
+    columnas de todas las jerarquías), enumera las jerarquías y pide solo las
+    columnas necesarias de cada una, repartiendo las jerarquías entre
+    `config.max_workers` conexiones en paralelo.
+    """
+    
+    # Columnas proyectadas (se piden solo las que el servidor expone)
+    MEMBER_COLUMNS = [
+        'CUBE_NAME',
+        'DIMENSION_UNIQUE_NAME',
+        'HIERARCHY_UNIQUE_NAME',
+        'LEVEL_NAME',
+        'LEVEL_NUMBER',
+        'MEMBER_CAPTION',
+        'MEMBER_UNIQUE_NAME',
+        'MEMBER_ORDINAL',
+        'MEMBER_KEY',
+        'PARENT_UNIQUE_NAME',
+        'CHILDREN_CARDINALITY'
+    ]
+    
+    def __init__(self, config: Config):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.inspector = SchemaInspector()
+    
+    @staticmethod
+    def _quote(value) -> str:
+        return str(value).replace("'", "''")
+    
+    def list_hierarchies(self, cursor) -> List[Dict]:
+        """Jerarquías del catálogo con el cubo por el que se consultan
+        
+        Se ignoran los cubos de dimensión ('$...') y cada jerarquía se
+        consulta una sola vez aunque aparezca en varios cubos/perspectivas.
+        """
+        try:
+            cursor.execute(
+                "SELECT [CUBE_NAME], [DIMENSION_UNIQUE_NAME], [HIERARCHY_UNIQUE_NAME] "
+                "FROM $system.MDSCHEMA_HIERARCHIES"
+            )
+        except Exception:
+            # Servidores viejos sin proyección en DMV
+            cursor.execute("SELECT * FROM $system.MDSCHEMA_HIERARCHIES")
+        df = rows_to_df(cursor, cursor.fetchall())
+        if df.empty:
+            return []
+        
+        df = df[~df['CUBE_NAME'].astype(str).str.startswith('$')]
+        df = df.drop_duplicates(subset=['HIERARCHY_UNIQUE_NAME'])
+        return df.to_dict('records')
+    
+    def _projection(self, cursor) -> str:
+        available = self.inspector.get_available_columns(cursor, "$system.MDSCHEMA_MEMBERS")
+        columns = [c for c in self.MEMBER_COLUMNS if c in available]
+        return ', '.join(f"[{c}]" for c in columns) if columns else '*'
+    
+    def fetch_hierarchy(self, cursor, cube: str, hierarchy: str,
+                        max_rows: Optional[int] = None) -> pd.DataFrame:
+        """Miembros de UNA jerarquía (útil para carga bajo demanda)"""
+        cursor.execute(
+            f"SELECT {self._projection(cursor)} FROM $system.MDSCHEMA_MEMBERS "
+            f"WHERE [CUBE_NAME]='{self._quote(cube)}' "
+            f"AND [HIERARCHY_UNIQUE_NAME]='{self._quote(hierarchy)}'"
+        )
+        
+        rows = []
+        while max_rows is None or len(rows) < max_rows:
+            chunk = cursor.fetchmany(10000)
+            if not chunk:
+                break
+            rows.extend(chunk)
+        if max_rows is not None:
+            rows = rows[:max_rows]
+        return rows_to_df(cursor, rows)
+    
+    def _fetch_group(self, catalog: str, group: List[Dict]) -> Tuple[List[pd.DataFrame], List[str]]:
+        """Descarga un grupo de jerarquías reutilizando una sola conexión
+        
+        Returns:
+            (frames descargados, jerarquías que fallaron)
+        """
+        # Cada hilo del pool necesita su propio apartamento COM
+        try:
+            import pythoncom
+            pythoncom.CoInitialize()
+        except ImportError:
+            pythoncom = None
+        
+        frames, failed = [], []
+        # Jerarquías ya procesadas (con filas, vacías o fallidas)
+        done = 0
+        try:
+            with ConnectionManager(self.config, catalog) as conn:
+                cursor = conn.cursor()
+                for h in group:
+                    try:
+                        df = self.fetch_hierarchy(cursor, h['CUBE_NAME'], h['HIERARCHY_UNIQUE_NAME'])
+                        if not df.empty:
+                            frames.append(df)
+                    except Exception as e:
+                        self.logger.warning(f"Error descargando {h['HIERARCHY_UNIQUE_NAME']}: {e}")
+                        failed.append(h['HIERARCHY_UNIQUE_NAME'])
+                    done += 1
+        except Exception as e:
+            # Sin conexión: solo lo que faltaba del grupo se da por fallido
+            self.logger.warning(f"Error de conexión descargando jerarquías de {catalog}: {e}")
+            failed.extend(h['HIERARCHY_UNIQUE_NAME'] for h in group[done:])
+        finally:
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+        return frames, failed
+    
+    def fetch_hierarchies(self, catalog: str, hierarchies: Optional[List[str]] = None) -> pd.DataFrame:
+        """Miembros de las jerarquías indicadas (todas si es None), en paralelo
+        
+        Raises:
+            HierarchyFetchError: si alguna jerarquía falló (con lo descargado en `partial`)
+        """
+        with ConnectionManager(self.config, catalog) as conn:
+            targets = self.list_hierarchies(conn.cursor())
+        
+        if hierarchies is not None:
+            wanted = set(hierarchies)
+            targets = [h for h in targets if h['HIERARCHY_UNIQUE_NAME'] in wanted]
+        if not targets:
+            return pd.DataFrame()
+        
+        # Reparto round-robin: una conexión por worker
+        workers = max(1, min(self.config.max_workers, len(targets)))
+        groups = [targets[i::workers] for i in range(workers)]
+        
+        frames, failed = [], []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for group_frames, group_failed in executor.map(lambda g: self._fetch_group(catalog, g), groups):
+                frames.extend(group_frames)
+                failed.extend(group_failed)
+        
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if failed:
+            raise HierarchyFetchError(sorted(failed), df)
+        
+        self.logger.info(f"   [OK] {len(targets)} jerarquías descargadas de {catalog}")
+        return df
+
+
 # ============================================================================
 # EXPLORADOR DE CATÁLOGOS
 # ============================================================================
@@ -370,6 +539,7 @@ class CatalogExplorer:
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.inspector = SchemaInspector()
+        self.fetcher = MemberFetcher(config)
     
     def extract_all_metadata(self, catalog: str) -> Dict:
         """Extrae TODOS los metadatos de un catálogo, incluyendo miembros"""
@@ -387,7 +557,6 @@ class CatalogExplorer:
             'hierarchies': ("$system.MDSCHEMA_HIERARCHIES", "Jerarquias"),
             'levels': ("$system.MDSCHEMA_LEVELS", "Niveles (Variables)"),
             'measures': ("$system.MDSCHEMA_MEASURES", "Medidas"),
-            'members': ("$system.MDSCHEMA_MEMBERS", "Miembros (Valores)"), # AQUI ESTA EL DETALLE DE VALORES
             'properties': ("$system.MDSCHEMA_PROPERTIES", "Propiedades"),
         }
         
@@ -425,6 +594,25 @@ class CatalogExplorer:
         except Exception as e:
             self.logger.error(f"Error conectando al catalogo {catalog}: {e}")
             metadata['error'] = str(e)
+            return metadata
+        
+        # Miembros (Valores): AQUI ESTA EL DETALLE DE VALORES
+        # Por jerarquía, proyectado y en paralelo (no un volcado completo)
+        try:
+            self.logger.info(f"   ... Descargando Miembros (Valores)")
+            try:
+                df = self.fetcher.fetch_hierarchies(catalog)
+            except HierarchyFetchError as e:
+                self.logger.warning(f"   [WARN] Miembros incompletos: {e}")
+                metadata['members_failed'] = e.failed
+                df = e.partial
+            if not df.empty:
+                metadata['members'] = df.to_dict('records')
+                self.logger.info(f"   [OK] Miembros (Valores): {len(df)} registros")
+            else:
+                self.logger.info(f"   [INFO] Miembros (Valores): 0 registros")
+        except Exception as e:
+            self.logger.debug(f"Error en Miembros (Valores): {e}")
             
         return metadata
 
@@ -468,6 +656,123 @@ class CatalogExplorer:
             self.logger.error(f"Error exportando catalogo: {e}")
             return None
 
+    # Columnas de MDSCHEMA_MEMBERS que se guardan en cache (y su nombre en el CSV)
+    MEMBER_COLUMNS = {
+        'DIMENSION_UNIQUE_NAME': 'DIMENSION',
+        'HIERARCHY_UNIQUE_NAME': 'JERARQUIA',
+        'LEVEL_NAME': 'NIVEL_NOMBRE',
+        'MEMBER_CAPTION': 'MIEMBRO_CAPTION',
+        'MEMBER_UNIQUE_NAME': 'MIEMBRO_UNIQUE_NAME',
+        'MEMBER_ORDINAL': 'MIEMBRO_ORDINAL',
+        'MEMBER_KEY': 'MIEMBRO_KEY',
+        'ORDINAL': 'ORDINAL',
+        'LEVEL_NUMBER': 'NIVEL_NUMERO',
+        'PARENT_UNIQUE_NAME': 'PARENT_UNIQUE_NAME',
+        'CHILDREN_CARDINALITY': 'CHILDREN_CARDINALITY'
+    }
+
+    def members_csv_path(self, catalog: str) -> Path:
+        # V2: Usar nuevo nombre de archivo
+        return Path(self.config.output_dir).parent / f"{catalog}_miembros_completos_v2.csv"
+
+    def _signatures_path(self, catalog: str) -> Path:
+        return self.members_csv_path(catalog).with_suffix('.signatures.json')
+
+    def prepare_members_df(self, members_df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """Proyecta/renombra un resultado de MDSCHEMA_MEMBERS al formato del cache"""
+        # Filtrar columnas que existen
+        existing_cols = {old: new for old, new in self.MEMBER_COLUMNS.items() if old in members_df.columns}
+        
+        if not existing_cols:
+            return None
+        
+        # Seleccionar solo columnas necesarias
+        members_df = members_df[list(existing_cols.keys())]
+        
+        # Filtrar miembros "All" si la columna existe
+        if 'MEMBER_CAPTION' in members_df.columns:
+            members_df = members_df[members_df['MEMBER_CAPTION'] != 'All']
+        
+        # Renombrar columnas
+        return members_df.rename(columns=existing_cols)
+
+    def _write_members_csv(self, members_df: pd.DataFrame, csv_path: Path):
+        """Escribe el cache completo en un temporal y lo reemplaza atómicamente"""
+        # Parseo único de MIEMBRO_UNIQUE_NAME (nivel, clave, profundidad, padre)
+        add_unique_name_columns(members_df)
+        
+        tmp_path = csv_path.with_name(f"{csv_path.name}.tmp-{os.getpid()}")
+        members_df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, csv_path)
+        
+        # Verificar que el archivo realmente se escribió (fix para VirtualBox shared folders)
+        for _ in range(5):
+            if csv_path.exists() and csv_path.stat().st_size > 0:
+                break
+            time.sleep(0.5)
+
+    def _hierarchy_signatures(self, cursor) -> Dict[str, str]:
+        """Firma por jerarquía: cardinalidad de la jerarquía y de cada uno de sus niveles
+        
+        Solo se consultan MDSCHEMA_HIERARCHIES y MDSCHEMA_LEVELS (baratos), de
+        modo que detectar cambios no requiere bajar ningún miembro.
+        """
+        cursor.execute("SELECT * FROM $system.MDSCHEMA_HIERARCHIES")
+        df_hier = rows_to_df(cursor, cursor.fetchall())
+        if df_hier.empty or 'HIERARCHY_UNIQUE_NAME' not in df_hier.columns:
+            return {}
+        
+        parts: Dict[str, List[str]] = {}
+        for row in df_hier.to_dict('records'):
+            parts[row['HIERARCHY_UNIQUE_NAME']] = [f"H={row.get('HIERARCHY_CARDINALITY', '')}"]
+        
+        try:
+            cursor.execute("SELECT * FROM $system.MDSCHEMA_LEVELS")
+            df_levels = rows_to_df(cursor, cursor.fetchall())
+        except Exception as e:
+            self.logger.debug(f"MDSCHEMA_LEVELS no disponible: {e}")
+            df_levels = pd.DataFrame()
+        
+        if not df_levels.empty and 'HIERARCHY_UNIQUE_NAME' in df_levels.columns:
+            for row in df_levels.to_dict('records'):
+                hierarchy = row['HIERARCHY_UNIQUE_NAME']
+                if hierarchy in parts:
+                    parts[hierarchy].append(
+                        f"{row.get('LEVEL_UNIQUE_NAME', '')}={row.get('LEVEL_CARDINALITY', '')}"
+                    )
+        
+        return {hierarchy: '|'.join(sorted(p)) for hierarchy, p in parts.items()}
+
+    def _save_signatures(self, catalog: str, signatures: Dict[str, str]):
+        path = self._signatures_path(catalog)
+        tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updated': datetime.now().isoformat(), 'hierarchies': signatures},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def _load_signatures(self, catalog: str) -> Optional[Dict[str, str]]:
+        path = self._signatures_path(catalog)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('hierarchies')
+        except (OSError, ValueError):
+            return None
+
+    def _keep_cached_hierarchies(self, csv_path: Path, members_df: pd.DataFrame,
+                                 hierarchies: List[str]) -> pd.DataFrame:
+        """Agrega las filas del cache actual de las jerarquías indicadas"""
+        if not csv_path.exists():
+            return members_df
+        cached = pd.read_csv(csv_path)
+        cached = cached[cached['JERARQUIA'].isin(hierarchies)]
+        if cached.empty:
+            return members_df
+        return pd.concat([members_df, cached[[c for c in cached.columns if c in members_df.columns]]],
+                         ignore_index=True)
+
     def download_members_only(self, catalog: str) -> bool:
         """Descarga SOLO los miembros de un catálogo (rápido) para cache"""
         try:
@@ -476,71 +781,149 @@ class CatalogExplorer:
             with ConnectionManager(self.config, catalog) as conn:
                 cursor = conn.cursor()
                 
-                # Query ultra-simple para compatibilidad total (incluso catálogos 2010-2012)
-                query = "SELECT * FROM $system.MDSCHEMA_MEMBERS"
-                
-                cursor.execute(query)
-                rows = cursor.fetchall()
-                
-                # Convertir a DataFrame
-                members_df = rows_to_df(cursor, rows)
-                
-                if members_df.empty:
-                    self.logger.warning(f"No se encontraron miembros en {catalog}")
-                    return False
+                # Firmas antes de los miembros: si algo cambia durante la descarga,
+                # el próximo refresh incremental lo detecta
+                try:
+                    signatures = self._hierarchy_signatures(cursor)
+                except Exception as e:
+                    self.logger.debug(f"No se pudieron calcular firmas de {catalog}: {e}")
+                    signatures = {}
                 
-                # DEBUG: Imprimir columnas disponibles
-                self.logger.info(f"Columnas disponibles en MDSCHEMA_MEMBERS: {members_df.columns.tolist()}")
+            # Por jerarquía, solo columnas necesarias, en paralelo
+            failed = []
+            try:
+                members_df = self.fetcher.fetch_hierarchies(catalog)
+            except HierarchyFetchError as e:
+                self.logger.warning(f"Descarga incompleta de {catalog}: {e}")
+                failed, members_df = e.failed, e.partial
+            except Exception as e:
+                self.logger.warning(f"Descarga por jerarquía falló en {catalog}: {e}")
+                members_df = pd.DataFrame()
+            
+            if members_df.empty and not failed:
+                with ConnectionManager(self.config, catalog) as conn:
+                    cursor = conn.cursor()
+                    # Query ultra-simple para compatibilidad total (incluso catálogos 2010-2012)
+                    cursor.execute("SELECT * FROM $system.MDSCHEMA_MEMBERS")
+                    members_df = rows_to_df(cursor, cursor.fetchall())
+            
+            if members_df.empty:
+                self.logger.warning(f"No se encontraron miembros en {catalog}")
+                return False
+            
+            # DEBUG: Imprimir columnas disponibles
+            self.logger.info(f"Columnas disponibles en MDSCHEMA_MEMBERS: {members_df.columns.tolist()}")
+            
+            members_df = self.prepare_members_df(members_df)
+            if members_df is None:
+                self.logger.error(f"No se encontraron columnas esperadas en {catalog}")
+                return False
+            
+            csv_path = self.members_csv_path(catalog)
+            if failed:
+                # Las jerarquías que fallaron conservan sus filas anteriores (si había
+                # cache) y quedan sin firma: el próximo refresh las vuelve a pedir
+                members_df = self._keep_cached_hierarchies(csv_path, members_df, failed)
+                signatures = {h: sig for h, sig in signatures.items() if h not in set(failed)}
+            
+            # Guardar CSV en cache
+            self._write_members_csv(members_df, csv_path)
+            if signatures:
+                self._save_signatures(catalog, signatures)
+            
+            if failed:
+                self.logger.warning(f"{len(members_df)} miembros guardados; "
+                                    f"{len(failed)} jerarquías pendientes en {catalog}")
+                return False
+            
+            self.logger.info(f"{Fore.GREEN}✓ {len(members_df)} miembros guardados en cache{Style.RESET_ALL}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error descargando miembros: {e}")
+            return False
 
+    def refresh_members_incremental(self, catalog: str) -> Dict:
+        """Actualiza el cache de miembros re-descargando solo las jerarquías que cambiaron
+        
+        Compara las firmas por jerarquía (cardinalidades de MDSCHEMA_HIERARCHIES
+        y MDSCHEMA_LEVELS) con las guardadas junto al CSV. Sin cache o sin
+        firmas previas hace una descarga completa.
+        
+        Returns:
+            {'mode': 'full'|'incremental'|'unchanged', 'changed': [...],
+             'removed': [...], 'success': bool}; con 'failed': [...] si alguna
+            jerarquía no se pudo descargar (se conservan sus filas y firma anteriores)
+        """
+        csv_path = self.members_csv_path(catalog)
+        old_signatures = self._load_signatures(catalog)
+        
+        if not csv_path.exists() or not old_signatures:
+            success = self.download_members_only(catalog)
+            return {'mode': 'full', 'changed': [], 'removed': [], 'success': success}
+        
+        try:
+            with ConnectionManager(self.config, catalog) as conn:
+                cursor = conn.cursor()
+                signatures = self._hierarchy_signatures(cursor)
+                if not signatures:
+                    self.logger.warning(f"Sin firmas de jerarquías para {catalog}; se conserva el cache")
+                    return {'mode': 'unchanged', 'changed': [], 'removed': [], 'success': False}
                 
-                # Seleccionar solo las columnas necesarias si existen
-                required_cols = {
-                    'DIMENSION_UNIQUE_NAME': 'DIMENSION',
-                    'HIERARCHY_UNIQUE_NAME': 'JERARQUIA',
-                    'LEVEL_NAME': 'NIVEL_NOMBRE',
-                    'MEMBER_CAPTION': 'MIEMBRO_CAPTION',
-                    'MEMBER_UNIQUE_NAME': 'MIEMBRO_UNIQUE_NAME',
-                    'MEMBER_ORDINAL': 'MIEMBRO_ORDINAL',
-                    'MEMBER_KEY': 'MIEMBRO_KEY',
-                    'ORDINAL': 'ORDINAL'
-                }
-                
-                # Filtrar columnas que existen
-                existing_cols = {old: new for old, new in required_cols.items() if old in members_df.columns}
-                
-                if not existing_cols:
-                    self.logger.error(f"No se encontraron columnas esperadas en {catalog}")
-                    return False
-                
-                # Seleccionar solo columnas necesarias
-                members_df = members_df[list(existing_cols.keys())]
-                
-                # Filtrar miembros "All" si la columna existe
-                if 'MEMBER_CAPTION' in members_df.columns:
-                    members_df = members_df[members_df['MEMBER_CAPTION'] != 'All']
-                
-                # Renombrar columnas
-                members_df.rename(columns=existing_cols, inplace=True)
-                
-                # Guardar CSV en cache
-                # V2: Usar nuevo nombre de archivo
-                csv_filename = f"{catalog}_miembros_completos_v2.csv"
-                csv_path = Path(self.config.output_dir).parent / csv_filename
-                members_df.to_csv(csv_path, index=False)
-                
-                # Verificar que el archivo realmente se escribió (fix para VirtualBox shared folders)
-                import time
-                for _ in range(5):
-                    if csv_path.exists() and csv_path.stat().st_size > 0:
-                        break
-                    time.sleep(0.5)
+                changed = sorted(h for h, sig in signatures.items() if old_signatures.get(h) != sig)
+                removed = sorted(h for h in old_signatures if h not in signatures)
                 
-                self.logger.info(f"{Fore.GREEN}✓ {len(members_df)} miembros guardados en cache{Style.RESET_ALL}")
-                return True
+                if not changed and not removed:
+                    self.logger.info(f"[CACHE] {catalog}: sin cambios en jerarquías")
+                    return {'mode': 'unchanged', 'changed': [], 'removed': [], 'success': True}
                 
+            self.logger.info(f"[ACTUALIZANDO] {catalog}: {len(changed)} jerarquías cambiadas, "
+                             f"{len(removed)} eliminadas")
+            
+            fresh, failed = [], []
+            if changed:
+                try:
+                    df = self.fetcher.fetch_hierarchies(catalog, changed)
+                except HierarchyFetchError as e:
+                    self.logger.warning(f"Refresh incompleto de {catalog}: {e}")
+                    failed, df = e.failed, e.partial
+                df = self.prepare_members_df(df) if not df.empty else None
+                if df is not None and failed:
+                    # De una jerarquía fallida se conservan solo las filas viejas
+                    df = df[~df['JERARQUIA'].isin(failed)]
+                if df is not None:
+                    # Solo se parsean los unique names de lo nuevo
+                    add_unique_name_columns(df)
+                    fresh.append(df)
+            
+            # Fusión: lo que no cambió (o no se pudo descargar) se conserva tal cual
+            replaced = [h for h in changed if h not in set(failed)] + removed
+            members_df = add_unique_name_columns(pd.read_csv(csv_path))
+            members_df = members_df[~members_df['JERARQUIA'].isin(replaced)]
+            members_df = pd.concat([members_df] + fresh, ignore_index=True)
+            self._write_members_csv(members_df, csv_path)
+            
+            # Las fallidas guardan su firma anterior: siguen contando como cambiadas
+            for hierarchy in failed:
+                if hierarchy in old_signatures:
+                    signatures[hierarchy] = old_signatures[hierarchy]
+                else:
+                    signatures.pop(hierarchy, None)
+            self._save_signatures(catalog, signatures)
+            
+            if failed:
+                self.logger.warning(f"Cache de {catalog} actualizado parcialmente: "
+                                    f"{len(failed)} jerarquías pendientes")
+                return {'mode': 'incremental', 'changed': [h for h in changed if h not in set(failed)],
+                        'removed': removed, 'failed': failed, 'success': False}
+            
+            self.logger.info(f"{Fore.GREEN}✓ Cache de {catalog} actualizado "
+                             f"({len(members_df)} miembros){Style.RESET_ALL}")
+            return {'mode': 'incremental', 'changed': changed, 'removed': removed, 'success': True}
+        
         except Exception as e:
-            self.logger.error(f"Error descargando miembros: {e}")
-            return False
+            self.logger.error(f"Error actualizando miembros de {catalog}: {e}")
+            return {'mode': 'incremental', 'changed': [], 'removed': [], 'success': False}
 
 
 
@@ -613,6 +996,32 @@ class MDXQueryTool:
             self.logger.error(f"Error obteniendo jerarquias: {e}")
         return []
 
+    def get_levels(self, catalog: str) -> List[Dict]:
+        """Obtiene los niveles de cada jerarquía (sin descargar miembros)"""
+        try:
+            with ConnectionManager(self.config, catalog) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM $system.MDSCHEMA_LEVELS")
+                df = rows_to_df(cursor, cursor.fetchall())
+                
+                required_cols = [c for c in ('DIMENSION_UNIQUE_NAME', 'HIERARCHY_UNIQUE_NAME',
+                                             'LEVEL_UNIQUE_NAME', 'LEVEL_NAME', 'LEVEL_NUMBER',
+                                             'LEVEL_CARDINALITY') if c in df.columns]
+                if not df.empty and 'HIERARCHY_UNIQUE_NAME' in required_cols and 'LEVEL_NAME' in required_cols:
+                    # Ignorar cubos de dimensión y niveles ocultos
+                    if 'CUBE_NAME' in df.columns:
+                        df = df[~df['CUBE_NAME'].astype(str).str.startswith('$')]
+                    if 'LEVEL_IS_VISIBLE' in df.columns:
+                        df = df[df['LEVEL_IS_VISIBLE'] != False]
+                    
+                    subset = ['HIERARCHY_UNIQUE_NAME', 'LEVEL_NAME']
+                    result = df[required_cols].drop_duplicates(subset=subset).to_dict('records')
+                    self.logger.info(f"   [OK] Encontrados {len(result)} niveles")
+                    return result
+        except Exception as e:
+            self.logger.error(f"Error obteniendo niveles: {e}")
+        return []
+
     def execute_mdx(self, catalog: str, query: str) -> pd.DataFrame:
         """Ejecuta una consulta MDX arbitraria"""
         self.logger.info(f"[MDX] Ejecutando consulta en {catalog}...")
@@ -729,6 +1138,10 @@ class MDXQueryTool:
         # Cargar CSV (ahora garantizado que existe)
         try:
             df = pd.read_csv(csv_path)
+            # Normalizar captions/jerarquías una sola vez (búsquedas sin acentos)
+            add_normalized_columns(df)
+            # Columnas UN_* (ya vienen en caches nuevos; se parsean en caches viejos)
+            add_unique_name_columns(df)
             self.logger.info(f"   [OK] Cargados {len(df)} miembros del archivo {csv_filename}")
             return df
         except Exception as e:
@@ -737,6 +1150,11 @@ class MDXQueryTool:
 
     def get_dimension_members(self, df_members: pd.DataFrame, dimension: str, hierarchy: str, level: str) -> List[Dict]:
         """Obtiene miembros específicos de una dimensión/jerarquía/nivel"""
+        members = self.filter_dimension_members(df_members, dimension, hierarchy, level)
+        return members[['MIEMBRO_CAPTION', 'MIEMBRO_UNIQUE_NAME']].to_dict('records')
+    
+    def filter_dimension_members(self, df_members: pd.DataFrame, dimension: str, hierarchy: str, level: str) -> pd.DataFrame:
+        """Filas de una dimensión/jerarquía/nivel en orden natural (ordinal/clave)"""
         # Construcción dinámica del filtro según columnas disponibles
         filters = (df_members['DIMENSION'] == dimension) & (df_members['JERARQUIA'] == hierarchy)
         
@@ -745,24 +1163,23 @@ class MDXQueryTool:
             # Cubo nuevo: filtrar por columna
             filters = filters & (df_members['NIVEL_NOMBRE'] == level)
         else:
-            # Cubo viejo: filtrar por profundidad del Unique Name
-            # Primero, detectar todos los niveles de esta jerarquía
-            extracted_levels = self.extract_levels_from_unique_names(df_members, dimension, hierarchy)
+            # Cubo viejo: filtrar por nivel explícito o profundidad del Unique Name
+            # (columnas UN_* parseadas una vez al construir el cache)
+            if 'UN_PROFUNDIDAD' not in df_members.columns:
+                df_members = add_unique_name_columns(df_members.copy())
             
-            if extracted_levels:
-                # Encontrar la profundidad del nivel solicitado
-                level_depth = None
-                for lev_info in extracted_levels:
-                    if lev_info['level_name'] == level:
-                        level_depth = lev_info['level_depth']
-                        break
-                
+            if (df_members.loc[filters, 'UN_NIVEL'] == level).any():
+                # Nivel nombrado en el Unique Name: [Dim].[Hier].[Entidad].&[1]
+                filters = filters & (df_members['UN_NIVEL'] == level)
+            else:
+                # Nivel genérico ("Nivel N"): profundidad = número de '.&['
+                extracted_levels = self.extract_levels_from_unique_names(df_members, dimension, hierarchy)
+                level_depth = next(
+                    (lev['level_depth'] for lev in extracted_levels if lev['level_name'] == level),
+                    None
+                )
                 if level_depth is not None:
-                    # Filtrar miembros que tengan exactamente esa profundidad
-                    # Profundidad = número de ocurrencias de '.&[' en el Unique Name
-                    temp_members = df_members[filters].copy()
-                    temp_members['_depth'] = temp_members['MIEMBRO_UNIQUE_NAME'].str.count(r'\.&\[')
-                    filters = filters & (temp_members['_depth'] == level_depth)
+                    filters = filters & (df_members['UN_PROFUNDIDAD'] == level_depth) & (df_members['UN_NIVEL'] == '')
         
         # Filtrar "All"
         if 'MIEMBRO_CAPTION' in df_members.columns:
@@ -787,13 +1204,13 @@ class MDXQueryTool:
             # Fallback: orden alfabético
             members = members.sort_values('MIEMBRO_CAPTION')
             
-        return members[['MIEMBRO_CAPTION', 'MIEMBRO_UNIQUE_NAME']].to_dict('records')
+        return members
     
     def extract_levels_from_unique_names(self, df_members: pd.DataFrame, dimension: str, hierarchy: str) -> List[Dict]:
-        """Extrae niveles de una jerarquía analizando los Unique Names de miembros
+        """Extrae niveles de una jerarquía a partir de las columnas UN_* del cache
         
-        Para cubos viejos sin NIVEL_NOMBRE, analiza patrones en MIEMBRO_UNIQUE_NAME.
-        Maneja casos donde los niveles intermedios no tienen nombre explícito.
+        Para cubos viejos sin NIVEL_NOMBRE usa el nivel explícito del Unique Name
+        o, si no existe, la profundidad ('.&[') con nombre genérico.
         Ejemplo: [Dim].[Hier].[Entidad].&[1].&[1]&[2] -> Entidad, Nivel 2
         
         Returns: List de dicts con {level_name, level_depth}
@@ -803,34 +1220,37 @@ class MDXQueryTool:
             (df_members['DIMENSION'] == dimension) &
             (df_members['JERARQUIA'] == hierarchy) &
             (df_members['MIEMBRO_CAPTION'] != 'All')
-        ].copy()
+        ]
         
         if members_in_hier.empty:
             return []
         
-        levels_map = {}
+        if 'UN_PROFUNDIDAD' not in members_in_hier.columns:
+            members_in_hier = add_unique_name_columns(members_in_hier.copy())
         
-        # Analizar cada miembro para encontrar estructura
-        for _, row in members_in_hier.iterrows():
-            unique_name = row['MIEMBRO_UNIQUE_NAME']
-            # Contar profundidad en unique name
-            depth = unique_name.count('.&[')
-            if depth not in levels_map:
-                levels_map[depth] = f"Nivel {depth}"
+        # Nombre por fila: NIVEL_NOMBRE (cubos nuevos) > nivel explícito > genérico
+        if 'NIVEL_NOMBRE' in members_in_hier.columns:
+            names = members_in_hier['NIVEL_NOMBRE'].astype(object)
+        else:
+            names = members_in_hier['UN_NIVEL'].astype(object)
         
-        # Si tenemos columna NIVEL_NOMBRE, usarla para mejorar nombres
-        if 'NIVEL_NOMBRE' in df_members.columns:
-            for depth in levels_map.keys():
-                # Encontrar un nombre representativo para este depth
-                sample = members_in_hier[members_in_hier['MIEMBRO_UNIQUE_NAME'].str.count(r'\.&\[') == depth]
-                if not sample.empty:
-                    name = sample.iloc[0]['NIVEL_NOMBRE']
-                    levels_map[depth] = name
-        
-        # Convertir a lista ordenada
-        levels_list = [
-            {'level_name': name, 'level_depth': depth}
-            for depth, name in sorted(levels_map.items())
-        ]
+        levels = pd.DataFrame({
+            'depth': members_in_hier['UN_PROFUNDIDAD'].to_numpy(),
+            'name': names.fillna('').to_numpy()
+        })
+        
+        # Un nivel por (profundidad, nombre); orden por profundidad y aparición
+        levels = (levels.drop_duplicates(['depth', 'name'])
+                        .sort_values('depth', kind='stable'))
+        levels['explicit'] = levels['name'] != ''
+        levels['name'] = levels['name'].where(levels['explicit'], 'Nivel ' + levels['depth'].astype(str))
+        
+        levels_list = []
+        for seq, lev in enumerate(levels.itertuples(index=False), 1):
+            # Niveles genéricos conservan su profundidad real (Levels(N) en MDX)
+            levels_list.append({
+                'level_name': lev.name,
+                'level_depth': seq if lev.explicit else int(lev.depth)
+            })
         
         return levels_list
\ No newline at end of file
@@ -3,23 +3,89 @@ FastAPI Server for DGIS OLAP Query Builder
 Endpoints para consumir desde React frontend
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
+from email.utils import formatdate, parsedate_to_datetime
+import hashlib
+import json
 import logging
+import math
+import os
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from olap_service import OlapService, get_service
+from cache_warmer import CacheWarmer
+from compression import CompressionMiddleware
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _finite(value: Any) -> Any:
+    """Copia de `value` con NaN/inf reemplazados por None (como orjson)"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def dumps_json(payload: Any) -> bytes:
+    """Serializa a JSON (orjson si está instalado; NaN/inf se vuelven null)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+                            default=str)
+    try:
+        text = json.dumps(payload, ensure_ascii=False, separators=(',', ':'),
+                          default=str, allow_nan=False)
+    except ValueError:
+        # NaN/inf no son JSON válido: solo entonces se recorre el payload
+        text = json.dumps(_finite(payload), ensure_ascii=False, separators=(',', ':'),
+                          default=str, allow_nan=False)
+    return text.encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que serializa con dumps_json"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+# Precalentamiento de catálogos (WARM_CATALOGS)
+_warmer: Optional[CacheWarmer] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _warmer
+    _warmer = CacheWarmer(get_service())
+    _warmer.start()
+    yield
+    await _warmer.stop()
+    service = get_service()
+    if hasattr(service, 'close'):
+        await service.close()
+
+
 # Crear app FastAPI
 app = FastAPI(
     title="DGIS OLAP Query Builder API",
     description="REST API para construcción dinámica de consultas MDX",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS para desarrollo (permite cualquier origin)
@@ -31,6 +97,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión zstd/br/gzip según Accept-Encoding (metadata y resultados)
+app.add_middleware(CompressionMiddleware)
+
 
 # ========== MODELOS PYDANTIC ==========
 
@@ -96,6 +165,81 @@ class QueryResponse(BaseModel):
     rowCount: int
 
 
+# ========== RESPUESTAS CONDICIONALES ==========
+
+def conditional_json(request: Request, payload: Any) -> Response:
+    """Respuesta JSON con ETag; 304 si el cliente ya tiene esta versión"""
+    body = dumps_json(payload)
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
+
+
+# Segundos que browsers/proxies pueden reutilizar metadata sin revalidar
+METADATA_MAX_AGE = int(os.getenv('METADATA_MAX_AGE', '60'))
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110 §13.1.2)"""
+    if_none_match = request.headers.get('if-none-match', '')
+    tags = [_opaque_tag(tag) for tag in if_none_match.split(',')]
+    return '*' in tags or _opaque_tag(etag) in tags
+
+
+def _not_modified_since(request: Request, last_modified: Optional[float]) -> bool:
+    if last_modified is None or 'if-none-match' in request.headers:
+        return False
+    since = request.headers.get('if-modified-since')
+    if not since:
+        return False
+    try:
+        return int(last_modified) <= parsedate_to_datetime(since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+async def versioned_json(
+    request: Request,
+    service: OlapService,
+    kind: str,
+    catalog: Optional[str],
+    compute,
+    params: str = ''
+) -> Response:
+    """Respuesta de metadata con ETag derivado de la versión del catálogo
+    
+    El ETag se calcula ANTES de generar el payload: una revalidación que
+    coincide devuelve 304 sin tocar pandas ni el servidor OLAP. Es débil
+    porque identifica la versión de los datos, no los bytes: es el mismo
+    con cualquier Content-Encoding. Si la versión es desconocida se usa el
+    ETag del contenido.
+    """
+    version, last_modified = await service.metadata_version(catalog)
+    if version is None:
+        return conditional_json(request, await compute())
+    
+    seed = f"{app.version}|{kind}|{catalog}|{params}|{version}"
+    etag = f'W/"{hashlib.sha1(seed.encode("utf-8")).hexdigest()}"'
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={METADATA_MAX_AGE}, must-revalidate'
+    }
+    if last_modified is not None:
+        headers['Last-Modified'] = formatdate(last_modified, usegmt=True)
+    
+    if _etag_matches(request, etag) or _not_modified_since(request, last_modified):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(await compute(), headers=headers)
+
+
 # ========== ENDPOINTS ==========
 
 @app.get("/")
@@ -108,8 +252,32 @@ async def root():
     }
 
 
+@app.get("/api/ready")
+async def readiness():
+    """Readiness: 200 cuando todos los catálogos de WARM_CATALOGS están precargados
+    
+    Ejemplo de respuesta:
+    ```json
+    {
+        "ready": false,
+        "progress": {"warmed": 1, "total": 2},
+        "rounds": 0,
+        "catalogs": {
+            "SIS_2025": {"state": "warm", "lastSuccess": "...", "seconds": 4.2, "stats": {...}},
+            "SIS_2024": {"state": "warming"}
+        }
+    }
+    ```
+    """
+    if _warmer is None:
+        return {"ready": True, "progress": {"warmed": 0, "total": 0}, "rounds": 0, "catalogs": {}}
+    
+    status = _warmer.status()
+    return JSONResponse(status, status_code=200 if status['ready'] else 503)
+
+
 @app.get("/api/catalogs", response_model=List[CatalogResponse])
-async def list_catalogs(service: OlapService = Depends(get_service)):
+async def list_catalogs(request: Request, service: OlapService = Depends(get_service)):
     """
     Lista todos los catálogos OLAP disponibles
     
@@ -125,16 +293,50 @@ async def list_catalogs(service: OlapService = Depends(get_service)):
     ```
     """
     try:
-        catalogs = await service.get_catalogs()
-        return catalogs
+        return await versioned_json(request, service, 'catalogs', None, service.get_catalogs)
     except Exception as e:
         logger.error(f"Error obteniendo catálogos: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/catalogs/{catalog_name}/bootstrap")
+async def get_bootstrap(
+    catalog_name: str,
+    request: Request,
+    service: OlapService = Depends(get_service)
+):
+    """
+    Metadata de la primera pantalla de un catálogo en un solo round trip
+    
+    Equivale a /measures + /dimensions + /apartados + nombre del cubo,
+    calculados en paralelo sobre un solo cache de miembros. Respuesta
+    comprimida y con ETag (304 con If-None-Match).
+    
+    Ejemplo de respuesta:
+    ```json
+    {
+        "catalog": "SIS_2025",
+        "cubeName": "[SIS]",
+        "measures": [...],
+        "dimensions": [...],
+        "apartados": [...]
+    }
+    ```
+    """
+    try:
+        return await versioned_json(
+            request, service, 'bootstrap', catalog_name,
+            lambda: service.get_bootstrap(catalog_name)
+        )
+    except Exception as e:
+        logger.error(f"Error obteniendo bootstrap de {catalog_name}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/catalogs/{catalog_name}/measures", response_model=List[MeasureResponse])
 async def get_measures(
     catalog_name: str,
+    request: Request,
     service: OlapService = Depends(get_service)
 ):
     """
@@ -157,8 +359,10 @@ async def get_measures(
     ```
     """
     try:
-        measures = await service.get_measures(catalog_name)
-        return measures
+        return await versioned_json(
+            request, service, 'measures', catalog_name,
+            lambda: service.get_measures(catalog_name)
+        )
     except Exception as e:
         logger.error(f"Error obteniendo medidas de {catalog_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -167,6 +371,7 @@ async def get_measures(
 @app.get("/api/catalogs/{catalog_name}/apartados")
 async def get_apartados(
     catalog_name: str,
+    request: Request,
     service: OlapService = Depends(get_service)
 ):
     """
@@ -179,8 +384,10 @@ async def get_apartados(
         List[Dict]: Lista de apartados con id, name, uniqueName, hierarchy
     """
     try:
-        apartados =  await service.get_apartados(catalog_name)
-        return apartados
+        return await versioned_json(
+            request, service, 'apartados', catalog_name,
+            lambda: service.get_apartados(catalog_name)
+        )
     except Exception as e:
         logger.error(f"Error obteniendo apartados de {catalog_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -189,6 +396,7 @@ async def get_apartados(
 @app.get("/api/catalogs/{catalog_name}/variables")
 async def get_variables(
     catalog_name: str,
+    request: Request,
     apartados: str = None,
     service: OlapService = Depends(get_service)
 ):
@@ -208,8 +416,11 @@ async def get_variables(
         GET /api/catalogs/SIS_2025/variables?apartados=101-112,119
     """
     try:
-        variables = await service.get_variables(catalog_name, apartados)
-        return variables
+        return await versioned_json(
+            request, service, 'variables', catalog_name,
+            lambda: service.get_variables(catalog_name, apartados),
+            params=apartados or ''
+        )
     except Exception as e:
         logger.error(f"Error obteniendo variables de {catalog_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -218,6 +429,7 @@ async def get_variables(
 @app.get("/api/catalogs/{catalog_name}/dimensions", response_model=List[DimensionResponse])
 async def get_dimensions(
     catalog_name: str,
+    request: Request,
     service: OlapService = Depends(get_service)
 ):
     """
@@ -243,8 +455,10 @@ async def get_dimensions(
     ```
     """
     try:
-        dimensions = await service.get_dimensions(catalog_name)
-        return dimensions
+        return await versioned_json(
+            request, service, 'dimensions', catalog_name,
+            lambda: service.get_dimensions(catalog_name)
+        )
     except Exception as e:
         logger.error(f"Error obteniendo dimensiones de {catalog_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -253,9 +467,14 @@ async def get_dimensions(
 @app.get("/api/catalogs/{catalog_name}/members")
 async def get_members(
     catalog_name: str,
+    request: Request,
     dimension: str,
     hierarchy: str,
     level: str,
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Tamaño de página"),
+    cursor: Optional[str] = Query(None, description="nextCursor de la página anterior"),
+    fields: Optional[str] = Query(None, description="Campos separados por comas"),
+    sort: str = Query("ordinal", pattern="^(ordinal|caption)$"),
     service: OlapService = Depends(get_service)
 ):
     """
@@ -266,13 +485,19 @@ async def get_members(
         dimension: Unique name de la dimensión (ej. "[D Clues]")
         hierarchy: Unique name de la jerarquía (ej. "[D Clues].[Unidad médica]")
         level: Nombre del nivel (ej. "Entidad")
+        limit: Si se indica (o cursor), responde una página en vez de la lista completa
+        cursor: Cursor opaco devuelto como nextCursor (paginación keyset)
+        fields: caption, uniqueName, key, ordinal, level, parent, childrenCardinality
+                (default: caption,uniqueName)
+        sort: ordinal (orden del cubo) o caption (alfabético sin acentos)
     
     Query params ejemplo:
     ```
     /api/catalogs/sis2011/members?dimension=[D Clues]&hierarchy=[D Clues].[Unidad médica]&level=Entidad
+    /api/catalogs/sis2011/members?dimension=...&level=Unidad&limit=500&sort=caption&fields=caption,uniqueName,key
     ```
     
-    Ejemplo de respuesta:
+    Ejemplo de respuesta (sin limit):
     ```json
     [
         {
@@ -281,15 +506,154 @@ async def get_members(
         }
     ]
     ```
+    
+    Ejemplo de respuesta (con limit):
+    ```json
+    {
+        "items": [{"caption": "Aguascalientes", "uniqueName": "..."}],
+        "nextCursor": "WyJvcmRpbmFsIiwgMCwgIi4uLiJd",
+        "total": 32
+    }
+    ```
     """
+    field_list = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
     try:
-        members = await service.get_members(catalog_name, dimension, hierarchy, level)
-        return members
+        return await versioned_json(
+            request, service, 'members', catalog_name,
+            lambda: service.get_members(
+                catalog_name, dimension, hierarchy, level,
+                limit=limit, cursor=cursor, fields=field_list, sort=sort
+            ),
+            params=json.dumps([dimension, hierarchy, level, limit, cursor, field_list, sort])
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error obteniendo miembros: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/catalogs/{catalog_name}/members/search")
+async def search_members(
+    catalog_name: str,
+    q: str = Query(..., min_length=1, description="Texto a buscar en captions"),
+    limit: int = Query(20, ge=1, le=200),
+    hierarchy: Optional[str] = None,
+    level: Optional[str] = None,
+    service: OlapService = Depends(get_service)
+):
+    """
+    Búsqueda typeahead de miembros por caption
+    
+    Insensible a mayúsculas y acentos ("vacunacion" encuentra "Vacunación").
+    Resultados ordenados por relevancia: exacto, prefijo, subcadena.
+    
+    Query params ejemplo:
+    ```
+    /api/catalogs/SIS_2025/members/search?q=vacuna&limit=10
+    ```
+    
+    Ejemplo de respuesta:
+    ```json
+    [
+        {
+            "caption": "Vacunación",
+            "uniqueName": "[DIM VARIABLES].[Apartado y Variable].&[VAC]",
+            "hierarchy": "[DIM VARIABLES].[Apartado y Variable]",
+            "level": "Apartado"
+        }
+    ]
+    ```
+    """
+    try:
+        results = await service.search_members(catalog_name, q, limit, hierarchy, level)
+        return FastJSONResponse(results)
+    except Exception as e:
+        logger.error(f"Error buscando miembros en {catalog_name}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/catalogs/{catalog_name}/hierarchies/{hierarchy}/children")
+async def get_children(
+    catalog_name: str,
+    hierarchy: str,
+    request: Request,
+    parent: Optional[str] = Query(None, description="Unique name del padre; vacío = raíces"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    service: OlapService = Depends(get_service)
+):
+    """
+    Hijos directos de un miembro, para widgets de árbol (carga al expandir)
+    
+    Soporta peticiones condicionales: con `If-None-Match` igual al ETag
+    devuelve 304 sin cuerpo.
+    
+    Query params ejemplo:
+    ```
+    /api/catalogs/SIS_2025/hierarchies/[DIM UNIDAD].[CLUES]/children?parent=[DIM UNIDAD].[CLUES].&[10]&limit=50
+    ```
+    
+    Ejemplo de respuesta:
+    ```json
+    {
+        "parent": "[DIM UNIDAD].[CLUES].&[10]",
+        "total": 14,
+        "offset": 0,
+        "limit": 50,
+        "items": [
+            {
+                "caption": "Jurisdicción 1",
+                "uniqueName": "[DIM UNIDAD].[CLUES].&[10].&[1]",
+                "level": "Jurisdicción",
+                "childrenCardinality": 12,
+                "hasChildren": true
+            }
+        ]
+    }
+    ```
+    """
+    try:
+        return await versioned_json(
+            request, service, 'children', catalog_name,
+            lambda: service.get_children(catalog_name, hierarchy, parent, offset, limit),
+            params=json.dumps([hierarchy, parent, offset, limit])
+        )
+    except Exception as e:
+        logger.error(f"Error obteniendo hijos de {hierarchy} en {catalog_name}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/catalogs/{catalog_name}/members/refresh")
+async def refresh_members(
+    catalog_name: str,
+    service: OlapService = Depends(get_service)
+):
+    """
+    Refresh incremental del cache de miembros
+    
+    Compara cardinalidades por jerarquía (MDSCHEMA_HIERARCHIES/LEVELS) con las
+    de la última descarga y re-descarga solo las jerarquías que cambiaron.
+    
+    Ejemplo de respuesta:
+    ```json
+    {
+        "mode": "incremental",
+        "changed": ["[DIM VARIABLES].[Apartado y Variable]"],
+        "removed": [],
+        "success": true
+    }
+    ```
+    """
+    try:
+        return await service.refresh_members(catalog_name)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error actualizando miembros de {catalog_name}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/query/execute", response_model=QueryResponse)
 async def execute_query(
     request: QueryRequest,
@@ -341,7 +705,7 @@ async def execute_query(
     """
     try:
         result = await service.execute_query(request.dict())
-        return result
+        return FastJSONResponse(result)
     except Exception as e:
         logger.error(f"Error ejecutando query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,128 @@
+"""
+Precalentamiento de cache de catálogos
+Carga al arrancar (y periódicamente) los catálogos más usados para que ningún
+usuario abra un catálogo en frío.
+
+Variables de entorno:
+    WARM_CATALOGS        Catálogos a precargar, separados por comas
+    WARM_INTERVAL        Segundos entre refrescos periódicos (0 = solo al arrancar)
+    WARM_STAGGER         Segundos entre el inicio de un catálogo y el siguiente
+    WARM_CONCURRENCY     Catálogos en paralelo (default: Config.max_workers)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _env_list(name: str) -> List[str]:
+    return [c.strip() for c in os.getenv(name, '').split(',') if c.strip()]
+
+
+class CacheWarmer:
+    """Precarga miembros, medidas, jerarquías, cubo y apartados de catálogos"""
+
+    def __init__(
+        self,
+        service,
+        catalogs: Optional[List[str]] = None,
+        interval: Optional[float] = None,
+        stagger: Optional[float] = None,
+        concurrency: Optional[int] = None
+    ):
+        self.service = service
+        self.catalogs = catalogs if catalogs is not None else _env_list('WARM_CATALOGS')
+        self.interval = interval if interval is not None else float(os.getenv('WARM_INTERVAL', '3600'))
+        self.stagger = stagger if stagger is not None else float(os.getenv('WARM_STAGGER', '2'))
+
+        if concurrency is None:
+            concurrency = int(os.getenv('WARM_CONCURRENCY', '0')) or self._default_concurrency()
+        # Respeta el límite de conexiones simultáneas al servidor OLAP
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        self._task: Optional[asyncio.Task] = None
+        self._rounds = 0
+        self._status: Dict[str, Dict] = {
+            catalog: {'state': 'pending'} for catalog in self.catalogs
+        }
+
+    def _default_concurrency(self) -> int:
+        config = getattr(self.service, 'config', None)
+        return getattr(config, 'max_workers', 3)
+
+    @property
+    def ready(self) -> bool:
+        """Todos los catálogos configurados se cargaron al menos una vez"""
+        return all(s.get('lastSuccess') for s in self._status.values())
+
+    def status(self) -> Dict:
+        done = sum(1 for s in self._status.values() if s.get('lastSuccess'))
+        return {
+            'ready': self.ready,
+            'progress': {'warmed': done, 'total': len(self.catalogs)},
+            'rounds': self._rounds,
+            'catalogs': self._status
+        }
+
+    # ========== EJECUCIÓN ==========
+
+    async def _warm_one(self, catalog: str, refresh: bool):
+        status = self._status[catalog]
+        async with self._semaphore:
+            status['state'] = 'warming'
+            start = time.perf_counter()
+            try:
+                stats = await self.service.warm_catalog(catalog, refresh=refresh)
+                status.update({
+                    'state': 'warm',
+                    'lastSuccess': datetime.now().isoformat(),
+                    'seconds': round(time.perf_counter() - start, 2),
+                    'stats': stats,
+                    'error': None
+                })
+                logger.info(f"Catálogo {catalog} precargado en {status['seconds']}s")
+            except Exception as e:
+                # Si ya estaba caliente se sigue sirviendo la versión anterior
+                status.update({
+                    'state': 'warm' if status.get('lastSuccess') else 'error',
+                    'error': str(e)
+                })
+                logger.error(f"Error precargando {catalog}: {e}")
+
+    async def warm_all(self, refresh: bool = False):
+        """Una ronda sobre todos los catálogos, escalonada"""
+        tasks = []
+        for i, catalog in enumerate(self.catalogs):
+            if i and self.stagger > 0:
+                await asyncio.sleep(self.stagger)
+            tasks.append(asyncio.create_task(self._warm_one(catalog, refresh)))
+        if tasks:
+            await asyncio.gather(*tasks)
+        self._rounds += 1
+
+    async def _run(self):
+        await self.warm_all()
+        while self.interval > 0:
+            await asyncio.sleep(self.interval)
+            await self.warm_all(refresh=True)
+
+    def start(self):
+        if not self.catalogs or self._task is not None:
+            return
+        logger.info(f"Precargando {len(self.catalogs)} catálogos: {', '.join(self.catalogs)}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
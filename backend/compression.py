@@ -0,0 +1,168 @@
+"""
+Compresión de respuestas negociada por Accept-Encoding
+zstd > br > gzip según lo que acepte el cliente y lo que esté instalado
+(brotli y zstandard son opcionales; gzip siempre está disponible).
+"""
+
+import gzip
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Respuestas más chicas que esto no se comprimen
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+
+# Tipos de contenido que vale la pena comprimir
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/xml')
+
+
+def _compress_zstd(body: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=3).compress(body)
+
+
+def _compress_br(body: bytes) -> bytes:
+    return brotli.compress(body, quality=5)
+
+
+def _compress_gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=6)
+
+
+# En orden de preferencia del servidor
+CODECS: List[Tuple[str, Callable[[bytes], bytes]]] = (
+    ([('zstd', _compress_zstd)] if ZSTD_AVAILABLE else [])
+    + ([('br', _compress_br)] if BROTLI_AVAILABLE else [])
+    + [('gzip', _compress_gzip)]
+)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """'gzip, br;q=0.8, *;q=0' -> {'gzip': 1.0, 'br': 0.8, '*': 0.0}"""
+    accepted = {}
+    for part in header.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, params = part.partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str) -> Optional[Tuple[str, Callable[[bytes], bytes]]]:
+    """Codec con mayor q aceptado por el cliente (empates: preferencia del servidor)"""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for name, codec in CODECS:
+        q = accepted.get(name, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = (name, codec), q
+    return best
+
+
+class CompressionMiddleware:
+    """Middleware ASGI: comprime el cuerpo completo de respuestas grandes"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get('headers') or [])
+        choice = choose_encoding(headers.get(b'accept-encoding', b'').decode('latin-1'))
+        if choice is None:
+            # Sin compresión no hace falta acumular el cuerpo, pero la
+            # respuesta sí varía según Accept-Encoding (caches compartidos)
+            async def vary_wrapper(message):
+                if message['type'] == 'http.response.start' and self._varies(message):
+                    message = {**message, 'headers': self._add_vary(list(message.get('headers', [])))}
+                await send(message)
+
+            await self.app(scope, receive, vary_wrapper)
+            return
+
+        start_message = None
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if message['type'] != 'http.response.body' or start_message is None:
+                await send(message)
+                return
+
+            chunks.append(message.get('body', b''))
+            if message.get('more_body', False):
+                return
+
+            await self._send_response(send, start_message, b''.join(chunks), choice)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _varies(start_message) -> bool:
+        """True si la representación depende de Accept-Encoding"""
+        lowered = {k.lower(): v for k, v in start_message.get('headers', [])}
+        if b'content-encoding' in lowered:
+            return False
+        content_type = lowered.get(b'content-type', b'').decode('latin-1')
+        # Un 304 no trae Content-Type pero debe repetir el Vary del 200
+        return start_message['status'] == 304 or content_type.startswith(COMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _add_vary(response_headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+        vary = b', '.join(v for k, v in response_headers if k.lower() == b'vary')
+        if b'accept-encoding' in vary.lower() or vary.strip() == b'*':
+            return response_headers
+        response_headers = [(k, v) for k, v in response_headers if k.lower() != b'vary']
+        return response_headers + [(b'vary', vary + b', Accept-Encoding' if vary else b'Accept-Encoding')]
+
+    async def _send_response(self, send, start_message, body: bytes, choice):
+        response_headers = [(k, v) for k, v in start_message.get('headers', [])]
+        varies = self._varies(start_message)
+
+        compressible = (
+            varies
+            and len(body) >= self.minimum_size
+            and start_message['status'] not in (204, 304)
+        )
+        if compressible:
+            name, codec = choice
+            body = codec(body)
+            response_headers = [
+                (k, v) for k, v in response_headers if k.lower() != b'content-length'
+            ]
+            response_headers += [
+                (b'content-encoding', name.encode('latin-1')),
+                (b'content-length', str(len(body)).encode('latin-1')),
+            ]
+        if varies:
+            # También sin comprimir (cuerpo chico): otro cliente recibiría
+            # la versión comprimida de la misma URL
+            start_message = {**start_message, 'headers': self._add_vary(response_headers)}
+
+        await send(start_message)
+        await send({'type': 'http.response.body', 'body': body})
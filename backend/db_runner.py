@@ -1,20 +1,103 @@
 import os
 import sys
 import json
+import signal
+import socket
+import threading
 import adodbapi
 import psycopg2
 import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
 from datetime import datetime
+from psycopg2 import pool
+
+try:
+    import pythoncom
+    COM_AVAILABLE = True
+except ImportError:
+    COM_AVAILABLE = False
+
+# Worker mode defaults (overridable with flags)
+JOB_WORKER_CONCURRENCY = int(os.getenv('JOB_WORKER_CONCURRENCY', '4'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', '15'))
+JOB_STALE_AFTER = float(os.getenv('JOB_STALE_AFTER', '120'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+
+
+def olap_connect(catalog):
+    conn_str = (
+        f"Provider=MSOLAP;Data Source={os.environ['DGIS_SERVER']};"
+        f"Initial Catalog={catalog};"
+        f"User ID={os.environ['DGIS_USER']};"
+        f"Password={os.environ['DGIS_PASSWORD']};"
+    )
+    return adodbapi.connect(conn_str)
+
+
+def execute_mdx(conn_olap, mdx_query, tag="[EXEC]"):
+    """Run an MDX query and return the result document stored in jobs.result_data"""
+    print(f"{tag} Executing MDX query...")
+    start_time = datetime.now()
+    cur_olap = conn_olap.cursor()
+    try:
+        cur_olap.execute(mdx_query)
+
+        # Fetch data
+        data = cur_olap.fetchall()
+        duration = (datetime.now() - start_time).total_seconds()
+        print(f"[OK] {tag} Query executed in {duration:.2f}s. Rows: {len(data)}")
+
+        # Get column names
+        column_names = [d[0] for d in cur_olap.description]
+    finally:
+        cur_olap.close()
+
+    # Convert rows to serializable format
+    # adodbapi returns pywintypes for some things, need to ensure standard types
+    result_rows = []
+    for row in data:
+        result_rows.append([str(cell) if cell is not None else None for cell in row])
+
+    return {
+        'columns': column_names,
+        'data': result_rows,
+        'count': len(result_rows),
+        'duration_seconds': duration,
+        'executed_at': datetime.now().isoformat()
+    }
+
+
+def _heartbeat_job(db_url, job_id, runner_id, stop_event):
+    """Keep a job run by --job-id alive for REQUEUE_SQL until stop_event is set"""
+    try:
+        conn = psycopg2.connect(db_url)
+        conn.autocommit = True
+    except Exception as e:
+        print(f"[ERROR] Heartbeat connection failed: {e}")
+        return
+    try:
+        while not stop_event.wait(JOB_HEARTBEAT_INTERVAL):
+            with conn.cursor() as cur:
+                cur.execute(HEARTBEAT_SQL, ([str(job_id)], runner_id))
+    except Exception as e:
+        print(f"[ERROR] Heartbeat failed: {e}")
+    finally:
+        conn.close()
+
 
 def run_job(job_id):
     print(f"[START] Job runner for ID: {job_id}")
-    
+    runner_id = f"job:{socket.gethostname()}:{os.getpid()}"
+    stop_heartbeat = threading.Event()
+
     # 1. Connect to Postgres
     try:
         db_url = os.environ.get('DATABASE_URL')
         if not db_url:
             raise ValueError("DATABASE_URL env var missing")
-            
+
         conn_pg = psycopg2.connect(db_url)
         cur_pg = conn_pg.cursor()
         print("[OK] Connected to PostgreSQL")
@@ -24,91 +107,332 @@ def run_job(job_id):
 
     try:
         # 2. Get Job Details
-        cur_pg.execute("SELECT mdx_query, catalog_code FROM jobs WHERE id = %s", (job_id,))
+        cur_pg.execute("SELECT mdx_query, catalog_code, status FROM jobs WHERE id = %s", (job_id,))
         job = cur_pg.fetchone()
-        
+
         if not job:
             print(f"[ERROR] Job {job_id} not found in database")
             sys.exit(1)
 
-        mdx_query, catalog = job
+        mdx_query, catalog, status = job
         print(f"[INFO] Job found: Catalog={catalog}")
         print(f"[INFO] MDX Query length: {len(mdx_query)} chars")
 
-        # 3. Update Status -> RUNNING
-        cur_pg.execute("UPDATE jobs SET status = 'RUNNING', updated_at = NOW() WHERE id = %s", (job_id,))
+        # 3. Claim it -> RUNNING (only if no worker claimed it first). Claimed
+        # and heartbeated like a worker job: if this runner dies, REQUEUE_SQL
+        # puts the job back in the queue
+        cur_pg.execute(
+            "UPDATE jobs SET status = 'RUNNING', claimed_by = %s, claimed_at = NOW(), "
+            "heartbeat_at = NOW(), attempts = attempts + 1 "
+            "WHERE id = %s AND status IN ('PENDING', 'FAILED')",
+            (runner_id, job_id)
+        )
         conn_pg.commit()
-        
+        if cur_pg.rowcount == 0:
+            print(f"[SKIP] Job is already {status}, nothing to do")
+            return
+        threading.Thread(
+            target=_heartbeat_job, args=(db_url, job_id, runner_id, stop_heartbeat),
+            name='heartbeat', daemon=True
+        ).start()
+
         # 4. Connect to OLAP Server
         print("[CONNECT] Connecting to OLAP server...")
-        conn_str = (
-            f"Provider=MSOLAP;Data Source={os.environ['DGIS_SERVER']};"
-            f"Initial Catalog={catalog};"
-            f"User ID={os.environ['DGIS_USER']};"
-            f"Password={os.environ['DGIS_PASSWORD']};"
-        )
-        
-        conn_olap = adodbapi.connect(conn_str)
-        cur_olap = conn_olap.cursor()
+        conn_olap = olap_connect(catalog)
         print("[OK] Connected to OLAP server")
-        
-        # 5. Execute MDX
-        print("[EXEC] Executing MDX query...")
-        start_time = datetime.now()
-        cur_olap.execute(mdx_query)
-        
-        # Fetch data
-        data = cur_olap.fetchall()
-        duration = (datetime.now() - start_time).total_seconds()
-        print(f"[OK] Query executed in {duration:.2f}s. Rows: {len(data)}")
-        
-        # 6. Process Results
-        # Get column names
-        column_names = [d[0] for d in cur_olap.description]
-        
-        # Convert rows to serializable format
-        # adodbapi returns pywintypes for some things, need to ensure standard types
-        result_rows = []
-        for row in data:
-            result_rows.append([str(cell) if cell is not None else None for cell in row])
-            
-        result_json = {
-            'columns': column_names,
-            'data': result_rows,
-            'count': len(result_rows),
-            'duration_seconds': duration,
-            'executed_at': datetime.now().isoformat()
-        }
-        
+
+        # 5-6. Execute MDX and process results
+        result_json = execute_mdx(conn_olap, mdx_query)
+
         # 7. Update Status -> COMPLETED
         print("[SAVE] Saving results to database...")
-        cur_pg.execute(
-            "UPDATE jobs SET status = 'COMPLETED', result_data = %s, updated_at = NOW() WHERE id = %s", 
-            (json.dumps(result_json), job_id)
-        )
+        cur_pg.execute(FINISH_SQL, ('COMPLETED', json.dumps(result_json), None, job_id, runner_id))
         conn_pg.commit()
-        print("[SUCCESS] Job completed successfully")
-        
+        if cur_pg.rowcount == 0:
+            print("[WARN] Job was requeued while running, result discarded")
+        else:
+            print("[SUCCESS] Job completed successfully")
+
     except Exception as e:
         print(f"[ERROR] Error during execution: {e}")
         # Try to log error to DB
         try:
-            cur_pg.execute(
-                "UPDATE jobs SET status = 'FAILED', error_message = %s, updated_at = NOW() WHERE id = %s", 
-                (str(e), job_id)
-            )
+            conn_pg.rollback()
+            cur_pg.execute(FINISH_SQL, ('FAILED', None, str(e), job_id, runner_id))
             conn_pg.commit()
         except:
             print("[ERROR] Could not save error state to DB")
         sys.exit(1)
-        
+
     finally:
+        stop_heartbeat.set()
         if 'conn_olap' in locals(): conn_olap.close()
         if 'conn_pg' in locals(): conn_pg.close()
 
+
+# ========== WORKER MODE ==========
+# Requires migrations/010_jobs_queue.sql
+
+CLAIM_SQL = """
+    UPDATE jobs
+    SET status = 'RUNNING', claimed_by = %s, claimed_at = NOW(),
+        heartbeat_at = NOW(), attempts = attempts + 1
+    WHERE id = (
+        SELECT id FROM jobs
+        WHERE status = 'PENDING'
+        ORDER BY created_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, catalog_code, mdx_query, attempts
+"""
+
+HEARTBEAT_SQL = """
+    UPDATE jobs SET heartbeat_at = NOW()
+    WHERE id = ANY(%s::uuid[]) AND status = 'RUNNING' AND claimed_by = %s
+"""
+
+# Jobs whose worker stopped heartbeating go back to the queue (or fail for good)
+REQUEUE_SQL = """
+    UPDATE jobs
+    SET status = CASE WHEN attempts >= %(max_attempts)s THEN 'FAILED' ELSE 'PENDING' END,
+        error_message = CASE WHEN attempts >= %(max_attempts)s
+            THEN 'Worker heartbeat lost after ' || attempts || ' attempts'
+            ELSE error_message END,
+        claimed_by = NULL,
+        heartbeat_at = NULL
+    WHERE id IN (
+        SELECT id FROM jobs
+        WHERE status = 'RUNNING'
+          -- NULL heartbeat: set RUNNING by a runner older than 010_jobs_queue
+          AND coalesce(heartbeat_at, updated_at) < NOW() - make_interval(secs => %(stale_after)s)
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, status
+"""
+
+# Results are only written while this worker still owns the job
+FINISH_SQL = """
+    UPDATE jobs
+    SET status = %s, result_data = %s, error_message = %s, heartbeat_at = NULL
+    WHERE id = %s AND status = 'RUNNING' AND claimed_by = %s
+"""
+
+
+@contextmanager
+def pg_cursor(pg_pool):
+    """Cursor on a pooled connection; commits on success, rolls back on error"""
+    conn = pg_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            yield cur
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pg_pool.putconn(conn)
+
+
+class OlapConnections(threading.local):
+    """Per-thread OLAP connections by catalog, reused across jobs
+
+    adodbapi connections are COM objects bound to the thread that created
+    them, so each executor thread keeps its own set.
+    """
+
+    def __init__(self):
+        self.by_catalog = {}
+
+    def get(self, catalog):
+        conn = self.by_catalog.get(catalog)
+        if conn is None:
+            print(f"[CONNECT] Connecting to OLAP server (catalog {catalog})...")
+            conn = olap_connect(catalog)
+            self.by_catalog[catalog] = conn
+        return conn
+
+    def discard(self, catalog):
+        conn = self.by_catalog.pop(catalog, None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def _init_thread():
+    if COM_AVAILABLE:
+        pythoncom.CoInitialize()
+
+
+class JobWorker:
+    """Long-running queue consumer: claims PENDING jobs with SKIP LOCKED and runs them concurrently"""
+
+    def __init__(self, db_url, concurrency=JOB_WORKER_CONCURRENCY, poll_interval=JOB_POLL_INTERVAL,
+                 heartbeat_interval=JOB_HEARTBEAT_INTERVAL, stale_after=JOB_STALE_AFTER,
+                 max_attempts=JOB_MAX_ATTEMPTS, exit_when_idle=False):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.exit_when_idle = exit_when_idle
+
+        # Executor threads + heartbeat thread + claim loop
+        self.pg_pool = pool.ThreadedConnectionPool(1, concurrency + 2, db_url)
+        self.olap = OlapConnections()
+        self.stop_event = threading.Event()
+        self._running = {}
+        self._lock = threading.Lock()
+
+    # ---- queue operations ----
+
+    def claim(self):
+        with pg_cursor(self.pg_pool) as cur:
+            cur.execute(CLAIM_SQL, (self.worker_id,))
+            return cur.fetchone()
+
+    def heartbeat(self):
+        with self._lock:
+            job_ids = list(self._running.values())
+        if not job_ids:
+            return
+        with pg_cursor(self.pg_pool) as cur:
+            cur.execute(HEARTBEAT_SQL, (job_ids, self.worker_id))
+
+    def requeue_stale(self):
+        with pg_cursor(self.pg_pool) as cur:
+            cur.execute(REQUEUE_SQL, {'max_attempts': self.max_attempts, 'stale_after': self.stale_after})
+            requeued = cur.fetchall()
+        for job_id, status in requeued:
+            print(f"[REQUEUE] Job {job_id} had a stale heartbeat -> {status}")
+
+    def finish(self, job_id, status, result_json=None, error=None):
+        with pg_cursor(self.pg_pool) as cur:
+            cur.execute(FINISH_SQL, (
+                status,
+                json.dumps(result_json) if result_json is not None else None,
+                error,
+                job_id,
+                self.worker_id
+            ))
+            if cur.rowcount == 0:
+                print(f"[WARN] Job {job_id} was requeued by another worker, result discarded")
+
+    # ---- execution ----
+
+    def process(self, job):
+        job_id, catalog, mdx_query, attempts = job
+        tag = f"[JOB {job_id}]"
+        print(f"{tag} Catalog={catalog}, attempt {attempts}, MDX {len(mdx_query)} chars")
+        try:
+            try:
+                result_json = execute_mdx(self.olap.get(catalog), mdx_query, tag)
+            except Exception:
+                # Connection may be broken: never reuse it
+                self.olap.discard(catalog)
+                raise
+            self.finish(job_id, 'COMPLETED', result_json=result_json)
+            print(f"[SUCCESS] {tag} Job completed successfully")
+        except Exception as e:
+            print(f"[ERROR] {tag} Error during execution: {e}")
+            try:
+                self.finish(job_id, 'FAILED', error=str(e))
+            except Exception as db_error:
+                # The heartbeat stops with this job; it will be requeued as stale
+                print(f"[ERROR] {tag} Could not save error state to DB: {db_error}")
+
+    def _heartbeat_loop(self):
+        while not self.stop_event.wait(self.heartbeat_interval):
+            try:
+                self.heartbeat()
+                self.requeue_stale()
+            except Exception as e:
+                print(f"[ERROR] Heartbeat failed: {e}")
+
+    def run(self):
+        print(f"[START] Job worker {self.worker_id} (concurrency {self.concurrency})")
+        heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name='heartbeat', daemon=True)
+        heartbeat_thread.start()
+        processed = 0
+
+        try:
+            self.requeue_stale()
+            with ThreadPoolExecutor(self.concurrency, thread_name_prefix='job', initializer=_init_thread) as executor:
+                while not self.stop_event.is_set() or self._running:
+                    # Fill free slots with claimed jobs
+                    while not self.stop_event.is_set() and len(self._running) < self.concurrency:
+                        try:
+                            job = self.claim()
+                        except Exception as e:
+                            print(f"[ERROR] Failed to claim job: {e}")
+                            break
+                        if job is None:
+                            break
+                        with self._lock:
+                            self._running[executor.submit(self.process, job)] = str(job[0])
+
+                    if not self._running:
+                        if self.exit_when_idle:
+                            print("[INFO] Queue is empty, exiting")
+                            break
+                        self.stop_event.wait(self.poll_interval)
+                        continue
+
+                    done, _ = wait(list(self._running), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    with self._lock:
+                        for future in done:
+                            del self._running[future]
+                    processed += len(done)
+        finally:
+            self.stop_event.set()
+            heartbeat_thread.join(timeout=5)
+            self.pg_pool.closeall()
+
+        print(f"[DONE] Worker {self.worker_id} processed {processed} jobs")
+
+    def stop(self, *_):
+        if not self.stop_event.is_set():
+            print("[STOP] Finishing running jobs, no new jobs will be claimed")
+        self.stop_event.set()
+
+
+def run_worker(args):
+    db_url = os.environ.get('DATABASE_URL')
+    if not db_url:
+        print("[ERROR] DATABASE_URL env var missing")
+        sys.exit(1)
+
+    worker = JobWorker(
+        db_url,
+        concurrency=args.concurrency,
+        poll_interval=args.poll_interval,
+        heartbeat_interval=args.heartbeat_interval,
+        stale_after=args.stale_after,
+        max_attempts=args.max_attempts,
+        exit_when_idle=args.exit_when_idle
+    )
+    signal.signal(signal.SIGINT, worker.stop)
+    signal.signal(signal.SIGTERM, worker.stop)
+    worker.run()
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('--job-id', required=True, help='UUID of the job to run')
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--job-id', help='UUID of the job to run')
+    mode.add_argument('--worker', action='store_true', help='Consume PENDING jobs until stopped')
+    parser.add_argument('--concurrency', type=int, default=JOB_WORKER_CONCURRENCY, help='Jobs run at once (worker)')
+    parser.add_argument('--poll-interval', type=float, default=JOB_POLL_INTERVAL, help='Seconds between polls when idle')
+    parser.add_argument('--heartbeat-interval', type=float, default=JOB_HEARTBEAT_INTERVAL, help='Seconds between heartbeats')
+    parser.add_argument('--stale-after', type=float, default=JOB_STALE_AFTER, help='Seconds without heartbeat before requeue')
+    parser.add_argument('--max-attempts', type=int, default=JOB_MAX_ATTEMPTS, help='Claims before a stale job is FAILED')
+    parser.add_argument('--exit-when-idle', action='store_true', help='Exit once the queue is empty (CI runners)')
     args = parser.parse_args()
-    
-    run_job(args.job_id)
+
+    if args.worker:
+        run_worker(args)
+    else:
+        run_job(args.job_id)
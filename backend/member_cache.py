@@ -0,0 +1,573 @@
+"""
+Member Cache - Normalización e índice de búsqueda de miembros OLAP
+
+Las columnas normalizadas (casefold + sin acentos) se calculan UNA vez al
+cargar el cache de miembros, de modo que "Vacunación", "VACUNACION" y
+"vacunacion" coinciden sin volver a convertir millones de strings por request.
+"""
+
+import base64
+import json
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Sufijo de las columnas normalizadas (ej: MIEMBRO_CAPTION -> MIEMBRO_CAPTION_NORM)
+NORM_SUFFIX = '_NORM'
+
+# Columnas que se normalizan al cargar el cache
+NORMALIZED_COLUMNS = ['MIEMBRO_CAPTION', 'JERARQUIA', 'DIMENSION', 'NIVEL_NOMBRE']
+
+# Columnas de baja cardinalidad: se guardan como category
+CATEGORICAL_COLUMNS = {'JERARQUIA', 'DIMENSION', 'NIVEL_NOMBRE'}
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Segmento MDX entre corchetes (']]' es un corchete escapado)
+_SEGMENT = r'\[(?:[^\]]|\]\])*\]'
+
+# [Dim].[Jerarquía].[Nivel opcional].&[k1].&[k2]&[k3] ...
+_UNIQUE_NAME_RE = (
+    rf'^(?P<dim>{_SEGMENT})'
+    rf'(?:\.(?P<hier>{_SEGMENT}))?'
+    rf'(?:\.(?P<level>{_SEGMENT}))?'
+    rf'(?:\.(?P<keys>&{_SEGMENT}(?:\.?&{_SEGMENT})*))?$'
+)
+
+# Columnas derivadas de MIEMBRO_UNIQUE_NAME (se guardan con el cache)
+UNIQUE_NAME_COLUMNS = [
+    'UN_DIMENSION',      # [DIM UNIDAD]
+    'UN_JERARQUIA',      # [DIM UNIDAD].[CLUES]
+    'UN_NIVEL',          # Nivel explícito en el nombre (ej: Entidad) o ''
+    'UN_CLAVE',          # Ruta de claves: &[3].&[6]&[4]
+    'UN_PROFUNDIDAD',    # Número de segmentos '.&[' (compatible con cubos viejos)
+    'UN_CLAVE_PADRE',    # Ruta de claves sin el último segmento
+]
+
+# Con menos candidatos que esto, los términos restantes se verifican sobre el caption
+_VERIFY_THRESHOLD = 2000
+
+
+def _clean(value) -> str:
+    """Convierte NaN/None a '' para respuestas JSON"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    return str(value)
+
+
+def normalize_text(text) -> str:
+    """Normaliza texto para búsqueda: casefold y elimina acentos
+
+    Examples:
+        >>> normalize_text("Vacunación")
+        'vacunacion'
+        >>> normalize_text("NIÑOS")
+        'ninos'
+    """
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(text).casefold())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def normalize_series(series: pd.Series) -> pd.Series:
+    """Normaliza una columna completa calculando cada valor distinto una sola vez"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    normalized = np.array([normalize_text(v) for v in uniques] + [''], dtype=object)
+    # El sentinel -1 (NaN) apunta al '' agregado al final
+    return pd.Series(normalized[codes], index=series.index, dtype=object)
+
+
+def add_normalized_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega columnas *_NORM al DataFrame de miembros (in place, idempotente)"""
+    for col in NORMALIZED_COLUMNS:
+        norm_col = f"{col}{NORM_SUFFIX}"
+        if col not in df.columns or norm_col in df.columns:
+            continue
+        normalized = normalize_series(df[col])
+        if col in CATEGORICAL_COLUMNS:
+            normalized = normalized.astype('category')
+        df[norm_col] = normalized
+    return df
+
+
+def contains_normalized(df: pd.DataFrame, column: str, needle: str) -> pd.Series:
+    """Máscara booleana: ¿la columna normalizada contiene `needle`?
+
+    Para columnas categóricas evalúa solo las categorías (decenas) en vez
+    de cada fila (millones).
+    """
+    norm_col = f"{column}{NORM_SUFFIX}"
+    if norm_col not in df.columns:
+        if column not in df.columns:
+            return pd.Series(False, index=df.index)
+        add_normalized_columns(df)
+    values = df[norm_col]
+    target = normalize_text(needle)
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        matching = categories[categories.str.contains(target, regex=False)]
+        return values.isin(matching)
+
+    return values.str.contains(target, regex=False, na=False)
+
+
+def parse_unique_names(unique_names: pd.Series) -> pd.DataFrame:
+    """Descompone MIEMBRO_UNIQUE_NAME en columnas estructuradas (vectorizado)
+
+    Examples:
+        [DIM VARIABLES].[Apartado y Variable].&[76].&[3]
+            -> jerarquía [DIM VARIABLES].[Apartado y Variable], nivel '',
+               clave &[76].&[3], profundidad 2, clave padre &[76]
+        [D Clues].[Unidad médica].[Entidad].&[1]
+            -> nivel 'Entidad', clave &[1], profundidad 1, clave padre ''
+    """
+    names = unique_names.astype(object).where(unique_names.notna(), '')
+    parts = names.str.extract(_UNIQUE_NAME_RE).fillna('')
+
+    keys = parts['keys']
+    result = pd.DataFrame(index=unique_names.index)
+    result['UN_DIMENSION'] = parts['dim']
+    result['UN_JERARQUIA'] = (parts['dim'] + '.' + parts['hier']).where(parts['hier'] != '', '')
+    result['UN_NIVEL'] = parts['level'].str.slice(1, -1).str.replace(']]', ']', regex=False)
+    result['UN_CLAVE'] = keys
+    result['UN_PROFUNDIDAD'] = names.str.count(r'\.&\[').astype(np.int16)
+    result['UN_CLAVE_PADRE'] = keys.str.extract(r'^(.*)\.&\[', expand=False).fillna('')
+    return result
+
+
+def add_unique_name_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Agrega columnas UN_* al DataFrame de miembros (in place, idempotente)
+
+    Se ejecuta al construir el cache; al cargar un cache que ya las trae
+    solo se ajustan los tipos.
+    """
+    if 'MIEMBRO_UNIQUE_NAME' not in df.columns:
+        return df
+
+    if not all(col in df.columns for col in UNIQUE_NAME_COLUMNS):
+        parsed = parse_unique_names(df['MIEMBRO_UNIQUE_NAME'])
+        for col in UNIQUE_NAME_COLUMNS:
+            df[col] = parsed[col]
+    else:
+        # Cache CSV: los strings vacíos vuelven como NaN
+        for col in UNIQUE_NAME_COLUMNS:
+            if col == 'UN_PROFUNDIDAD':
+                df[col] = df[col].fillna(0).astype(np.int16)
+            else:
+                df[col] = df[col].fillna('').astype(object)
+
+    for col in ('UN_DIMENSION', 'UN_JERARQUIA', 'UN_NIVEL'):
+        df[col] = df[col].astype('category')
+    return df
+
+
+class MemberSearchIndex:
+    """Índice invertido de tokens (+ trigramas) sobre captions normalizados
+
+    - Cada caption distinto se indexa una vez; los miembros repetidos
+      comparten posting.
+    - Un término encuentra tokens por prefijo (typeahead) y, con 3+ letras,
+      también por subcadena vía trigramas.
+    - Ranking: coincidencia exacta > prefijo del caption > resto,
+      desempatando por longitud del caption.
+    """
+
+    # Columnas que usa el índice (basta decodificar estas)
+    COLUMNS = ['MIEMBRO_CAPTION', f'MIEMBRO_CAPTION{NORM_SUFFIX}', 'MIEMBRO_UNIQUE_NAME', 'JERARQUIA', 'NIVEL_NOMBRE']
+
+    def __init__(self, df_members: pd.DataFrame):
+        df = df_members.reset_index(drop=True)
+        if f'MIEMBRO_CAPTION{NORM_SUFFIX}' not in df.columns:
+            add_normalized_columns(df)
+        self._df = df
+
+        # Captions distintos -> filas
+        codes, uniques = pd.factorize(df[f'MIEMBRO_CAPTION{NORM_SUFFIX}'])
+        self._row_codes = codes
+        self._captions = np.asarray(uniques, dtype=object)
+        self._lengths = np.fromiter((len(c) for c in self._captions), dtype=np.int32, count=len(self._captions))
+        self._row_order = np.argsort(codes, kind='stable')
+        self._row_offsets = np.searchsorted(codes[self._row_order], np.arange(len(self._captions) + 1))
+
+        # Códigos de jerarquía / nivel para filtros sin comparar strings
+        self._hier_codes, self._hier_lookup = self._factorize_column('JERARQUIA')
+        self._level_codes, self._level_lookup = self._factorize_column('NIVEL_NOMBRE')
+
+        # Orden alfabético de captions para rangos de prefijo
+        self._sorted_ids = np.argsort(self._captions, kind='stable')
+        self._sorted_captions = self._captions[self._sorted_ids].tolist()
+        self._sort_rank = np.empty(len(self._captions), dtype=np.int64)
+        self._sort_rank[self._sorted_ids] = np.arange(len(self._captions))
+        self._caption_lookup = {c: i for i, c in enumerate(self._captions)}
+
+        # Tokens -> captions
+        postings = defaultdict(list)
+        for caption_id, caption in enumerate(self._captions):
+            for token in set(_TOKEN_RE.findall(caption)):
+                postings[token].append(caption_id)
+        self._vocab = sorted(postings)
+        self._postings = [np.asarray(postings[t], dtype=np.int32) for t in self._vocab]
+
+        # Trigramas -> tokens (búsqueda por subcadena)
+        grams = defaultdict(list)
+        for token_id, token in enumerate(self._vocab):
+            for gram in {token[i:i + 3] for i in range(len(token) - 2)}:
+                grams[gram].append(token_id)
+        self._trigrams = {g: np.asarray(ids, dtype=np.int32) for g, ids in grams.items()}
+
+    def _factorize_column(self, column: str):
+        if column not in self._df.columns:
+            return None, {}
+        codes, uniques = pd.factorize(self._df[column])
+        return codes, {str(v): i for i, v in enumerate(uniques)}
+
+    def __len__(self) -> int:
+        return len(self._df)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        return self._df
+
+    def _token_ids_for_term(self, term: str) -> np.ndarray:
+        lo = bisect_left(self._vocab, term)
+        hi = bisect_left(self._vocab, term + '\uffff')
+        ids = np.arange(lo, hi, dtype=np.int32)
+
+        if len(term) >= 3:
+            candidates = None
+            for i in range(len(term) - 2):
+                posting = self._trigrams.get(term[i:i + 3])
+                if posting is None:
+                    candidates = None
+                    break
+                candidates = posting if candidates is None else np.intersect1d(candidates, posting, assume_unique=True)
+            if candidates is not None and candidates.size:
+                substr = [t for t in candidates if term in self._vocab[t]]
+                ids = np.union1d(ids, np.asarray(substr, dtype=np.int32))
+        return ids
+
+    def _caption_ids_for_tokens(self, token_ids: np.ndarray) -> np.ndarray:
+        if token_ids.size == 0:
+            return np.empty(0, dtype=np.int32)
+        if token_ids.size == 1:
+            return self._postings[token_ids[0]]
+        hit = np.zeros(len(self._captions), dtype=bool)
+        for t in token_ids:
+            hit[self._postings[t]] = True
+        return np.flatnonzero(hit).astype(np.int32)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        hierarchy: Optional[str] = None,
+        level: Optional[str] = None
+    ) -> List[Dict]:
+        """Busca miembros por caption (insensible a acentos y mayúsculas)
+
+        Args:
+            query: Texto libre (uno o más términos, todos deben coincidir)
+            limit: Máximo de resultados
+            hierarchy: Restringir a una jerarquía (unique name)
+            level: Restringir a un nivel (NIVEL_NOMBRE)
+
+        Returns:
+            Lista ordenada por relevancia con caption, uniqueName, hierarchy, level
+        """
+        q = normalize_text(query).strip()
+        terms = set(_TOKEN_RE.findall(q))
+        if not terms or limit <= 0:
+            return []
+
+        # El término más selectivo (menos postings) va al índice; el resto se
+        # intersecta vía índice o, si quedan pocos candidatos, se verifica
+        # directamente sobre el caption
+        matched = [(term, self._token_ids_for_term(term)) for term in terms]
+        matched.sort(key=lambda tm: sum(len(self._postings[t]) for t in tm[1]))
+
+        caption_ids = self._caption_ids_for_tokens(matched[0][1])
+        for term, token_ids in matched[1:]:
+            if caption_ids.size == 0:
+                return []
+            if caption_ids.size <= _VERIFY_THRESHOLD:
+                pattern = re.compile(re.escape(term) if len(term) >= 3 else r'(?<!\w)' + re.escape(term))
+                keep = [cid for cid in caption_ids if pattern.search(self._captions[cid])]
+                caption_ids = np.asarray(keep, dtype=np.int32)
+            else:
+                hit = np.zeros(len(self._captions), dtype=bool)
+                hit[self._caption_ids_for_tokens(token_ids)] = True
+                caption_ids = caption_ids[hit[caption_ids]]
+        if caption_ids.size == 0:
+            return []
+
+        # Restringir por jerarquía / nivel a nivel de caption
+        row_mask = None
+        if hierarchy:
+            row_mask = self._code_mask(self._hier_codes, self._hier_lookup, hierarchy)
+        if level:
+            level_mask = self._code_mask(self._level_codes, self._level_lookup, level)
+            row_mask = level_mask if row_mask is None else row_mask & level_mask
+        if row_mask is not None:
+            allowed = np.zeros(len(self._captions), dtype=bool)
+            allowed[self._row_codes[row_mask]] = True
+            caption_ids = caption_ids[allowed[caption_ids]]
+            if caption_ids.size == 0:
+                return []
+
+        # Ranking: 0 = exacto, 1 = prefijo del caption, 2 = resto; luego longitud
+        lo = bisect_left(self._sorted_captions, q)
+        hi = bisect_left(self._sorted_captions, q + '\uffff')
+        ranks = self._sort_rank[caption_ids]
+        tier = np.where((ranks >= lo) & (ranks < hi), 1, 2).astype(np.int64)
+        exact = self._caption_lookup.get(q)
+        if exact is not None:
+            tier[caption_ids == exact] = 0
+        key = tier * (int(self._lengths.max()) + 1) + self._lengths[caption_ids]
+
+        # Cada caption aporta al menos una fila válida: bastan los `limit` mejores
+        if caption_ids.size > limit:
+            top = np.argpartition(key, limit - 1)[:limit]
+            caption_ids, key = caption_ids[top], key[top]
+        ranked = caption_ids[np.lexsort((caption_ids, key))]
+
+        results = []
+        for caption_id in ranked:
+            rows = self._row_order[self._row_offsets[caption_id]:self._row_offsets[caption_id + 1]]
+            for row in rows:
+                if row_mask is not None and not row_mask[row]:
+                    continue
+                record = self._df.iloc[row]
+                results.append({
+                    'caption': _clean(record.get('MIEMBRO_CAPTION')),
+                    'uniqueName': _clean(record.get('MIEMBRO_UNIQUE_NAME')),
+                    'hierarchy': _clean(record.get('JERARQUIA')),
+                    'level': _clean(record.get('NIVEL_NOMBRE'))
+                })
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def _code_mask(self, codes: Optional[np.ndarray], lookup: Dict[str, int], value: str) -> np.ndarray:
+        if codes is None or value not in lookup:
+            return np.zeros(len(self._df), dtype=bool)
+        return codes == lookup[value]
+
+
+class MemberTreeIndex:
+    """Índice padre -> hijos directos de UNA jerarquía (navegación en árbol)
+
+    El padre sale de PARENT_UNIQUE_NAME cuando el cache lo trae; en caches
+    viejos se deriva de la ruta de claves del unique name (UN_CLAVE_PADRE).
+    Los miembros cuyo padre no está en la jerarquía (ej. el miembro All,
+    que se filtra al descargar) son raíces.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = add_unique_name_columns(df.copy()) if 'UN_CLAVE_PADRE' not in df.columns else df
+        n = len(df)
+
+        self._captions = df['MIEMBRO_CAPTION'].to_numpy(dtype=object) if 'MIEMBRO_CAPTION' in df.columns \
+            else np.full(n, '', dtype=object)
+        self._unique = df['MIEMBRO_UNIQUE_NAME'].astype(object).where(
+            df['MIEMBRO_UNIQUE_NAME'].notna(), '').to_numpy(dtype=object)
+        self._levels = self._level_names(df)
+        parents = self._parent_names(df)
+
+        # Agrupar filas por padre conservando el orden del servidor
+        is_root = ~pd.Series(parents).isin(set(self._unique)).to_numpy()
+        parent_keys = np.where(is_root, '', parents)
+        codes, uniques = pd.factorize(parent_keys)
+        self._order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes, minlength=len(uniques))
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+        self._slot = {key: i for i, key in enumerate(uniques)}
+
+        # Hijos reales por miembro (0 si no es padre de nadie)
+        slots = pd.Series(self._unique).map(self._slot)
+        self._child_counts = np.where(
+            slots.notna(), counts[slots.fillna(0).astype(int).to_numpy()], 0
+        ).astype(np.int64)
+
+        # CHILDREN_CARDINALITY del servidor cuando existe (puede ser estimado)
+        if 'CHILDREN_CARDINALITY' in df.columns:
+            server = pd.to_numeric(df['CHILDREN_CARDINALITY'], errors='coerce').to_numpy()
+            self._cardinality = np.where(np.isnan(server), self._child_counts, server).astype(np.int64)
+        else:
+            self._cardinality = self._child_counts
+
+    @staticmethod
+    def _parent_names(df: pd.DataFrame) -> np.ndarray:
+        derived = (df['UN_JERARQUIA'].astype(object) + '.' + df['UN_CLAVE_PADRE'].astype(object)).where(
+            df['UN_CLAVE_PADRE'].astype(object) != '', '')
+        if 'PARENT_UNIQUE_NAME' in df.columns:
+            explicit = df['PARENT_UNIQUE_NAME'].astype(object)
+            derived = explicit.where(explicit.notna() & (explicit != ''), derived)
+        return derived.fillna('').to_numpy(dtype=object)
+
+    @staticmethod
+    def _level_names(df: pd.DataFrame) -> np.ndarray:
+        generic = 'Nivel ' + df['UN_PROFUNDIDAD'].astype(str)
+        levels = df['UN_NIVEL'].astype(object).where(df['UN_NIVEL'].astype(object) != '', generic)
+        if 'NIVEL_NOMBRE' in df.columns:
+            explicit = df['NIVEL_NOMBRE'].astype(object)
+            levels = explicit.where(explicit.notna() & (explicit != ''), levels)
+        return levels.to_numpy(dtype=object)
+
+    def __len__(self) -> int:
+        return len(self._unique)
+
+    def children(self, parent: Optional[str] = None, offset: int = 0, limit: int = 100) -> Dict:
+        """Hijos directos de `parent` (raíces si es None/''), paginados"""
+        slot = self._slot.get(parent or '')
+        if slot is None:
+            start = end = 0
+        else:
+            start, end = int(self._offsets[slot]), int(self._offsets[slot + 1])
+
+        rows = self._order[start + offset:min(end, start + offset + limit)] if offset >= 0 else []
+        return {
+            'parent': parent or None,
+            'total': end - start,
+            'offset': offset,
+            'limit': limit,
+            'items': [
+                {
+                    'caption': _clean(self._captions[i]),
+                    'uniqueName': self._unique[i],
+                    'level': _clean(self._levels[i]),
+                    'childrenCardinality': int(self._cardinality[i]),
+                    'hasChildren': bool(self._child_counts[i] > 0)
+                }
+                for i in rows
+            ]
+        }
+
+
+class MemberLevelIndex:
+    """Miembros de UN nivel preordenados para paginación keyset
+
+    Cada orden (`ordinal`, `caption`) se calcula una sola vez; una página es
+    una búsqueda binaria del cursor más un slice, así que el costo por página
+    es constante sin importar qué tan adentro del nivel esté el cursor.
+    """
+
+    # Campo de la API -> columna del cache
+    FIELDS = {
+        'caption': 'MIEMBRO_CAPTION',
+        'uniqueName': 'MIEMBRO_UNIQUE_NAME',
+        'key': 'MIEMBRO_KEY',
+        'ordinal': 'MIEMBRO_ORDINAL',
+        'level': 'NIVEL_NOMBRE',
+        'parent': 'PARENT_UNIQUE_NAME',
+        'childrenCardinality': 'CHILDREN_CARDINALITY',
+    }
+    DEFAULT_FIELDS = ('caption', 'uniqueName')
+    SORTS = ('ordinal', 'caption')
+
+    def __init__(self, df: pd.DataFrame):
+        """`df` ya filtrado al nivel y en orden natural (ordinal) del servidor"""
+        self._columns = {
+            field: df[col].to_numpy(dtype=object)
+            for field, col in self.FIELDS.items() if col in df.columns
+        }
+        n = len(df)
+        unique = self._columns.get('uniqueName', np.full(n, '', dtype=object))
+        unique = np.array([_clean(u) for u in unique], dtype=object)
+
+        captions = df[f'MIEMBRO_CAPTION{NORM_SUFFIX}'].to_numpy(dtype=object) \
+            if f'MIEMBRO_CAPTION{NORM_SUFFIX}' in df.columns \
+            else np.array([normalize_text(c) for c in self._columns.get('caption', unique)], dtype=object)
+
+        # El cursor guarda MIEMBRO_ORDINAL (no la posición): sigue siendo
+        # válido si el nivel cambia entre página y página. Sin ordinal
+        # completo se usa la posición en el orden natural del servidor.
+        ordinals = pd.to_numeric(df['MIEMBRO_ORDINAL'], errors='coerce').to_numpy(dtype=float) \
+            if 'MIEMBRO_ORDINAL' in df.columns else np.full(n, np.nan)
+        if n and np.isnan(ordinals).any():
+            ordinals = np.arange(n, dtype=float)
+        ordinals = np.array([int(o) if o.is_integer() else o for o in ordinals], dtype=object)
+
+        by_ordinal = np.lexsort((unique, ordinals.astype(float)))
+        by_caption = np.lexsort((unique, captions))
+        self._orders = {'ordinal': by_ordinal, 'caption': by_caption}
+        # Claves (primaria, desempate) en el mismo orden que cada índice
+        self._keys = {
+            'ordinal': list(zip(ordinals[by_ordinal], unique[by_ordinal])),
+            'caption': list(zip(captions[by_caption], unique[by_caption])),
+        }
+
+    def __len__(self) -> int:
+        return len(self._orders['ordinal'])
+
+    @staticmethod
+    def encode_cursor(sort: str, key: tuple) -> str:
+        raw = json.dumps([sort, *key], ensure_ascii=False, default=int).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple:
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            sort, primary, tiebreak = json.loads(base64.urlsafe_b64decode(padded))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Cursor inválido: {cursor}") from e
+        # Tipos de la clave según el orden: compararla con bisect no debe fallar
+        numeric = isinstance(primary, (int, float)) and not isinstance(primary, bool)
+        valid_primary = numeric if sort == 'ordinal' else isinstance(primary, str)
+        if not valid_primary or not isinstance(tiebreak, str):
+            raise ValueError(f"Cursor inválido: {cursor}")
+        return sort, (primary, tiebreak)
+
+    def _item(self, i: int, fields) -> Dict:
+        item = {}
+        for field in fields:
+            values = self._columns.get(field)
+            value = None if values is None else values[i]
+            if isinstance(value, (np.integer, np.floating)):
+                value = None if np.isnan(value) else value.item()
+            elif isinstance(value, float) and np.isnan(value):
+                value = None
+            item[field] = value
+        return item
+
+    def page(
+        self,
+        sort: str = 'ordinal',
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None
+    ) -> Dict:
+        """Página de miembros después de `cursor` (desde el inicio si es None)
+
+        Raises:
+            ValueError: sort/fields desconocidos o cursor de otro orden
+        """
+        if sort not in self.SORTS:
+            raise ValueError(f"sort debe ser uno de {', '.join(self.SORTS)}")
+        fields = list(fields or self.DEFAULT_FIELDS)
+        unknown = [f for f in fields if f not in self.FIELDS]
+        if unknown:
+            raise ValueError(f"Campos desconocidos: {', '.join(unknown)}")
+
+        keys = self._keys[sort]
+        start = 0
+        if cursor:
+            cursor_sort, key = self.decode_cursor(cursor)
+            if cursor_sort != sort:
+                raise ValueError("El cursor corresponde a otro orden")
+            start = bisect_right(keys, key)
+
+        end = len(keys) if limit is None else min(len(keys), start + limit)
+        rows = self._orders[sort][start:end]
+        return {
+            'items': [self._item(i, fields) for i in rows],
+            'nextCursor': self.encode_cursor(sort, keys[end - 1]) if end < len(keys) else None,
+            'total': len(keys),
+        }
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Member Store - Almacén consolidado de miembros de todos los catálogos
+
+Los catálogos anuales (SIS_2011 ... SIS_2025) repiten casi todos sus captions,
+unique names y jerarquías. En vez de un DataFrame por catálogo, el store guarda:
+
+- Un diccionario GLOBAL de strings (cada string distinto se guarda una vez)
+- Una tabla de enteros por catálogo (código del string en el diccionario)
+
+Todo se escribe como .npy y se carga con memory-map de solo lectura, así que
+abrir el store no lee ni parsea nada: el sistema operativo pagina lo que se
+use y TODOS los workers (uvicorn/contenedores con el mismo volumen) comparten
+las mismas páginas del page cache.
+
+Cada build es una versión inmutable; CURRENT apunta a la versión publicada y
+se reemplaza atómicamente, de modo que un worker nunca ve un store a medias.
+
+Layout:
+    <store>/CURRENT                              nombre de la versión publicada
+    <store>/<version>/manifest.json
+    <store>/<version>/strings.offsets.npy        int64[n+1] - offsets en el heap
+    <store>/<version>/strings.heap.npy           uint8[...] - strings UTF-8 terminados en NUL
+    <store>/<version>/catalogs/<CATALOGO>.npy    arreglo estructurado por catálogo
+
+Usage:
+  python backend/member_store.py build --dir . --out member_store
+  python backend/member_store.py stats --store member_store
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from member_cache import add_normalized_columns, add_unique_name_columns
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+# Sufijo de los CSV de cache generados por download_members_only
+CSV_SUFFIX = '_miembros_completos_v2.csv'
+
+# Código reservado para valores nulos
+NULL_CODE = -1
+
+# Puntero a la versión publicada
+CURRENT_FILE = 'CURRENT'
+
+# Versiones anteriores que se conservan en disco. Un worker mapea todos los
+# arreglos de su versión al abrirla, así que seguir leyéndola no depende de
+# que el directorio exista (POSIX conserva los archivos mapeados aunque se
+# borren; Windows no permite borrarlos y la poda solo registra un warning)
+KEEP_VERSIONS = 2
+
+
+class StringDictionaryBuilder:
+    """Diccionario global string -> código (int32) compartido entre catálogos"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._values: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _intern(self, value) -> int:
+        value = str(value)
+        code = self._ids.get(value)
+        if code is None:
+            code = len(self._values)
+            self._ids[value] = code
+            self._values.append(value)
+        return code
+
+    def encode(self, series: pd.Series) -> np.ndarray:
+        """Codifica una columna; solo los valores distintos pasan por el dict"""
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        ids = np.fromiter((self._intern(v) for v in uniques), dtype=np.int32, count=len(uniques))
+        # El sentinel -1 de factorize cae en el NULL_CODE agregado al final
+        ids = np.append(ids, np.int32(NULL_CODE))
+        return ids[codes]
+
+    def write(self, store_dir: Path):
+        # Cada string termina en NUL: un bloque contiguo se decodifica de un
+        # solo golpe y se separa con str.split
+        encoded = [v.encode('utf-8') + b'\x00' for v in self._values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            np.cumsum(np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        heap = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        np.save(store_dir / 'strings.offsets.npy', offsets)
+        np.save(store_dir / 'strings.heap.npy', heap)
+
+
+def _is_string_column(series: pd.Series) -> bool:
+    return not (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series))
+
+
+def _encode_catalog(df: pd.DataFrame, strings: StringDictionaryBuilder) -> Tuple[np.ndarray, Dict]:
+    """Convierte el DataFrame de un catálogo en un arreglo estructurado"""
+    fields, columns = [], {}
+    string_columns, categorical_columns = [], []
+
+    for col in df.columns:
+        series = df[col]
+        if _is_string_column(series):
+            columns[col] = strings.encode(series)
+            fields.append((col, '<i4'))
+            string_columns.append(col)
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                categorical_columns.append(col)
+        else:
+            values = series.to_numpy()
+            if values.dtype.kind not in 'biuf':
+                # Enteros nullable (Int64 con NA) -> float
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            columns[col] = values
+            fields.append((col, values.dtype.str))
+
+    table = np.empty(len(df), dtype=fields)
+    for col, values in columns.items():
+        table[col] = values
+
+    return table, {
+        'rows': len(df),
+        'string_columns': string_columns,
+        'categorical_columns': categorical_columns
+    }
+
+
+def resolve_version_dir(store_dir) -> Optional[Path]:
+    """Directorio de la versión publicada (o el propio directorio si es una versión)"""
+    store_dir = Path(store_dir)
+    if (store_dir / 'manifest.json').exists():
+        return store_dir
+    current = store_dir / CURRENT_FILE
+    if current.exists():
+        version_dir = store_dir / current.read_text(encoding='utf-8').strip()
+        if (version_dir / 'manifest.json').exists():
+            return version_dir
+    return None
+
+
+def _publish_version(store_root: Path, version: str):
+    """Apunta CURRENT a `version` de forma atómica y poda versiones viejas"""
+    tmp_current = store_root / f"{CURRENT_FILE}.tmp-{os.getpid()}"
+    tmp_current.write_text(version, encoding='utf-8')
+    os.replace(tmp_current, store_root / CURRENT_FILE)
+
+    versions = sorted(p for p in store_root.iterdir() if p.is_dir() and p.name.startswith('v'))
+    for old in versions[:-KEEP_VERSIONS]:
+        if old.name == version:
+            continue
+        try:
+            shutil.rmtree(old)
+        except OSError as e:
+            # Windows no permite borrar archivos mapeados por otro proceso
+            logger.warning(f"No se pudo eliminar la versión {old.name}: {e}")
+
+
+def build_store(csv_paths: List[Path], store_root: Path) -> Dict:
+    """Construye una nueva versión del store a partir de los CSV de cache
+
+    Las columnas derivadas (normalizadas y UN_*) se calculan aquí, de modo
+    que quien abra el store no tenga que parsear nada. La versión se escribe
+    completa en un directorio temporal y recién entonces se publica.
+
+    Returns:
+        manifest escrito en <store_root>/<version>/manifest.json
+    """
+    store_root = Path(store_root)
+    store_root.mkdir(parents=True, exist_ok=True)
+    version = datetime.now().strftime('v%Y%m%d_%H%M%S_%f')
+    tmp_dir = store_root / f".{version}.tmp-{os.getpid()}"
+    (tmp_dir / 'catalogs').mkdir(parents=True)
+
+    strings = StringDictionaryBuilder()
+    manifest = {
+        'version': STORE_VERSION,
+        'store_version': version,
+        'created': datetime.now().isoformat(),
+        'catalogs': {}
+    }
+
+    for csv_path in sorted(csv_paths):
+        catalog = csv_path.name[:-len(CSV_SUFFIX)] if csv_path.name.endswith(CSV_SUFFIX) else csv_path.stem
+        df = pd.read_csv(csv_path)
+        add_unique_name_columns(df)
+        add_normalized_columns(df)
+
+        table, info = _encode_catalog(df, strings)
+        file_name = f"catalogs/{catalog}.npy"
+        np.save(tmp_dir / file_name, table)
+
+        info.update({
+            'file': file_name,
+            'source': str(csv_path),
+            'source_mtime': csv_path.stat().st_mtime
+        })
+        manifest['catalogs'][catalog] = info
+        logger.info(f"   [OK] {catalog}: {len(df):,} miembros (diccionario: {len(strings):,} strings)")
+
+    strings.write(tmp_dir)
+    manifest['strings'] = len(strings)
+    with open(tmp_dir / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # Los archivos de una versión publicada no se vuelven a tocar
+    os.replace(tmp_dir, store_root / version)
+    _publish_version(store_root, version)
+    return manifest
+
+
+class MemberStore:
+    """Lector del store consolidado (memory-mapped, solo lectura)
+
+    Acepta la raíz del store (sigue CURRENT) o el directorio de una versión.
+    """
+
+    def __init__(self, store_dir):
+        self.root_dir = Path(store_dir)
+        version_dir = resolve_version_dir(store_dir)
+        if version_dir is None:
+            raise FileNotFoundError(f"No hay un member store publicado en {store_dir}")
+        self.store_dir = version_dir
+        with open(self.store_dir / 'manifest.json', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"Versión de store no soportada: {self.manifest.get('version')}")
+
+        # Todo se mapea al abrir: la versión queda fijada aunque luego se pode
+        self._offsets = np.load(self.store_dir / 'strings.offsets.npy', mmap_mode='r')
+        self._heap = np.load(self.store_dir / 'strings.heap.npy', mmap_mode='r')
+        self._tables: Dict[str, np.ndarray] = {
+            catalog: np.load(self.store_dir / info['file'], mmap_mode='r')
+            for catalog, info in self.manifest['catalogs'].items()
+        }
+
+    @property
+    def version(self) -> str:
+        return self.store_dir.name
+
+    @property
+    def created(self) -> float:
+        """Fecha de publicación (epoch), sin tocar el disco"""
+        return datetime.fromisoformat(self.manifest['created']).timestamp()
+
+    def is_current(self) -> bool:
+        """¿Sigue siendo esta la versión publicada?"""
+        current = self.root_dir / CURRENT_FILE
+        if not current.exists():
+            return True
+        try:
+            return current.read_text(encoding='utf-8').strip() == self.version
+        except OSError:
+            return True
+
+    @property
+    def catalogs(self) -> List[str]:
+        return list(self.manifest['catalogs'])
+
+    def __contains__(self, catalog: str) -> bool:
+        return catalog in self.manifest['catalogs']
+
+    def table(self, catalog: str) -> np.ndarray:
+        """Tabla codificada del catálogo (memory-mapped)"""
+        return self._tables[catalog]
+
+    def rows(self, catalog: str) -> int:
+        return self.manifest['catalogs'][catalog]['rows']
+
+    def rows_where(self, catalog: str, column: str, predicate: Callable[[str], bool]) -> np.ndarray:
+        """Índices de las filas cuyo valor en `column` cumple `predicate`
+
+        Se compara sobre los códigos enteros: el predicado se evalúa una vez
+        por valor distinto y no se decodifica ninguna fila.
+        """
+        codes = np.asarray(self.table(catalog)[column])
+        uniques = np.unique(codes)
+        keep = [code for code, value in zip(uniques, self.strings(uniques))
+                if value is not None and predicate(value)]
+        return np.flatnonzero(np.isin(codes, np.asarray(keep, dtype=codes.dtype)))
+
+    def string(self, code: int) -> Optional[str]:
+        if code == NULL_CODE:
+            return None
+        start, end = self._offsets[code], self._offsets[code + 1] - 1
+        return self._heap[start:end].tobytes().decode('utf-8')
+
+    def strings(self, codes: np.ndarray) -> List[Optional[str]]:
+        """Decodifica varios códigos copiando del heap una sola vez"""
+        codes = np.asarray(codes, dtype=np.int64)
+        valid = codes != NULL_CODE
+        starts = self._offsets[codes[valid]]
+        lengths = self._offsets[codes[valid] + 1] - starts
+
+        # Índices de bytes de todos los strings pedidos, contiguos
+        bounds = np.zeros(lengths.size + 1, dtype=np.int64)
+        np.cumsum(lengths, out=bounds[1:])
+        byte_idx = np.repeat(starts - bounds[:-1], lengths) + np.arange(bounds[-1], dtype=np.int64)
+        buf = self._heap[byte_idx].tobytes()
+
+        decoded = buf.decode('utf-8').split('\x00')[:-1]
+        if valid.all():
+            return decoded
+        decoded = iter(decoded)
+        return [next(decoded) if ok else None for ok in valid]
+
+    def _decode_column(self, codes: np.ndarray, categorical: bool):
+        uniques, inverse = np.unique(codes, return_inverse=True)
+        values = self.strings(uniques)
+
+        if categorical:
+            if uniques.size and uniques[0] == NULL_CODE:
+                return pd.Categorical.from_codes(inverse - 1, categories=values[1:])
+            return pd.Categorical.from_codes(inverse, categories=values)
+
+        return np.array(values, dtype=object)[inverse]
+
+    def frame(self, catalog: str, columns: Optional[List[str]] = None,
+              rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Materializa el DataFrame de un catálogo (solo decodifica, no parsea)
+
+        Con `columns` / `rows` se decodifican solo esas columnas y filas.
+        """
+        table = self.table(catalog)
+        if rows is not None:
+            table = table[rows]
+        info = self.manifest['catalogs'][catalog]
+        string_columns = set(info['string_columns'])
+        categorical_columns = set(info['categorical_columns'])
+
+        data = {}
+        for col in columns or table.dtype.names:
+            if col not in table.dtype.names:
+                continue
+            values = table[col]
+            if col in string_columns:
+                data[col] = self._decode_column(np.asarray(values), col in categorical_columns)
+            else:
+                data[col] = np.asarray(values)
+        return pd.DataFrame(data)
+
+    def nbytes(self) -> Dict[str, int]:
+        """Tamaño en disco / mapeado de cada componente"""
+        sizes = {
+            'strings.heap': int(self._heap.nbytes),
+            'strings.offsets': int(self._offsets.nbytes)
+        }
+        for catalog in self.catalogs:
+            sizes[f"catalogs/{catalog}"] = int(self.table(catalog).nbytes)
+        return sizes
+
+
+def open_store(store_dir: Optional[str] = None) -> Optional[MemberStore]:
+    """Abre el store configurado (MEMBER_STORE_DIR) si existe"""
+    store_dir = store_dir or os.getenv('MEMBER_STORE_DIR')
+    if not store_dir or resolve_version_dir(store_dir) is None:
+        return None
+    try:
+        return MemberStore(store_dir)
+    except Exception as e:
+        logger.error(f"No se pudo abrir el member store {store_dir}: {e}")
+        return None
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Member store consolidado (multi-catálogo)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_build = sub.add_parser('build', help='Construir el store desde los CSV de cache')
+    p_build.add_argument('--dir', default='.', help=f'Directorio con *{CSV_SUFFIX}')
+    p_build.add_argument('--out', default='member_store', help='Raíz del store (se publica una nueva versión)')
+
+    p_stats = sub.add_parser('stats', help='Mostrar tamaños del store')
+    p_stats.add_argument('--store', default='member_store', help='Directorio del store')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        csv_paths = sorted(Path(args.dir).glob(f'*{CSV_SUFFIX}'))
+        if not csv_paths:
+            print(f"❌ No se encontraron archivos *{CSV_SUFFIX} en {args.dir}")
+            sys.exit(1)
+        manifest = build_store(csv_paths, Path(args.out))
+        print(f"✅ Store {manifest['store_version']} publicado en {args.out}: "
+              f"{len(manifest['catalogs'])} catálogos, {manifest['strings']:,} strings distintos")
+
+    elif args.command == 'stats':
+        store = MemberStore(args.store)
+        sizes = store.nbytes()
+        rows = sum(info['rows'] for info in store.manifest['catalogs'].values())
+        print(f"Versión:   {store.version}")
+        print(f"Catálogos: {len(store.catalogs)}")
+        print(f"Miembros:  {rows:,}")
+        print(f"Strings:   {store.manifest['strings']:,}")
+        print(f"Tamaño:    {sum(sizes.values()) / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
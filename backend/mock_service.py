@@ -1,9 +1,12 @@
 
+import asyncio
 import pandas as pd
 import logging
 from typing import List, Dict, Optional, Any
 import os
 
+from member_cache import MemberLevelIndex, MemberSearchIndex, MemberTreeIndex, add_normalized_columns
+
 logger = logging.getLogger(__name__)
 
 class MockOlapService:
@@ -18,6 +21,8 @@ class MockOlapService:
              csv_path = os.path.join(os.path.dirname(__file__), csv_path)
         self.csv_path = csv_path
         self.df = None
+        self._search_indexes: Dict[str, MemberSearchIndex] = {}
+        self._level_indexes: Dict[tuple, MemberLevelIndex] = {}
         self._load_data()
 
     def _load_data(self):
@@ -27,6 +32,7 @@ class MockOlapService:
                 self.df = pd.read_csv(self.csv_path)
                 # Normalize column names just in case
                 self.df.columns = [c.upper() for c in self.df.columns]
+                add_normalized_columns(self.df)
             else:
                 logger.warning(f"Mock data file {self.csv_path} not found")
                 self.df = pd.DataFrame()
@@ -34,6 +40,13 @@ class MockOlapService:
             logger.error(f"Error loading mock data: {e}")
             self.df = pd.DataFrame()
 
+    async def metadata_version(self, catalog_name: Optional[str] = None) -> tuple:
+        """Mock metadata only changes when the CSV does."""
+        if not os.path.exists(self.csv_path):
+            return None, None
+        stat = os.stat(self.csv_path)
+        return f"mock={stat.st_mtime_ns}:{stat.st_size}", stat.st_mtime
+
     async def get_catalogs(self) -> List[Dict[str, str]]:
         """Return list of catalogs found in the CSV."""
         if self.df.empty:
@@ -96,10 +109,13 @@ class MockOlapService:
             
         return dimensions
 
-    async def get_members(self, catalog_name: str, dimension: str, hierarchy: str, level: str) -> List[Dict[str, str]]:
-        """Return members from CSV."""
+    async def get_members(self, catalog_name: str, dimension: str, hierarchy: str, level: str,
+                          limit: Optional[int] = None, cursor: Optional[str] = None,
+                          fields: Optional[List[str]] = None, sort: str = 'ordinal'):
+        """Return members from CSV (keyset-paginated like the real service)."""
+        paginated = limit is not None or cursor is not None
         if self.df.empty:
-            return []
+            return {"items": [], "nextCursor": None, "total": 0} if paginated else []
 
         # Simple filter logic - in a real DB this would be a query
         # Try to match reasonable columns. 
@@ -110,32 +126,74 @@ class MockOlapService:
         # Hierarchy often comes as [Dim].[Hier], we want the Hier part if possible, or just match strictly if the CSV has full paths?
         # The CSV has 'DIMENSION' column like 'DIM MODULO'
         
-        mask = (self.df['CATALOGO'] == catalog_name) & \
-               (self.df['DIMENSION'] == clean_dim)
-               
-        # Try to match level caption or name
-        # mask &= (self.df['NIVEL_CAPTION'] == level) # Might need fuzzy matching or strict handling
-        
-        filtered = self.df[mask]
-        
-        # If specific level requested, filter by it. 
-        # Note: 'level' arg might be unique name or caption.
-        # Let's assume caption for now as that's easier with this CSV structure
-        if not filtered.empty and level:
-             filtered = filtered[filtered['NIVEL_CAPTION'] == level]
-
-        members = []
-        # Get unique members at this level
-        unique_members = filtered[['MIEMBRO_CAPTION', 'MIEMBRO_UNIQUE_NAME']].drop_duplicates()
-        
-        for _, row in unique_members.iterrows():
-            members.append({
-                "caption": str(row['MIEMBRO_CAPTION']),
-                "uniqueName": str(row['MIEMBRO_UNIQUE_NAME']),
-                "type": "member"
-            })
-            
-        return members[:1000] # Limit return size for mock
+        key = (catalog_name, clean_dim, level)
+        index = self._level_indexes.get(key)
+        if index is None:
+            mask = (self.df['CATALOGO'] == catalog_name) & \
+                   (self.df['DIMENSION'] == clean_dim)
+            filtered = self.df[mask]
+
+            # If specific level requested, filter by it. 
+            # Note: 'level' arg might be unique name or caption.
+            # Let's assume caption for now as that's easier with this CSV structure
+            if not filtered.empty and level:
+                filtered = filtered[filtered['NIVEL_CAPTION'] == level]
+
+            # Get unique members at this level
+            index = MemberLevelIndex(filtered.drop_duplicates(subset=['MIEMBRO_CAPTION', 'MIEMBRO_UNIQUE_NAME']))
+            self._level_indexes[key] = index
+
+        if paginated:
+            return index.page(sort=sort, cursor=cursor, limit=limit, fields=fields)
+
+        # Unpaginated calls keep the old mock cap
+        items = index.page(sort=sort, limit=1000, fields=fields)['items']
+        return [{**item, "type": "member"} for item in items]
+
+    async def get_bootstrap(self, catalog_name: str) -> Dict[str, Any]:
+        """Measures + dimensions in one call, mirroring OlapService.get_bootstrap."""
+        measures, dimensions = await asyncio.gather(
+            self.get_measures(catalog_name),
+            self.get_dimensions(catalog_name)
+        )
+        return {
+            "catalog": catalog_name,
+            "cubeName": f"[{catalog_name}]",
+            "measures": measures,
+            "dimensions": dimensions,
+            "apartados": []
+        }
+
+    async def search_members(self, catalog_name: str, query: str, limit: int = 20,
+                             hierarchy: Optional[str] = None, level: Optional[str] = None) -> List[Dict[str, str]]:
+        """Accent-insensitive typeahead search over the mock CSV."""
+        if self.df.empty:
+            return []
+
+        index = self._search_indexes.get(catalog_name)
+        if index is None:
+            index = MemberSearchIndex(self.df[self.df['CATALOGO'] == catalog_name])
+            self._search_indexes[catalog_name] = index
+
+        return index.search(query, limit=limit, hierarchy=hierarchy, level=level)
+
+    async def get_children(self, catalog_name: str, hierarchy: str, parent: Optional[str] = None,
+                           offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Direct children of a member (or hierarchy roots) from the mock CSV."""
+        if self.df.empty:
+            return {"parent": parent, "total": 0, "offset": offset, "limit": limit, "items": []}
+
+        hier_df = self.df[(self.df['CATALOGO'] == catalog_name) & (self.df['JERARQUIA'] == hierarchy)]
+        return MemberTreeIndex(hier_df).children(parent, offset, limit)
+
+    async def refresh_members(self, catalog_name: str) -> Dict[str, Any]:
+        """Mock data never changes."""
+        return {"mode": "unchanged", "changed": [], "removed": [], "success": True}
+
+    async def warm_catalog(self, catalog_name: str, refresh: bool = False) -> Dict[str, int]:
+        """Pre-build the search index; everything else is already in memory."""
+        await self.search_members(catalog_name, 'a', limit=1)
+        return {"members": int((self.df['CATALOGO'] == catalog_name).sum()) if not self.df.empty else 0}
 
     async def execute_query(self, request: Dict) -> Dict:
         """Return mock query result."""
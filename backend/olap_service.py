@@ -6,9 +6,14 @@ Encapsula DGIS_SCAN_2.py para uso en entornos asyncio (FastAPI/NiceGUI)
 import sys
 import os
 import asyncio
+import logging
 import threading
-from typing import List, Dict, Optional
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Dict, Optional
 from functools import wraps
+from pathlib import Path
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 
@@ -29,8 +34,40 @@ from DGIS_SCAN_2 import (
     MDXQueryTool,
     ServerDiscovery,
     CatalogExplorer,
-    ConnectionManager
+    ConnectionManager,
+    HierarchyFetchError,
+    rows_to_df
 )
+from member_cache import MemberLevelIndex, MemberSearchIndex, MemberTreeIndex, add_unique_name_columns, normalize_text
+from member_store import open_store
+from schema_cache import MISSING, SERVER_KEY, SchemaCache, catalog_version
+
+logger = logging.getLogger(__name__)
+
+# Catálogos CSV (sin store) e índices de búsqueda que se mantienen en memoria
+# por proceso (nunca menos que los catálogos precargados, para no expulsarlos).
+# Los catálogos del store consolidado no se copian: se leen de los arreglos
+# mapeados, compartidos por todos los workers
+MEMBER_CACHE_SIZE = max(
+    int(os.getenv('MEMBER_CACHE_SIZE', '8')),
+    len([c for c in os.getenv('WARM_CATALOGS', '').split(',') if c.strip()])
+)
+
+# Cada cuántos segundos se revisa si hay una versión nueva del store
+STORE_CHECK_INTERVAL = float(os.getenv('MEMBER_STORE_CHECK_INTERVAL', '30'))
+
+# Cada cuántos segundos se consulta DBSCHEMA_CATALOGS (lista y versiones)
+SCHEMA_PROBE_INTERVAL = float(os.getenv('SCHEMA_PROBE_INTERVAL', '60'))
+
+# Modo lazy: niveles desde MDSCHEMA_LEVELS y miembros por jerarquía bajo demanda
+# auto = solo para catálogos sin cache de miembros local; always / never
+LAZY_MEMBERS = os.getenv('LAZY_MEMBERS', 'auto').lower()
+
+# Jerarquías descargadas bajo demanda que se mantienen en memoria
+HIERARCHY_CACHE_SIZE = int(os.getenv('HIERARCHY_CACHE_SIZE', '256'))
+
+# Columnas necesarias para derivar dimensiones y niveles
+DIMENSION_COLUMNS = ['DIMENSION', 'JERARQUIA', 'MIEMBRO_CAPTION', 'NIVEL_NOMBRE', 'UN_NIVEL', 'UN_PROFUNDIDAD']
 
 
 def com_thread_safe(func):
@@ -75,17 +112,429 @@ class OlapService:
         self._discovery = ServerDiscovery(self.config)
         self._explorer = CatalogExplorer(self.config)
         self._lock = threading.Lock()
+        
+        # Store consolidado multi-catálogo (memory-mapped, compartido entre
+        # workers vía page cache), si está configurado
+        self._store = open_store()
+        self._store_checked = time.monotonic()
+        
+        # Cache LRU por catálogo: acota la memoria propia de cada worker
+        self._members_cache: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        # Versión (mtime/tamaño) del CSV del que salió cada DataFrame cacheado
+        self._member_sources: Dict[str, tuple] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._search_indexes: OrderedDict[str, MemberSearchIndex] = OrderedDict()
+        self._hierarchy_cache: OrderedDict[tuple, pd.DataFrame] = OrderedDict()
+        self._tree_indexes: OrderedDict[tuple, MemberTreeIndex] = OrderedDict()
+        self._level_indexes: OrderedDict[tuple, MemberLevelIndex] = OrderedDict()
+        # Dimensiones ya derivadas del store (decodificar captions cuesta ~0.2s)
+        self._dimension_results: OrderedDict[tuple, List[Dict]] = OrderedDict()
+        
+        # Schema rowsets por catálogo (memoria + disco), invalidados por DATE_MODIFIED
+        self._schema_cache = SchemaCache(Path(self.config.output_dir) / 'schema_cache')
+        self._catalog_rows: Optional[List[Dict]] = None
+        self._catalogs_probed = 0.0
+        
+        # Versión de catálogo con la que se validó el cache de miembros
+        self._member_versions: Dict[str, Optional[str]] = {}
+    
+    # ========== CACHE DE MIEMBROS ==========
+    
+    @staticmethod
+    def _lru_get(cache: OrderedDict, key: str):
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+    
+    @staticmethod
+    def _lru_put(cache: OrderedDict, key, value, size: int = MEMBER_CACHE_SIZE):
+        value = cache.setdefault(key, value)
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+        return value
+    
+    def _refresh_store(self):
+        """Cambia a la versión publicada del store si hay una nueva"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._store_checked < STORE_CHECK_INTERVAL:
+                return
+            self._store_checked = now
+            store = self._store
+        
+        if store is not None and store.is_current():
+            return
+        new_store = open_store()
+        if new_store is None or (store is not None and new_store.version == store.version):
+            return
+        
+        with self._lock:
+            self._store = new_store
+            self._members_cache.clear()
+            self._search_indexes.clear()
+            self._tree_indexes.clear()
+            self._level_indexes.clear()
+    
+    def _has_members_cache(self, catalog: str) -> bool:
+        """¿Hay cache completo de miembros sin ir al servidor?"""
+        with self._lock:
+            if catalog in self._members_cache:
+                return True
+            store = self._store
+        if store is not None and catalog in store:
+            return True
+        return self._explorer.members_csv_path(catalog).exists()
+    
+    def _is_lazy(self, catalog: str) -> bool:
+        if LAZY_MEMBERS in ('always', 'true', '1'):
+            return True
+        if LAZY_MEMBERS in ('never', 'false', '0'):
+            return False
+        return not self._has_members_cache(catalog)
+    
+    def _load_hierarchy_members(self, catalog: str, hierarchy: str) -> Optional[pd.DataFrame]:
+        """Miembros de una sola jerarquía, descargados al expandirla (cache LRU)"""
+        key = (catalog, hierarchy)
+        with self._lock:
+            df = self._lru_get(self._hierarchy_cache, key)
+        if df is not None:
+            return df
+        
+        try:
+            raw = self._explorer.fetcher.fetch_hierarchies(catalog, [hierarchy])
+        except HierarchyFetchError as e:
+            logger.warning(f"No se pudo descargar {hierarchy} de {catalog}: {e}")
+            return None
+        df = self._explorer.prepare_members_df(raw) if not raw.empty else None
+        if df is None:
+            return None
+        add_unique_name_columns(df)
+        
+        with self._lock:
+            return self._lru_put(self._hierarchy_cache, key, df, HIERARCHY_CACHE_SIZE)
+    
+    def _lazy_hierarchies_members(self, catalog: str, match) -> Optional[pd.DataFrame]:
+        """Miembros de las jerarquías cuyo nombre cumple `match`, descargadas una a una
+        
+        Modo lazy: evita descargar el catálogo completo cuando solo se
+        necesitan unas pocas jerarquías (p. ej. la de apartados).
+        """
+        names = [
+            hier['HIERARCHY_UNIQUE_NAME'] for hier in self._get_hierarchies(catalog)
+            if hier.get('HIERARCHY_UNIQUE_NAME') and match(str(hier['HIERARCHY_UNIQUE_NAME']))
+        ]
+        frames = [self._load_hierarchy_members(catalog, name) for name in names]
+        frames = [df for df in frames if df is not None]
+        if not frames:
+            return None
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    
+    def _store_for(self, catalog: str):
+        """Store consolidado si contiene el catálogo"""
+        self._refresh_store()
+        with self._lock:
+            store = self._store
+        return store if store is not None and catalog in store else None
+    
+    def _catalog_members(self, catalog: str, columns: Optional[List[str]] = None,
+                         hierarchy=None) -> Optional[pd.DataFrame]:
+        """Miembros del catálogo, opcionalmente solo columnas/jerarquías
+        
+        `hierarchy` es un unique name o un predicado sobre el nombre. Con el
+        store consolidado se decodifican solo esas filas y columnas desde los
+        arreglos mapeados y el resultado no se cachea: la memoria por worker
+        queda en los índices derivados, no en una copia del catálogo. Sin store
+        se filtra el DataFrame del CSV (cache LRU).
+        """
+        match = hierarchy if hierarchy is None or callable(hierarchy) else (lambda h: h == hierarchy)
+        store = self._store_for(catalog)
+        if store is not None:
+            rows = None if match is None else store.rows_where(catalog, 'JERARQUIA', match)
+            return store.frame(catalog, columns, rows)
+        
+        df = self._load_members(catalog)
+        if df is None or match is None:
+            return df
+        names = [h for h in df['JERARQUIA'].dropna().unique() if match(str(h))]
+        return df[df['JERARQUIA'].isin(names)]
+    
+    def _member_count(self, catalog: str) -> int:
+        store = self._store_for(catalog)
+        if store is not None:
+            return store.rows(catalog)
+        df = self._load_members(catalog)
+        return 0 if df is None else len(df)
+    
+    def _csv_version(self, catalog: str) -> tuple:
+        """(versión 'mtime_ns:tamaño', mtime) del CSV en disco; (None, None) si no existe"""
+        try:
+            stat = self._explorer.members_csv_path(catalog).stat()
+        except OSError:
+            return None, None
+        return f"{stat.st_mtime_ns}:{stat.st_size}", stat.st_mtime
+    
+    def _members_source(self, catalog: str) -> tuple:
+        """(versión, mtime) del CSV que `_load_members` sirve ahora mismo
+        
+        La del disco (un DataFrame cacheado de otra versión se recarga); si el
+        CSV ya no existe, la del DataFrame cacheado.
+        """
+        source = self._csv_version(catalog)
+        if source[0] is not None:
+            return source
+        with self._lock:
+            if catalog in self._members_cache:
+                return self._member_sources.get(catalog, (None, None))
+        return None, None
+    
+    def _invalidate_catalog(self, catalog: str):
+        """Descarta el DataFrame del catálogo y todos sus índices derivados"""
+        with self._lock:
+            self._members_cache.pop(catalog, None)
+            self._member_sources.pop(catalog, None)
+            self._search_indexes.pop(catalog, None)
+            for cache in (self._tree_indexes, self._level_indexes):
+                for key in [k for k in cache if k[0] == catalog]:
+                    del cache[key]
+    
+    def _cached_members(self, catalog: str) -> Optional[pd.DataFrame]:
+        """DataFrame cacheado si sigue correspondiendo al CSV en disco"""
+        source = self._members_source(catalog)
+        with self._lock:
+            df = self._lru_get(self._members_cache, catalog)
+            stale = df is not None and self._member_sources.get(catalog) != source
+        if stale:
+            # Otro proceso reescribió el CSV (refresh): recargar
+            self._invalidate_catalog(catalog)
+            return None
+        return df
+    
+    def _load_members(self, catalog: str) -> Optional[pd.DataFrame]:
+        """Carga el DataFrame de miembros del catálogo (cache LRU por proceso)
+        
+        Los catálogos del store no se cachean aquí (ver `_catalog_members`).
+        Un DataFrame cacheado se recarga si el CSV cambió en disco, de modo que
+        lo servido siempre corresponde a la versión de `_metadata_version_sync`.
+        """
+        store = self._store_for(catalog)
+        if store is not None:
+            return store.frame(catalog)
+        df = self._cached_members(catalog)
+        if df is not None:
+            return df
+        
+        # Un solo hilo carga cada catálogo; los demás esperan su resultado
+        with self._lock:
+            load_lock = self._load_locks.setdefault(catalog, threading.Lock())
+        with load_lock:
+            df = self._cached_members(catalog)
+            if df is not None:
+                return df
+            
+            df = self._tool.load_catalog_members_csv(catalog)
+            if df is None:
+                return None
+            
+            # Versión tomada después de leer: si el CSV cambió durante la
+            # lectura, la próxima revalidación lo recarga
+            source = self._csv_version(catalog)
+            with self._lock:
+                self._member_sources[catalog] = source
+                return self._lru_put(self._members_cache, catalog, df)
+    
+    def _probe_catalogs(self, force: bool = False) -> List[Dict]:
+        """Filas de DBSCHEMA_CATALOGS (una consulta barata cada SCHEMA_PROBE_INTERVAL)
+        
+        Sirve tanto para listar catálogos como para saber su versión
+        (DATE_MODIFIED). Si el servidor no responde se usa la última lista.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if (not force and self._catalog_rows is not None
+                    and now - self._catalogs_probed < SCHEMA_PROBE_INTERVAL):
+                return self._catalog_rows
+            self._catalogs_probed = now
+        
+        rows = None
+        try:
+            with ConnectionManager(self.config) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM $system.DBSCHEMA_CATALOGS")
+                rows = rows_to_df(cursor, cursor.fetchall()).to_dict('records')
+            self._schema_cache.put(SERVER_KEY, 'catalogs', None, rows)
+        except Exception as e:
+            logger.debug(f"No se pudo consultar DBSCHEMA_CATALOGS: {e}")
+        
+        if rows is None:
+            cached = self._schema_cache.get(SERVER_KEY, 'catalogs', None)
+            rows = self._catalog_rows or ([] if cached is MISSING else cached)
+        
+        with self._lock:
+            self._catalog_rows = rows
+        return rows
+    
+    def _catalog_version(self, catalog: str) -> Optional[str]:
+        for row in self._probe_catalogs():
+            if row.get('CATALOG_NAME') == catalog:
+                return catalog_version(row)
+        return None
+    
+    def _metadata_version_sync(self, catalog: Optional[str] = None) -> tuple:
+        """(versión, última modificación) de la metadata, sin tocar pandas
+        
+        Combina la versión del schema (DATE_MODIFIED) con la del cache de
+        miembros (versión del store o mtime/tamaño del CSV). Sin catálogo,
+        la versión de la lista de catálogos. Versión None = desconocida.
+        """
+        if catalog is None:
+            rows = self._probe_catalogs()
+            if not rows:
+                return None, None
+            parts = sorted(f"{r.get('CATALOG_NAME')}={catalog_version(r)}" for r in rows)
+            return '|'.join(parts), None
+        
+        # Misma fuente que leen los métodos de miembros: store vigente (tras
+        # revisar si hay uno nuevo) o el CSV que `_load_members` va a servir
+        parts = [f"schema={self._catalog_version(catalog)}"]
+        last_modified = None
+        store = self._store_for(catalog)
+        if store is not None:
+            parts.append(f"store={store.version}")
+            last_modified = store.created
+        else:
+            source, mtime = self._members_source(catalog)
+            if source is not None:
+                parts.append(f"csv={source}")
+                last_modified = mtime
+        
+        if parts == ['schema=None']:
+            return None, None
+        return ';'.join(parts), last_modified
+    
+    def _cached_rowset(self, kind: str, catalog: str, loader: Callable[[], Any]):
+        """Rowset de schema desde cache mientras el catálogo no cambie de versión
+        
+        Los resultados vacíos no se guardan (suelen ser errores de conexión).
+        """
+        version = self._catalog_version(catalog)
+        value = self._schema_cache.get(catalog, kind, version)
+        if value is not MISSING:
+            return value
+        
+        value = loader()
+        if value:
+            self._schema_cache.put(catalog, kind, version, value)
+        return value
+    
+    def _get_levels(self, catalog: str) -> List[Dict]:
+        return self._cached_rowset('levels', catalog,
+                                   lambda: self._tool.get_levels(catalog))
+    
+    def _get_hierarchies(self, catalog: str) -> List[Dict]:
+        return self._cached_rowset('hierarchies', catalog,
+                                   lambda: self._tool.get_hierarchies(catalog))
+    
+    def _get_raw_measures(self, catalog: str) -> List[Dict]:
+        return self._cached_rowset('measures', catalog,
+                                   lambda: self._tool.get_measures(catalog))
+    
+    def _get_cube_name_sync(self, catalog: str) -> str:
+        """Nombre MDX del cubo del catálogo ([catálogo] si no se puede obtener)"""
+        def _query():
+            try:
+                with ConnectionManager(self.config, catalog) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT CUBE_NAME FROM $system.MDSCHEMA_CUBES")
+                    cubes = cursor.fetchall()
+                    if cubes:
+                        return f"[{cubes[0][0]}]"
+            except Exception:
+                pass
+            return None
+        
+        return self._cached_rowset('cube', catalog, _query) or f"[{catalog}]"
+    
+    def _warm_catalog_sync(self, catalog: str, refresh: bool = False) -> Dict:
+        """Precarga todo lo que necesita la UI para abrir un catálogo
+        
+        Con refresh=True se fuerza el probe de versiones: solo los catálogos
+        modificados en el servidor vuelven a descargar su schema.
+        """
+        if refresh:
+            self._probe_catalogs(force=True)
+            
+            # Catálogo modificado en el servidor: refrescar solo lo que cambió
+            # (el store consolidado se reconstruye aparte)
+            version = self._catalog_version(catalog)
+            from_store = self._store is not None and catalog in self._store
+            if (not from_store and catalog in self._member_versions
+                    and self._member_versions[catalog] != version):
+                self._refresh_members_sync(catalog)
+        
+        self._member_versions[catalog] = self._catalog_version(catalog)
+        members = self._member_count(catalog)
+        measures = self._get_raw_measures(catalog)
+        hierarchies = self._get_hierarchies(catalog)
+        self._get_cube_name_sync(catalog)
+        apartados = self._get_apartados_sync(catalog)
+        self._get_search_index(catalog)
+        
+        return {
+            'members': members,
+            'measures': len(measures),
+            'hierarchies': len(hierarchies),
+            'apartados': len(apartados)
+        }
+    
+    def _refresh_members_sync(self, catalog: str) -> Dict:
+        """Refresh incremental del cache CSV de miembros (solo jerarquías cambiadas)"""
+        result = self._explorer.refresh_members_incremental(catalog)
+        # Un refresh parcial también reescribe el CSV
+        if result['mode'] != 'unchanged':
+            self._invalidate_catalog(catalog)
+        return result
+    
+    def _get_tree_index(self, catalog: str, hierarchy: str) -> Optional[MemberTreeIndex]:
+        """Índice padre -> hijos de una jerarquía (construido bajo demanda)"""
+        key = (catalog, hierarchy)
+        with self._lock:
+            index = self._lru_get(self._tree_indexes, key)
+        if index is not None:
+            return index
+        
+        if self._is_lazy(catalog):
+            df_hier = self._load_hierarchy_members(catalog, hierarchy)
+        else:
+            df_hier = self._catalog_members(catalog, hierarchy=hierarchy)
+        if df_hier is None:
+            return None
+        
+        index = MemberTreeIndex(df_hier)
+        with self._lock:
+            return self._lru_put(self._tree_indexes, key, index, HIERARCHY_CACHE_SIZE)
+    
+    def _get_search_index(self, catalog: str) -> Optional[MemberSearchIndex]:
+        """Índice de búsqueda de captions del catálogo (construido bajo demanda)"""
+        with self._lock:
+            index = self._lru_get(self._search_indexes, catalog)
+        if index is not None:
+            return index
+        
+        df_members = self._catalog_members(catalog, MemberSearchIndex.COLUMNS)
+        if df_members is None:
+            return None
+        
+        index = MemberSearchIndex(df_members)
+        with self._lock:
+            return self._lru_put(self._search_indexes, catalog, index)
     
     # ========== MÉTODOS SÍNCRONOS (para uso en threads) ==========
     
     def _get_catalogs_sync(self) -> List[Dict]:
         """Obtiene lista de catálogos del servidor"""
-        self._discovery.discover_generic(
-            'Catalogos',
-            "SELECT * FROM $system.DBSCHEMA_CATALOGS",
-            'catalogs'
-        )
-        catalogs = self._discovery.discovery_results.get('catalogs', [])
+        catalogs = self._probe_catalogs()
         
         # Transformar a formato ligero
         return [
@@ -99,7 +548,7 @@ class OlapService:
     
     def _get_measures_sync(self, catalog: str) -> List[Dict]:
         """Obtiene medidas de un catálogo"""
-        measures = self._tool.get_measures(catalog)
+        measures = self._get_raw_measures(catalog)
         
         # Formato para frontend
         return [
@@ -115,12 +564,24 @@ class OlapService:
     
     def _get_dimensions_sync(self, catalog: str) -> List[Dict]:
         """Obtiene dimensiones y jerarquías con sus niveles"""
-        # Cargar metadata del catálogo
-        df_members = self._tool.load_catalog_members_csv(catalog)
+        if self._is_lazy(catalog):
+            return self._get_dimensions_lazy(catalog)
+        
+        store = self._store_for(catalog)
+        key = None
+        if store is not None:
+            key = (catalog, store.version, self._catalog_version(catalog))
+            with self._lock:
+                cached = self._lru_get(self._dimension_results, key)
+            if cached is not None:
+                return cached
+        
+        # Cargar metadata del catálogo (solo las columnas de estructura)
+        df_members = self._catalog_members(catalog, DIMENSION_COLUMNS)
         if df_members is None:
             return []
         
-        hierarchies = self._tool.get_hierarchies(catalog)
+        hierarchies = self._get_hierarchies(catalog)
         result = []
         
         for hier in hierarchies:
@@ -148,51 +609,116 @@ class OlapService:
                 'type': 'dimension'
             })
         
+        if key is not None:
+            with self._lock:
+                self._lru_put(self._dimension_results, key, result)
         return result
     
-    def _get_apartados_sync(self, catalog: str) -> List[Dict]:
-        """Extrae apartados (grupos temáticos) del catálogo
+    def _get_dimensions_lazy(self, catalog: str) -> List[Dict]:
+        """Dimensiones y niveles solo con MDSCHEMA_HIERARCHIES/LEVELS (sin miembros)"""
+        def number(lv: Dict, default=None):
+            # Los rowsets salen de DataFrame.to_dict: los nulos llegan como NaN
+            value = lv.get('LEVEL_NUMBER')
+            return int(value) if value is not None and pd.notna(value) else default
+        
+        levels_by_hierarchy: Dict[str, List[Dict]] = {}
+        for lv in self._get_levels(catalog):
+            # Nivel 0 = (All)
+            if number(lv) == 0:
+                continue
+            levels_by_hierarchy.setdefault(lv['HIERARCHY_UNIQUE_NAME'], []).append(lv)
+        
+        result = []
+        for hier in self._get_hierarchies(catalog):
+            dimension = hier.get('DIMENSION_UNIQUE_NAME', '')
+            hierarchy = hier.get('HIERARCHY_UNIQUE_NAME', '')
+            levels = sorted(levels_by_hierarchy.get(hierarchy, []),
+                            key=lambda lv: number(lv, 0))
+            
+            result.append({
+                'dimension': dimension,
+                'hierarchy': hierarchy,
+                'displayName': hier.get('HIERARCHY_CAPTION', hierarchy),
+                'levels': [
+                    {
+                        'name': lv['LEVEL_NAME'],
+                        'depth': number(lv) or depth,
+                        'uniqueName': f"{hierarchy}.[{lv['LEVEL_NAME']}]",
+                        'memberCount': (int(lv['LEVEL_CARDINALITY'])
+                                        if lv.get('LEVEL_CARDINALITY') is not None
+                                        and pd.notna(lv['LEVEL_CARDINALITY']) else None)
+                    }
+                    for depth, lv in enumerate(levels, 1)
+                ],
+                'type': 'dimension'
+            })
+        
+        return result
+    
+    def _apartados_frames(self, catalog: str) -> tuple:
+        """(miembros de la jerarquía de apartados, apartados ordenados por caption)
         
         Similar a DGIS_SCAN_2 líneas 947-983:
         - Busca jerarquías con 'APARTADO' en el nombre
         - Filtra por NIVEL_NOMBRE == 'Apartado' o cuenta de '&' en MIEMBRO_UNIQUE_NAME
         """
-        df_members = self._tool.load_catalog_members_csv(catalog)
-        if df_members is None:
-            return []
-        
-        # Buscar jerarquía de apartados
-        mask_hier = df_members['JERARQUIA'].str.upper().str.contains('APARTADO', na=False)
-        df_vars = df_members[mask_hier].copy()
+        # Solo las jerarquías de apartados
+        is_apartado = lambda h: 'apartado' in normalize_text(h)
+        if self._is_lazy(catalog):
+            df_vars = self._lazy_hierarchies_members(catalog, is_apartado)
+        else:
+            df_vars = self._catalog_members(catalog, hierarchy=is_apartado)
+        if df_vars is None:
+            return None, None
         
         if df_vars.empty:
-            return []
+            return df_vars, df_vars
         
         # Filtrar solo apartados (no variables hijas)
         if 'NIVEL_NOMBRE' in df_vars.columns:
-            apartados = df_vars[df_vars['NIVEL_NOMBRE'] == 'Apartado'].copy()
+            apartados = df_vars[df_vars['NIVEL_NOMBRE'] == 'Apartado']
         else:
-            # Fallback: contar '&' en unique name
-            # Apartado tiene 1 '&', Variable tiene 2+
-            df_vars['ampersand_count'] = df_vars['MIEMBRO_UNIQUE_NAME'].str.count(r'\.\&\[')
-            apartados = df_vars[df_vars['ampersand_count'] == 1].copy()
+            # Fallback: profundidad del unique name (parseada en el cache)
+            # Apartado tiene 1 '.&[', Variable tiene 2+
+            apartados = df_vars[df_vars['UN_PROFUNDIDAD'] == 1]
             
             if apartados.empty:
                 # Último recurso: tomar todos únicos
-                apartados = df_vars.drop_duplicates(subset=['MIEMBRO_UNIQUE_NAME']).copy()
+                apartados = df_vars.drop_duplicates(subset=['MIEMBRO_UNIQUE_NAME'])
         
-        apartados = apartados.sort_values('MIEMBRO_CAPTION')
+        return df_vars, apartados.sort_values('MIEMBRO_CAPTION')
+    
+    def _get_apartados_sync(self, catalog: str) -> List[Dict]:
+        """Extrae apartados (grupos temáticos) del catálogo"""
+        _, apartados = self._apartados_frames(catalog)
+        if apartados is None or apartados.empty:
+            return []
         
         return [
             {
                 'id': str(idx),
-                'name': ap.get('MIEMBRO_CAPTION', ''),
-                'uniqueName': ap.get('MIEMBRO_UNIQUE_NAME', ''),
-                'hierarchy': ap.get('JERARQUIA', '')
+                'name': name,
+                'uniqueName': unique_name,
+                'hierarchy': hierarchy
             }
-            for idx, ap in enumerate(apartados.to_dict('records'), 1)
+            for idx, (name, unique_name, hierarchy) in enumerate(zip(
+                apartados['MIEMBRO_CAPTION'].tolist(),
+                apartados['MIEMBRO_UNIQUE_NAME'].tolist(),
+                apartados['JERARQUIA'].astype(object).tolist()
+            ), 1)
         ]
     
+    @staticmethod
+    def _parent_unique_names(df_vars: pd.DataFrame) -> pd.Series:
+        """Padre directo de cada miembro (PARENT_UNIQUE_NAME o ruta de claves)"""
+        derived = (df_vars['UN_JERARQUIA'].astype(object) + '.'
+                   + df_vars['UN_CLAVE_PADRE'].astype(object))
+        derived = derived.where(df_vars['UN_CLAVE_PADRE'].astype(object) != '')
+        if 'PARENT_UNIQUE_NAME' in df_vars.columns:
+            explicit = df_vars['PARENT_UNIQUE_NAME'].astype(object)
+            return explicit.where(explicit.notna() & (explicit != ''), derived)
+        return derived
+    
     def _get_variables_sync(self, catalog: str, apartado_ids: str = None) -> List[Dict]:
         """Extrae variables filtradas por apartados seleccionados
         
@@ -204,117 +730,172 @@ class OlapService:
         Returns:
             Lista de variables con id, name, uniqueName, apartado
         
-        Similar a DGIS_SCAN_2 líneas 1031-1050
+        Similar a DGIS_SCAN_2 líneas 1031-1050. Un solo pase: los apartados
+        seleccionados se resuelven con `isin` sobre el padre de cada fila.
         """
         from utils import parse_ranges
         
-        df_members = self._tool.load_catalog_members_csv(catalog)
-        if df_members is None:
-            return []
-        
-        # Buscar jerarquía de apartados
-        mask_hier = df_members['JERARQUIA'].str.upper().str.contains('APARTADO', na=False)
-        df_vars = df_members[mask_hier].copy()
-        
-        if df_vars.empty:
+        df_vars, apartados = self._apartados_frames(catalog)
+        if df_vars is None or df_vars.empty:
             return []
         
         # Si no se especificaron apartados, retornar todas las variables
         if not apartado_ids or not apartado_ids.strip():
             # Filtrar solo variables (no apartados)
             if 'NIVEL_NOMBRE' in df_vars.columns:
-                variables = df_vars[df_vars['NIVEL_NOMBRE'] == 'Variable'].copy()
+                variables = df_vars[df_vars['NIVEL_NOMBRE'] == 'Variable']
             else:
-                # Contar '&' - variables tienen 2+ '&'
-                df_vars['ampersand_count'] = df_vars['MIEMBRO_UNIQUE_NAME'].str.count(r'\.\&\[')
-                variables = df_vars[df_vars['ampersand_count'] >= 2].copy()
+                # Profundidad - variables tienen 2+ '.&['
+                variables = df_vars[df_vars['UN_PROFUNDIDAD'] >= 2]
             
             return self._format_variables(variables)
         
-        # Parsear IDs y filtrar apartados
+        # IDs de apartados = posición (1-based) en el orden por caption
         selected_ids = parse_ranges(apartado_ids)
-        apartados_list = self._get_apartados_sync(catalog)
+        positions = sorted(i - 1 for i in selected_ids if 1 <= i <= len(apartados))
+        if not positions:
+            return []
+        selected = apartados.iloc[positions]
+        rank = pd.Series(np.arange(len(selected)), index=selected['MIEMBRO_UNIQUE_NAME'].to_numpy())
+        rank = rank[~rank.index.duplicated()]
         
-        # Filtrar apartados por IDs seleccionados
-        selected_apartados = [
-            ap for ap in apartados_list
-            if int(ap['id']) in selected_ids
-        ]
+        parents = self._parent_unique_names(df_vars)
+        owner = parents.where(parents.isin(rank.index))
         
-        if not selected_apartados:
-            return []
+        if 'PARENT_UNIQUE_NAME' not in df_vars.columns:
+            # Sin padre explícito: cualquier descendiente del apartado cuenta
+            parent_of = pd.Series(parents.to_numpy(), index=df_vars['MIEMBRO_UNIQUE_NAME'].to_numpy())
+            parent_of = parent_of[~parent_of.index.duplicated()]
+            current = parents
+            while owner.isna().any():
+                current = current.map(parent_of)
+                if current.isna().all():
+                    break
+                owner = owner.fillna(current.where(current.isin(rank.index)))
         
-        # Obtener variables hijas de cada apartado seleccionado
-        all_variables = []
+        hits = owner.notna().to_numpy()
+        if not hits.any():
+            return []
         
-        for apartado in selected_apartados:
-            parent_unique = apartado['uniqueName']
-            
-            # Buscar variables que tengan este apartado como padre
-            if 'PARENT_UNIQUE_NAME' in df_vars.columns:
-                vars_from_apartado = df_vars[
-                    df_vars['PARENT_UNIQUE_NAME'] == parent_unique
-                ].copy()
-            else:
-                # Fallback: buscar por patrón en unique name
-                # Las variables contienen el unique name del apartado
-                vars_from_apartado = df_vars[
-                    df_vars['MIEMBRO_UNIQUE_NAME'].str.contains(
-                        parent_unique.replace('[', r'\[').replace(']', r'\]'),
-                        regex=True,
-                        na=False
-                    ) &
-                    (df_vars['MIEMBRO_UNIQUE_NAME'] != parent_unique)
-                ].copy()
-            
-            for _, var_row in vars_from_apartado.iterrows():
-                all_variables.append({
-                    'id': str(len(all_variables) + 1),
-                    'name': var_row.get('MIEMBRO_CAPTION', ''),
-                    'uniqueName': var_row.get('MIEMBRO_UNIQUE_NAME', ''),
-                    'apartado': apartado['name'],
-                    'hierarchy': var_row.get('JERARQUIA', '')
-                })
+        # Orden: apartado (como en la lista de apartados), luego orden original
+        order = np.argsort(owner[hits].map(rank).to_numpy(), kind='stable')
+        variables = df_vars[hits].iloc[order]
+        apartado_names = pd.Series(selected['MIEMBRO_CAPTION'].to_numpy(),
+                                   index=selected['MIEMBRO_UNIQUE_NAME'].to_numpy())
+        apartado_names = apartado_names[~apartado_names.index.duplicated()]
         
-        return all_variables
+        return [
+            {
+                'id': str(idx),
+                'name': name,
+                'uniqueName': unique_name,
+                'apartado': apartado,
+                'hierarchy': hierarchy
+            }
+            for idx, (name, unique_name, apartado, hierarchy) in enumerate(zip(
+                variables['MIEMBRO_CAPTION'].tolist(),
+                variables['MIEMBRO_UNIQUE_NAME'].tolist(),
+                owner[hits].iloc[order].map(apartado_names).tolist(),
+                variables['JERARQUIA'].astype(object).tolist()
+            ), 1)
+        ]
     
     def _format_variables(self, df_variables) -> List[Dict]:
-        """Helper para formatear DataFrame de variables a lista de dicts"""
+        """Helper para formatear DataFrame de variables a lista de dicts (columnar)"""
         return [
             {
                 'id': str(idx),
-                'name': var.get('MIEMBRO_CAPTION', ''),
-                'uniqueName': var.get('MIEMBRO_UNIQUE_NAME', ''),
-                'hierarchy': var.get('JERARQUIA', ''),
+                'name': name,
+                'uniqueName': unique_name,
+                'hierarchy': hierarchy,
                 'apartado': 'N/A'
             }
-            for idx, var in enumerate(df_variables.to_dict('records'), 1)
+            for idx, (name, unique_name, hierarchy) in enumerate(zip(
+                df_variables['MIEMBRO_CAPTION'].tolist(),
+                df_variables['MIEMBRO_UNIQUE_NAME'].tolist(),
+                df_variables['JERARQUIA'].astype(object).tolist()
+            ), 1)
         ]
     
     
+    def _get_level_index(
+        self,
+        catalog: str,
+        dimension: str,
+        hierarchy: str,
+        level: str
+    ) -> Optional[MemberLevelIndex]:
+        """Miembros de un nivel preordenados (cache LRU por nivel)"""
+        key = (catalog, dimension, hierarchy, level)
+        with self._lock:
+            index = self._lru_get(self._level_indexes, key)
+        if index is not None:
+            return index
+        
+        if self._is_lazy(catalog):
+            # Solo la jerarquía expandida, no el catálogo completo
+            df_members = self._load_hierarchy_members(catalog, hierarchy)
+        else:
+            df_members = self._catalog_members(catalog, hierarchy=hierarchy)
+        if df_members is None:
+            return None
+        
+        members = self._tool.filter_dimension_members(df_members, dimension, hierarchy, level)
+        index = MemberLevelIndex(members)
+        with self._lock:
+            return self._lru_put(self._level_indexes, key, index, HIERARCHY_CACHE_SIZE)
+    
     def _get_members_sync(
         self, 
         catalog: str,
         dimension: str, 
         hierarchy: str, 
-        level: str
-    ) -> List[Dict]:
-        """Obtiene miembros de un nivel específico"""
-        df_members = self._tool.load_catalog_members_csv(catalog)
-        if df_members is None:
-            return []
+        level: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        sort: str = 'ordinal'
+    ):
+        """Obtiene miembros de un nivel específico
         
-        members = self._tool.get_dimension_members(
-            df_members, dimension, hierarchy, level
-        )
+        Sin limit/cursor devuelve la lista completa; con ellos devuelve una
+        página {items, nextCursor, total} (paginación keyset).
+        """
+        index = self._get_level_index(catalog, dimension, hierarchy, level)
+        paginated = limit is not None or cursor is not None
+        if index is None:
+            return {'items': [], 'nextCursor': None, 'total': 0} if paginated else []
         
-        return [
-            {
-                'caption': m.get('MIEMBRO_CAPTION', ''),
-                'uniqueName': m.get('MIEMBRO_UNIQUE_NAME', '')
-            }
-            for m in members
-        ]
+        page = index.page(sort=sort, cursor=cursor, limit=limit, fields=fields)
+        return page if paginated else page['items']
+    
+    def _search_members_sync(
+        self,
+        catalog: str,
+        query: str,
+        limit: int = 20,
+        hierarchy: Optional[str] = None,
+        level: Optional[str] = None
+    ) -> List[Dict]:
+        """Búsqueda typeahead de miembros (sin acentos, por relevancia)"""
+        index = self._get_search_index(catalog)
+        if index is None:
+            return []
+        return index.search(query, limit=limit, hierarchy=hierarchy, level=level)
+    
+    def _get_children_sync(
+        self,
+        catalog: str,
+        hierarchy: str,
+        parent: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100
+    ) -> Dict:
+        """Hijos directos de un miembro (o raíces de la jerarquía), paginados"""
+        index = self._get_tree_index(catalog, hierarchy)
+        if index is None:
+            return {'parent': parent, 'total': 0, 'offset': offset, 'limit': limit, 'items': []}
+        return index.children(parent, offset, limit)
     
     def _execute_mdx_sync(self, catalog: str, mdx: str) -> Dict:
         """Ejecuta consulta MDX y devuelve resultados serializables"""
@@ -324,7 +905,6 @@ class OlapService:
             return {'rows': [], 'columns': [], 'rowCount': 0}
         
         # Sanitizar DataFrame para JSON - reemplazar valores no válidos
-        import numpy as np
         df_clean = df.replace({
             pd.NaT: None, 
             pd.NA: None,
@@ -409,16 +989,7 @@ class OlapService:
 
         
         # Obtener nombre del cubo
-        cube_name = f"[{catalog}]"
-        try:
-            with ConnectionManager(self.config, catalog) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT CUBE_NAME FROM $system.MDSCHEMA_CUBES")
-                cubes = cursor.fetchall()
-                if cubes:
-                    cube_name = f"[{cubes[0][0]}]"
-        except:
-            pass
+        cube_name = self._get_cube_name_sync(catalog)
         
         # Ensamblar MDX
         mdx = f"""SELECT 
@@ -480,9 +1051,80 @@ FROM {cube_name}"""
         catalog: str, 
         dimension: str, 
         hierarchy: str, 
-        level: str
+        level: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        sort: str = 'ordinal'
+    ):
+        return self._get_members_sync(catalog, dimension, hierarchy, level, limit, cursor, fields, sort)
+    
+    @com_thread_safe
+    def search_members(
+        self,
+        catalog: str,
+        query: str,
+        limit: int = 20,
+        hierarchy: Optional[str] = None,
+        level: Optional[str] = None
     ) -> List[Dict]:
-        return self._get_members_sync(catalog, dimension, hierarchy, level)
+        return self._search_members_sync(catalog, query, limit, hierarchy, level)
+    
+    @com_thread_safe
+    def metadata_version(self, catalog: Optional[str] = None) -> tuple:
+        return self._metadata_version_sync(catalog)
+    
+    @com_thread_safe
+    def get_cube_name(self, catalog: str) -> str:
+        return self._get_cube_name_sync(catalog)
+    
+    @com_thread_safe
+    def load_members(self, catalog: str) -> int:
+        return self._member_count(catalog)
+    
+    async def get_bootstrap(self, catalog: str) -> Dict:
+        """Todo lo que la UI necesita para abrir un catálogo, en una sola llamada
+        
+        Los miembros se cargan una vez (CSV; con store solo se cuentan) y luego
+        medidas, dimensiones, apartados y cubo se calculan en paralelo. En modo
+        lazy no se carga el catálogo: solo se descargan las jerarquías de
+        apartados.
+        """
+        if not self._is_lazy(catalog):
+            await self.load_members(catalog)
+        
+        measures, dimensions, apartados, cube_name = await asyncio.gather(
+            self.get_measures(catalog),
+            self.get_dimensions(catalog),
+            self.get_apartados(catalog),
+            self.get_cube_name(catalog)
+        )
+        return {
+            'catalog': catalog,
+            'cubeName': cube_name,
+            'measures': measures,
+            'dimensions': dimensions,
+            'apartados': apartados
+        }
+    
+    @com_thread_safe
+    def get_children(
+        self,
+        catalog: str,
+        hierarchy: str,
+        parent: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100
+    ) -> Dict:
+        return self._get_children_sync(catalog, hierarchy, parent, offset, limit)
+    
+    @com_thread_safe
+    def refresh_members(self, catalog: str) -> Dict:
+        return self._refresh_members_sync(catalog)
+    
+    @com_thread_safe
+    def warm_catalog(self, catalog: str, refresh: bool = False) -> Dict:
+        return self._warm_catalog_sync(catalog, refresh)
     
     @com_thread_safe
     def execute_query(self, request: Dict) -> Dict:
@@ -496,6 +1138,16 @@ def get_service() -> OlapService:
     """Dependency injection para FastAPI"""
     global _service_instance
     if _service_instance is None:
+        if os.getenv('METADATA_BACKEND', 'olap').lower() == 'postgres':
+            # Elegido explícitamente: sin fallback a mock/OLAP, un deploy mal
+            # configurado debe fallar en vez de servir otros datos
+            try:
+                from pg_metadata import PostgresMetadataService
+                _service_instance = PostgresMetadataService()
+            except (ImportError, RuntimeError, ValueError) as e:
+                logger.error(f"Could not load PostgresMetadataService: {e}")
+                raise
+            return _service_instance
         if not COM_AVAILABLE:
             try:
                 from mock_service import MockOlapService
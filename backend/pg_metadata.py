@@ -0,0 +1,495 @@
+"""
+Proveedor de metadata desde PostgreSQL
+Sirve catálogos, dimensiones, niveles, apartados, variables y miembros desde
+las tablas que carga database/migrate_csv_to_db.py (migraciones 001-011), con
+un pool asyncpg: cada conexión prepara y cachea sus statements, así que las
+consultas repetidas solo envían parámetros. El servidor OLAP solo se usa para
+medidas y nombre del cubo (desde el cache de schema en disco) y para ejecutar
+consultas MDX.
+
+Variables de entorno:
+    METADATA_BACKEND          olap (CSV/SSAS, default) | postgres
+    DATABASE_URL              Cadena de conexión a PostgreSQL
+    PG_POOL_MIN_SIZE          Conexiones mínimas del pool (default 1)
+    PG_POOL_MAX_SIZE          Conexiones máximas del pool (default 10)
+    PG_STATEMENT_CACHE_SIZE   Statements preparados por conexión
+                              (0 detrás de pgbouncer en modo transacción)
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Dict, List, Optional
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+
+from olap_service import OlapService, com_thread_safe
+from DGIS_SCAN_2 import Config
+from member_cache import MemberLevelIndex
+from utils import parse_ranges
+
+logger = logging.getLogger(__name__)
+
+PG_POOL_MIN_SIZE = int(os.getenv('PG_POOL_MIN_SIZE', '1'))
+PG_POOL_MAX_SIZE = int(os.getenv('PG_POOL_MAX_SIZE', '10'))
+PG_STATEMENT_CACHE_SIZE = int(os.getenv('PG_STATEMENT_CACHE_SIZE', '100'))
+
+# Campo de la API -> columna de mv_members_full (mismos campos que MemberLevelIndex;
+# MIEMBRO_KEY no se migra)
+MEMBER_COLUMNS = {
+    'caption': 'caption',
+    'uniqueName': 'unique_name',
+    'key': None,
+    'ordinal': 'ordinal',
+    'level': 'level_name',
+    'parent': 'parent_unique_name',
+    'childrenCardinality': 'children_cardinality',
+}
+
+# Orden de la API -> clave primaria del keyset (desempate: unique_name)
+SORT_COLUMNS = {'ordinal': 'ordinal', 'caption': 'caption_search'}
+
+
+# ========== SQL (texto fijo: cada uno se prepara una vez por conexión) ==========
+
+SQL_CATALOGS = """
+    SELECT code, name, created_at
+    FROM catalogs
+    ORDER BY code
+"""
+
+SQL_CATALOGS_VERSION = """
+    SELECT string_agg(code || '=' || coalesce(source_hash, loaded_at::text, ''), '|' ORDER BY code),
+           extract(epoch FROM max(loaded_at))
+    FROM catalogs
+"""
+
+SQL_CATALOG_VERSION = """
+    SELECT coalesce(source_hash, loaded_at::text), extract(epoch FROM loaded_at)
+    FROM catalogs
+    WHERE code = $1
+"""
+
+SQL_LEVELS = """
+    SELECT d.code AS dimension, h.code AS hierarchy, l.name AS level_name,
+           l.number AS level_number, l.member_count
+    FROM catalogs c
+    JOIN dimensions d ON d.catalog_id = c.id
+    JOIN hierarchies h ON h.dimension_id = d.id
+    JOIN levels l ON l.hierarchy_id = h.id
+    WHERE c.code = $1
+    ORDER BY d.code, h.code, l.number NULLS LAST, l.name
+"""
+
+# Mismo criterio que OlapService: jerarquía que contiene "apartado", nivel
+# "Apartado", ordenados por caption en orden de code points (como pandas)
+SQL_APARTADOS = """
+    SELECT caption, unique_name, hierarchy_code
+    FROM mv_members_full
+    WHERE catalog_code = $1
+      AND level_name = 'Apartado'
+      AND lower(f_unaccent(hierarchy_code)) LIKE '%apartado%'
+    ORDER BY caption COLLATE "C", unique_name
+"""
+
+SQL_ALL_VARIABLES = """
+    SELECT caption, unique_name, hierarchy_code
+    FROM mv_members_full
+    WHERE catalog_code = $1
+      AND level_name = 'Variable'
+      AND lower(f_unaccent(hierarchy_code)) LIKE '%apartado%'
+    ORDER BY ordinal, id
+"""
+
+# Subárbol de varios apartados en una sola consulta (ltree, migración 007)
+SQL_VARIABLES_UNDER = """
+    SELECT a.caption AS apartado, d.caption, d.unique_name, d.hierarchy_code
+    FROM unnest($2::text[]) WITH ORDINALITY AS sel(unique_name, rank)
+    JOIN mv_members_full a ON a.catalog_code = $1 AND a.unique_name = sel.unique_name
+    JOIN mv_members_full d ON d.catalog_code = $1 AND d.path <@ a.path AND d.id <> a.id
+    ORDER BY sel.rank, d.ordinal, d.id
+"""
+
+SQL_MEMBERS_COUNT = """
+    SELECT count(*)
+    FROM mv_members_full
+    WHERE catalog_code = $1 AND dimension_code = $2 AND hierarchy_code = $3 AND level_name = $4
+"""
+
+SQL_MEMBERS_PAGE = """
+    SELECT caption, unique_name, ordinal, level_name, parent_unique_name,
+           children_cardinality, {sort} AS sort_key
+    FROM mv_members_full
+    WHERE catalog_code = $1 AND dimension_code = $2 AND hierarchy_code = $3 AND level_name = $4
+      {after}
+    ORDER BY {sort}, unique_name
+    LIMIT $5
+"""
+
+# Mismo ranking que la ruta /search de Workers: ambos usan search_members() (008)
+SQL_SEARCH = """
+    SELECT caption, unique_name, hierarchy_code, level_name
+    FROM search_members($1, $2, $4, $5, $3)
+"""
+
+# El total se cuenta antes del OFFSET: una página fuera de rango devuelve una
+# fila con el total y columnas NULL (mismo contrato que MemberTreeIndex)
+SQL_CHILDREN = """
+    WITH counted AS (
+      SELECT count(*) AS total
+      FROM mv_members_full m
+      WHERE m.catalog_code = $1 AND m.hierarchy_code = $2
+        AND {parent_filter}
+    )
+    SELECT counted.total, page.*
+    FROM counted
+    LEFT JOIN LATERAL (
+      SELECT m.caption, m.unique_name, m.level_name, m.children_cardinality,
+             EXISTS (
+               SELECT 1 FROM mv_members_full c
+               WHERE c.catalog_code = m.catalog_code AND c.parent_unique_name = m.unique_name
+             ) AS has_children
+      FROM mv_members_full m
+      WHERE m.catalog_code = $1 AND m.hierarchy_code = $2
+        AND {parent_filter}
+      ORDER BY m.ordinal, m.id
+      OFFSET $3
+      LIMIT $4
+    ) page ON true
+"""
+
+
+def _display_name(hierarchy: str) -> str:
+    """'[DIM UNIDAD].[CLUES]' -> 'CLUES' (la caption no se migra)"""
+    return hierarchy.rsplit('.', 1)[-1].strip('[]') or hierarchy
+
+
+class PostgresMetadataService(OlapService):
+    """OlapService cuya metadata sale de PostgreSQL en lugar de CSV/SSAS"""
+
+    def __init__(self, config: Optional[Config] = None, dsn: Optional[str] = None):
+        if not ASYNCPG_AVAILABLE:
+            raise RuntimeError("METADATA_BACKEND=postgres requiere asyncpg (pip install asyncpg)")
+        self._dsn = dsn or os.getenv('DATABASE_URL')
+        if not self._dsn:
+            raise ValueError("METADATA_BACKEND=postgres requiere DATABASE_URL")
+        super().__init__(config)
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    # ========== POOL ==========
+
+    async def _get_pool(self):
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self._dsn,
+                        min_size=PG_POOL_MIN_SIZE,
+                        max_size=PG_POOL_MAX_SIZE,
+                        statement_cache_size=PG_STATEMENT_CACHE_SIZE
+                    )
+                    logger.info(f"Pool PostgreSQL listo ({PG_POOL_MIN_SIZE}-{PG_POOL_MAX_SIZE} conexiones)")
+        return self._pool
+
+    async def _fetch(self, query: str, *args) -> List:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            return await conn.fetch(query, *args)
+
+    async def _fetchrow(self, query: str, *args):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            return await conn.fetchrow(query, *args)
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    # ========== CATÁLOGOS Y VERSIONES ==========
+
+    async def get_catalogs(self) -> List[Dict]:
+        rows = await self._fetch(SQL_CATALOGS)
+        return [
+            {
+                'name': row['code'],
+                'description': row['name'] or '',
+                'created': str(row['created_at'] or '')
+            }
+            for row in rows
+        ]
+
+    @com_thread_safe
+    def _schema_version(self, catalog: str) -> Optional[str]:
+        return self._catalog_version(catalog)
+
+    async def metadata_version(self, catalog: Optional[str] = None) -> tuple:
+        """(versión, última modificación): hash del CSV cargado y loaded_at
+        
+        Con catálogo incluye también la versión del schema OLAP (DATE_MODIFIED):
+        medidas y nombre del cubo siguen saliendo del servidor OLAP.
+        """
+        if catalog is None:
+            row = await self._fetchrow(SQL_CATALOGS_VERSION)
+            if row is None or row[0] is None:
+                return None, None
+            # La lista completa puede ser larga: basta su hash
+            version = hashlib.sha1(row[0].encode('utf-8')).hexdigest()
+            return f"pg={version}", float(row[1]) if row[1] is not None else None
+
+        row, schema = await asyncio.gather(
+            self._fetchrow(SQL_CATALOG_VERSION, catalog),
+            self._schema_version(catalog)
+        )
+        if row is None or row[0] is None:
+            return None, None
+        return f"pg={row[0]};schema={schema}", float(row[1]) if row[1] is not None else None
+
+    # ========== DIMENSIONES Y NIVELES ==========
+
+    async def get_dimensions(self, catalog: str) -> List[Dict]:
+        rows = await self._fetch(SQL_LEVELS, catalog)
+
+        result = []
+        by_hierarchy: Dict[tuple, Dict] = {}
+        for row in rows:
+            key = (row['dimension'], row['hierarchy'])
+            entry = by_hierarchy.get(key)
+            if entry is None:
+                entry = {
+                    'dimension': row['dimension'],
+                    'hierarchy': row['hierarchy'],
+                    'displayName': _display_name(row['hierarchy']),
+                    'levels': [],
+                    'type': 'dimension'
+                }
+                by_hierarchy[key] = entry
+                result.append(entry)
+
+            entry['levels'].append({
+                'name': row['level_name'],
+                'depth': row['level_number'] if row['level_number'] is not None else len(entry['levels']) + 1,
+                'uniqueName': f"{row['hierarchy']}.[{row['level_name']}]",
+                'memberCount': row['member_count']
+            })
+
+        return result
+
+    # ========== APARTADOS Y VARIABLES ==========
+
+    async def get_apartados(self, catalog: str) -> List[Dict]:
+        rows = await self._fetch(SQL_APARTADOS, catalog)
+        return [
+            {
+                'id': str(idx),
+                'name': row['caption'],
+                'uniqueName': row['unique_name'],
+                'hierarchy': row['hierarchy_code']
+            }
+            for idx, row in enumerate(rows, 1)
+        ]
+
+    async def get_variables(self, catalog: str, apartado_ids: str = None) -> List[Dict]:
+        """Variables de los apartados seleccionados (IDs = posición en get_apartados)"""
+        if not apartado_ids or not apartado_ids.strip():
+            rows = await self._fetch(SQL_ALL_VARIABLES, catalog)
+            return [
+                {
+                    'id': str(idx),
+                    'name': row['caption'],
+                    'uniqueName': row['unique_name'],
+                    'hierarchy': row['hierarchy_code'],
+                    'apartado': 'N/A'
+                }
+                for idx, row in enumerate(rows, 1)
+            ]
+
+        apartados = await self.get_apartados(catalog)
+        selected = [
+            apartados[i - 1]['uniqueName']
+            for i in parse_ranges(apartado_ids) if 1 <= i <= len(apartados)
+        ]
+        if not selected:
+            return []
+
+        rows = await self._fetch(SQL_VARIABLES_UNDER, catalog, selected)
+        return [
+            {
+                'id': str(idx),
+                'name': row['caption'],
+                'uniqueName': row['unique_name'],
+                'apartado': row['apartado'],
+                'hierarchy': row['hierarchy_code']
+            }
+            for idx, row in enumerate(rows, 1)
+        ]
+
+    # ========== MIEMBROS ==========
+
+    async def get_members(
+        self,
+        catalog: str,
+        dimension: str,
+        hierarchy: str,
+        level: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        sort: str = 'ordinal'
+    ):
+        """Miembros de un nivel con paginación keyset sobre índices de mv_members_full
+
+        Mismo contrato que OlapService.get_members (cursor, campos y errores).
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort debe ser uno de {', '.join(SORT_COLUMNS)}")
+        fields = list(fields or MemberLevelIndex.DEFAULT_FIELDS)
+        unknown = [f for f in fields if f not in MEMBER_COLUMNS]
+        if unknown:
+            raise ValueError(f"Campos desconocidos: {', '.join(unknown)}")
+
+        paginated = limit is not None or cursor is not None
+        column = SORT_COLUMNS[sort]
+        args = [catalog, dimension, hierarchy, level, None if limit is None else limit + 1]
+        if cursor:
+            cursor_sort, key = MemberLevelIndex.decode_cursor(cursor)
+            if cursor_sort != sort:
+                raise ValueError("El cursor corresponde a otro orden")
+            query = SQL_MEMBERS_PAGE.format(sort=column, after=f"AND ({column}, unique_name) > ($6, $7)")
+            args.extend(key)
+        else:
+            query = SQL_MEMBERS_PAGE.format(sort=column, after='')
+
+        try:
+            if paginated:
+                rows, total = await asyncio.gather(
+                    self._fetch(query, *args),
+                    self._fetchrow(SQL_MEMBERS_COUNT, catalog, dimension, hierarchy, level)
+                )
+            else:
+                rows, total = await self._fetch(query, *args), None
+        except (asyncpg.DataError, TypeError) as e:
+            # Cursor con tipos que no corresponden al orden
+            raise ValueError(f"Cursor inválido: {cursor}") from e
+
+        has_more = limit is not None and len(rows) > limit
+        rows = rows[:limit] if has_more else rows
+        items = [
+            {field: (row[MEMBER_COLUMNS[field]] if MEMBER_COLUMNS[field] else None) for field in fields}
+            for row in rows
+        ]
+        if not paginated:
+            return items
+
+        last = rows[-1] if has_more else None
+        return {
+            'items': items,
+            'nextCursor': MemberLevelIndex.encode_cursor(sort, (last['sort_key'], last['unique_name'])) if last else None,
+            'total': total[0]
+        }
+
+    async def search_members(
+        self,
+        catalog: str,
+        query: str,
+        limit: int = 20,
+        hierarchy: Optional[str] = None,
+        level: Optional[str] = None
+    ) -> List[Dict]:
+        """Búsqueda sin acentos y tolerante a typos (índice trigram, migración 008)"""
+        if not query or not query.strip() or limit <= 0:
+            return []
+        rows = await self._fetch(SQL_SEARCH, catalog, query.strip(), hierarchy, level, limit)
+        return [
+            {
+                'caption': row['caption'],
+                'uniqueName': row['unique_name'],
+                'hierarchy': row['hierarchy_code'],
+                'level': row['level_name']
+            }
+            for row in rows
+        ]
+
+    async def get_children(
+        self,
+        catalog: str,
+        hierarchy: str,
+        parent: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100
+    ) -> Dict:
+        """Hijos directos de un miembro (o raíces de la jerarquía), paginados"""
+        if parent:
+            query = SQL_CHILDREN.format(parent_filter="m.parent_unique_name = $5")
+            rows = await self._fetch(query, catalog, hierarchy, offset, limit, parent)
+        else:
+            query = SQL_CHILDREN.format(parent_filter="nlevel(m.path) = 1")
+            rows = await self._fetch(query, catalog, hierarchy, offset, limit)
+
+        return {
+            'parent': parent or None,
+            'total': rows[0]['total'] if rows else 0,
+            'offset': offset,
+            'limit': limit,
+            'items': [
+                {
+                    'caption': row['caption'],
+                    'uniqueName': row['unique_name'],
+                    'level': row['level_name'],
+                    'childrenCardinality': row['children_cardinality'] or 0,
+                    'hasChildren': row['has_children']
+                }
+                for row in rows if row['unique_name'] is not None
+            ]
+        }
+
+    # ========== COMPUESTOS ==========
+
+    async def get_bootstrap(self, catalog: str) -> Dict:
+        """Como OlapService.get_bootstrap pero sin cargar miembros en memoria"""
+        measures, dimensions, apartados, cube_name = await asyncio.gather(
+            self.get_measures(catalog),
+            self.get_dimensions(catalog),
+            self.get_apartados(catalog),
+            self.get_cube_name(catalog)
+        )
+        return {
+            'catalog': catalog,
+            'cubeName': cube_name,
+            'measures': measures,
+            'dimensions': dimensions,
+            'apartados': apartados
+        }
+
+    async def load_members(self, catalog: str) -> int:
+        # Los miembros viven en PostgreSQL: nada que cargar por proceso
+        return 0
+
+    async def refresh_members(self, catalog: str) -> Dict:
+        # El refresh de OlapService reescribe el CSV local, que este backend
+        # no lee: los miembros se actualizan recargando la base
+        raise NotImplementedError(
+            "Con METADATA_BACKEND=postgres los miembros se actualizan con "
+            "database/migrate_csv_to_db.py"
+        )
+
+    async def warm_catalog(self, catalog: str, refresh: bool = False) -> Dict:
+        """Prepara statements y llena el cache de schema (medidas, cubo)"""
+        measures, dimensions, apartados, _ = await asyncio.gather(
+            self.get_measures(catalog),
+            self.get_dimensions(catalog),
+            self.get_apartados(catalog),
+            self.get_cube_name(catalog)
+        )
+        return {
+            'members': sum(lv['memberCount'] or 0 for d in dimensions for lv in d['levels']),
+            'measures': len(measures),
+            'hierarchies': len(dimensions),
+            'apartados': len(apartados)
+        }
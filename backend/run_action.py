@@ -16,7 +16,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
     import adodbapi
-    from DGIS_SCAN_2 import Config, ConnectionManager, MDXQueryTool, rows_to_df
+    from DGIS_SCAN_2 import Config, ConnectionManager, MDXQueryTool, MemberFetcher, rows_to_df
 except ImportError as e:
     logger.error(f"Faltan dependencias críticas: {e}")
     # Force exit if adodbapi is strictly required and missing
@@ -71,14 +71,37 @@ def run_scan_with_metadata(config: Config, catalog: str):
     # 2. Ejecutar consulta real
     tool = MDXQueryTool(config)
     
-    # Consulta de prueba: Metadata básica (Miembros) - Rápido y seguro
+    success_count = 0
+    
+    # Muestra de miembros: por jerarquía y proyectada (no un volcado completo)
+    logger.info("Descargando muestra de miembros [members_dump]...")
+    try:
+        fetcher = MemberFetcher(config)
+        frames, remaining = [], 1000
+        with ConnectionManager(config, catalog) as conn:
+            cursor = conn.cursor()
+            for h in fetcher.list_hierarchies(cursor):
+                df = fetcher.fetch_hierarchy(cursor, h['CUBE_NAME'], h['HIERARCHY_UNIQUE_NAME'], max_rows=remaining)
+                frames.append(df)
+                remaining -= len(df)
+                if remaining <= 0:
+                    break
+        
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if not df.empty:
+            df.to_csv("results_members_dump.csv", index=False)
+            logger.info(f"✅ members_dump: {len(df)} filas guardadas en results_members_dump.csv")
+            success_count += 1
+        else:
+            logger.warning("⚠️ members_dump: Sin resultados")
+    except Exception as e:
+        logger.error(f"❌ Error en members_dump: {e}")
+    
+    # Consulta de prueba: Metadata básica (Catálogos) - Rápido y seguro
     queries = [
-        (f"SELECT * FROM [{catalog}].$system.MDSCHEMA_MEMBERS", "members_dump"),
         (f"SELECT * FROM $system.DBSCHEMA_CATALOGS", "catalogs_dump")
     ]
     
-    success_count = 0
-    
     for mdx, label in queries:
         logger.info(f"Ejecutando MDX [{label}]...")
         try:
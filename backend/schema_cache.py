@@ -0,0 +1,95 @@
+"""
+Cache persistente de schema rowsets (MDSCHEMA_MEASURES, MDSCHEMA_HIERARCHIES...)
+Guarda en memoria y en disco, por catálogo, el resultado de cada rowset junto
+con la versión del catálogo (DATE_MODIFIED de DBSCHEMA_CATALOGS). Si la versión
+no cambia, el schema nunca se vuelve a descargar, ni siquiera tras reiniciar.
+
+Layout:
+    <cache_dir>/<CATALOGO>.json   {"version": "...", "rowsets": {"measures": [...], ...}}
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Columnas de DBSCHEMA_CATALOGS que identifican la versión del schema
+VERSION_COLUMNS = ('DATE_MODIFIED', 'LAST_SCHEMA_UPDATE')
+
+# Pseudo-catálogo para rowsets del servidor (lista de catálogos)
+SERVER_KEY = '_server'
+
+# Centinela: rowset ausente o de otra versión
+MISSING = object()
+
+
+def catalog_version(row: Dict) -> Optional[str]:
+    """Versión del catálogo a partir de su fila de DBSCHEMA_CATALOGS"""
+    for col in VERSION_COLUMNS:
+        value = row.get(col)
+        if value not in (None, ''):
+            return str(value)
+    return None
+
+
+class SchemaCache:
+    """Rowsets por catálogo, invalidados cuando cambia la versión del catálogo"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, catalog: str) -> Path:
+        return self.cache_dir / f"{catalog}.json"
+
+    def _entry(self, catalog: str) -> Dict:
+        entry = self._entries.get(catalog)
+        if entry is None:
+            entry = {'version': None, 'rowsets': {}}
+            path = self._path(catalog)
+            if path.exists():
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        entry = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Cache de schema ilegible para {catalog}: {e}")
+            self._entries[catalog] = entry
+        return entry
+
+    def get(self, catalog: str, kind: str, version: Optional[str]) -> Any:
+        """Rowset cacheado o MISSING
+
+        Con version=None (servidor sin versión o probe fallido) se sirve lo
+        que haya en cache, aunque sea de otra versión.
+        """
+        with self._lock:
+            entry = self._entry(catalog)
+            if version is not None and entry.get('version') != version:
+                return MISSING
+            return entry['rowsets'].get(kind, MISSING)
+
+    def put(self, catalog: str, kind: str, version: Optional[str], value: Any):
+        with self._lock:
+            entry = self._entry(catalog)
+            if version is not None and entry.get('version') != version:
+                # Catálogo reprocesado: todos los rowsets anteriores quedan obsoletos
+                entry = {'version': version, 'rowsets': {}}
+                self._entries[catalog] = entry
+            entry['rowsets'][kind] = value
+            self._write(catalog, entry)
+
+    def _write(self, catalog: str, entry: Dict):
+        path = self._path(catalog)
+        tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}-{threading.get_ident()}")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar cache de schema de {catalog}: {e}")
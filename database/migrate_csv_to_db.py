@@ -6,15 +6,29 @@ Converts OLAP member CSVs to normalized PostgreSQL schema
 Usage:
   python database/migrate_csv_to_db.py --csv ../DOCS/SIS_2025_miembros_completos.csv
   python database/migrate_csv_to_db.py --csv ../DOCS/SIS_2025_miembros_completos.csv --dry-run
+  python database/migrate_csv_to_db.py --dir ../DOCS --workers 6
+  python database/migrate_csv_to_db.py --all            # every catalog CSV in the current directory
+
+Catalogs whose CSV content hash matches the last load are skipped (--force to reload).
+Catalogs loaded before are synced incrementally: only hierarchies whose content
+hash changed are diffed (inserts, updates and deletes in one transaction).
+--replace rebuilds a catalog in a new table and swaps its members partition.
+Requires migrations up to 011; mv_members_full is refreshed once at the end.
 """
 
+import numpy as np
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_batch
+from psycopg2 import pool, sql
+from psycopg2.extras import execute_values
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import io
 import sys
 import os
-from typing import Dict
+import time
+from typing import Dict, List
 import argparse
 from tqdm import tqdm
 import re
@@ -26,215 +40,771 @@ if not DATABASE_URL:
     print("   Run: export DATABASE_URL='postgresql://...'")
     sys.exit(1)
 
+# Rows per chunk read from the CSV and sent through COPY
+MIGRATION_CHUNK_SIZE = int(os.environ.get('MIGRATION_CHUNK_SIZE', '100000'))
+
+REQUIRED_COLUMNS = [
+    'CATALOGO', 'DIMENSION', 'JERARQUIA', 'NIVEL_NOMBRE', 
+    'NIVEL_NUMERO', 'MIEMBRO_CAPTION', 'MIEMBRO_UNIQUE_NAME'
+]
+OPTIONAL_COLUMNS = ['PARENT_UNIQUE_NAME', 'CHILDREN_CARDINALITY', 'MIEMBRO_ORDINAL']
+
+# Repeated on every row with few distinct values: read as categoricals
+CATEGORY_COLUMNS = ['DIMENSION', 'JERARQUIA', 'NIVEL_NOMBRE', 'PARENT_UNIQUE_NAME']
+
 def extract_year(catalog_code: str) -> int:
     """Extract year from catalog code (e.g. 'SIS_2025' -> 2025)"""
     match = re.search(r'(\d{4})', catalog_code)
     return int(match.group(1)) if match else None
 
-def migrate_catalog(csv_path: Path, catalog_code: str, dry_run: bool = False):
+def upsert_dimensions(cur, catalog_id: int, df: pd.DataFrame, dim_map: Dict[str, int]) -> Dict[str, int]:
+    """Multi-row upsert of dimensions not yet in dim_map -> dim_map ({code: id})"""
+    codes = [code for code in df['DIMENSION'].drop_duplicates().tolist() if code not in dim_map]
+    if codes:
+        rows = execute_values(cur, """
+            INSERT INTO dimensions (catalog_id, code, name)
+            VALUES %s
+            ON CONFLICT (catalog_id, code) DO UPDATE SET name = EXCLUDED.name
+            RETURNING id, code
+        """, [(catalog_id, code, code) for code in codes], page_size=len(codes), fetch=True)
+        dim_map.update({code: dim_id for dim_id, code in rows})
+    return dim_map
+
+def upsert_hierarchies(cur, dim_map: Dict[str, int], df: pd.DataFrame,
+                       hier_map: Dict[tuple, int]) -> Dict[tuple, int]:
+    """Multi-row upsert of new hierarchies -> hier_map ({(dimension, hierarchy): id})"""
+    pairs = df[['DIMENSION', 'JERARQUIA']].drop_duplicates()
+    values = [
+        (dim_map[dim], hier, hier)
+        for dim, hier in zip(pairs['DIMENSION'], pairs['JERARQUIA'])
+        if (dim, hier) not in hier_map
+    ]
+    if values:
+        rows = execute_values(cur, """
+            INSERT INTO hierarchies (dimension_id, code, name)
+            VALUES %s
+            ON CONFLICT (dimension_id, code) DO UPDATE SET name = EXCLUDED.name
+            RETURNING id, dimension_id, code
+        """, values, page_size=len(values), fetch=True)
+        dim_codes = {dim_id: code for code, dim_id in dim_map.items()}
+        hier_map.update({(dim_codes[dim_id], code): hier_id for hier_id, dim_id, code in rows})
+    return hier_map
+
+def upsert_levels(cur, hier_map: Dict[tuple, int], df: pd.DataFrame,
+                  level_map: Dict[tuple, int]) -> Dict[tuple, int]:
+    """Multi-row upsert of new levels -> level_map ({(dimension, hierarchy, level): id})"""
+    # One row per (hierarchy, level): ON CONFLICT cannot touch the same row twice
+    levels = df[['DIMENSION', 'JERARQUIA', 'NIVEL_NOMBRE', 'NIVEL_NUMERO']].drop_duplicates(
+        subset=['DIMENSION', 'JERARQUIA', 'NIVEL_NOMBRE']
+    )
+    numbers = pd.to_numeric(levels['NIVEL_NUMERO'], errors='coerce')
+    values = [
+        (hier_map[(dim, hier)], name, None if pd.isna(number) else int(number))
+        for dim, hier, name, number in zip(
+            levels['DIMENSION'], levels['JERARQUIA'], levels['NIVEL_NOMBRE'], numbers
+        )
+        if (dim, hier, name) not in level_map
+    ]
+    if values:
+        rows = execute_values(cur, """
+            INSERT INTO levels (hierarchy_id, name, number)
+            VALUES %s
+            ON CONFLICT (hierarchy_id, name) DO UPDATE SET number = EXCLUDED.number
+            RETURNING id, hierarchy_id, name
+        """, values, page_size=len(values), fetch=True)
+        hier_keys = {hier_id: key for key, hier_id in hier_map.items()}
+        level_map.update({hier_keys[hier_id] + (name,): level_id for level_id, hier_id, name in rows})
+    return level_map
+
+def csv_columns(csv_path: Path) -> List[str]:
+    """Header of the CSV without reading any data"""
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+def read_csv_chunks(csv_path: Path, columns: List[str], chunksize: int = None):
     """
-    Migrate a single catalog CSV to PostgreSQL
+    Iterate the CSV in fixed-size chunks with compact dtypes
+    
+    Only the columns the loader uses are parsed; low-cardinality columns
+    (dimension, hierarchy, level, parent) are dictionary-encoded as
+    categoricals, so peak memory depends on the chunk size, not the catalog.
+    """
+    usecols = [col for col in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if col in columns and col != 'CATALOGO']
+    dtype = {col: 'category' for col in CATEGORY_COLUMNS if col in usecols}
+    dtype.update({'MIEMBRO_CAPTION': str, 'MIEMBRO_UNIQUE_NAME': str})
+    return pd.read_csv(csv_path, usecols=usecols, dtype=dtype, chunksize=chunksize or MIGRATION_CHUNK_SIZE)
+
+def members_copy_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Member columns in members_stage order, with defaults for optional columns"""
+    def optional(col, default):
+        return df[col] if col in df.columns else pd.Series(default, index=df.index)
+    
+    return pd.DataFrame({
+        'dimension': df['DIMENSION'],
+        'hierarchy': df['JERARQUIA'],
+        'level_name': df['NIVEL_NOMBRE'],
+        'caption': df['MIEMBRO_CAPTION'].fillna(''),
+        'unique_name': df['MIEMBRO_UNIQUE_NAME'],
+        'parent_unique_name': optional('PARENT_UNIQUE_NAME', None),
+        'children_cardinality': pd.to_numeric(optional('CHILDREN_CARDINALITY', 0), errors='coerce').fillna(0).astype('int64'),
+        'ordinal': pd.to_numeric(optional('MIEMBRO_ORDINAL', 0), errors='coerce').fillna(0).astype('int64'),
+    })
+
+def stage_members(cur, df: pd.DataFrame, truncate: bool = True):
+    """Stream members through COPY into the temp staging table members_stage"""
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS members_stage (
+            dimension TEXT,
+            hierarchy TEXT,
+            level_name TEXT,
+            caption TEXT,
+            unique_name TEXT,
+            parent_unique_name TEXT,
+            children_cardinality INT,
+            ordinal INT
+        ) ON COMMIT DROP
+    """)
+    if truncate:
+        cur.execute("TRUNCATE members_stage")
+    
+    # NULL is written as \N so empty captions stay empty strings
+    buffer = io.StringIO()
+    members_copy_frame(df).to_csv(buffer, index=False, header=False, na_rep='\\N')
+    buffer.seek(0)
+    cur.copy_expert(
+        "COPY members_stage FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+        buffer
+    )
+
+def copy_members(cur, catalog_id: int, df: pd.DataFrame, table: str = 'members') -> int:
+    """
+    Stream members through COPY into a temp staging table, then resolve
+    level_id with a single set-based INSERT ... SELECT ... JOIN.
+    
+    Args:
+        table: 'members' (routed to the catalog's partition) or a standalone
+               load table that will be swapped in as the partition
+    
+    Returns:
+        Number of members inserted (unique names already in the catalog are skipped)
+    """
+    stage_members(cur, df)
+    cur.execute(sql.SQL("""
+        INSERT INTO {} (catalog_id, level_id, caption, unique_name, parent_unique_name, children_cardinality, ordinal)
+        SELECT d.catalog_id, l.id, s.caption, s.unique_name, s.parent_unique_name, s.children_cardinality, s.ordinal
+        FROM members_stage s
+        JOIN dimensions d ON d.catalog_id = %s AND d.code = s.dimension
+        JOIN hierarchies h ON h.dimension_id = d.id AND h.code = s.hierarchy
+        JOIN levels l ON l.hierarchy_id = h.id AND l.name = s.level_name
+        ON CONFLICT (catalog_id, unique_name) DO NOTHING
+    """).format(sql.Identifier(table)), (catalog_id,))
+    return cur.rowcount
+
+def partition_name(catalog_id: int) -> str:
+    """Name of the catalog's members partition (see ensure_members_partition)"""
+    return f"members_c{catalog_id}"
+
+def create_load_table(cur, catalog_id: int) -> str:
+    """
+    Empty standalone table shaped like the catalog's members partition
+    
+    The CHECK constraint lets ATTACH PARTITION skip its validation scan and
+    the copied indexes are adopted as-is, so the swap never builds anything
+    while holding the lock on members.
+    """
+    load_table = f"{partition_name(catalog_id)}_load"
+    cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(load_table)))
+    cur.execute(sql.SQL("""
+        CREATE TABLE {} (
+            LIKE members INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING INDEXES,
+            CHECK (catalog_id = {})
+        )
+    """).format(sql.Identifier(load_table), sql.Literal(catalog_id)))
+    return load_table
+
+def swap_partition(cur, catalog_id: int, load_table: str):
+    """
+    Replace the catalog's partition with load_table (atomic within the transaction)
+    
+    DETACH/ATTACH lock members until commit: run this last, right before it.
+    """
+    partition = partition_name(catalog_id)
+    cur.execute(sql.SQL("ALTER TABLE members DETACH PARTITION {}").format(sql.Identifier(partition)))
+    cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(partition)))
+    cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+        sql.Identifier(load_table), sql.Identifier(partition)
+    ))
+    cur.execute(sql.SQL("ALTER TABLE members ATTACH PARTITION {} FOR VALUES IN ({})").format(
+        sql.Identifier(partition), sql.Literal(catalog_id)
+    ))
+
+class HierarchyDigest:
+    """
+    Order-independent content hash per (dimension, hierarchy)
+    
+    Accumulated chunk by chunk: the hash is the wrapping 64-bit sum of the
+    per-row hashes of every stored member column, so it only depends on the
+    member set, not on the order the scanner wrote it.
+    """
+    
+    HASH_COLUMNS = ['level_name', 'caption', 'unique_name', 'parent_unique_name',
+                    'children_cardinality', 'ordinal']
+    
+    def __init__(self):
+        self.sums: Dict[tuple, int] = {}
+        self.counts: Dict[tuple, int] = {}
+    
+    def update(self, df: pd.DataFrame):
+        frame = members_copy_frame(df)
+        row_hashes = pd.util.hash_pandas_object(frame[self.HASH_COLUMNS], index=False).to_numpy()
+        keys = pd.MultiIndex.from_arrays([frame['dimension'].astype(object), frame['hierarchy'].astype(object)])
+        codes, uniques = pd.factorize(keys)
+        sums = np.zeros(len(uniques), dtype=np.uint64)
+        np.add.at(sums, codes, row_hashes)  # wraps modulo 2**64
+        counts = np.bincount(codes, minlength=len(uniques))
+        for key, total, count in zip(uniques, sums.tolist(), counts.tolist()):
+            self.sums[key] = (self.sums.get(key, 0) + total) & 0xFFFFFFFFFFFFFFFF
+            self.counts[key] = self.counts.get(key, 0) + count
+    
+    def keys(self):
+        return self.sums.keys()
+    
+    def hexdigest(self, key: tuple) -> str:
+        return f"{self.sums[key]:016x}:{self.counts[key]}"
+
+def stored_digests(cur, catalog_id: int) -> Dict[tuple, tuple]:
+    """{(dimension, hierarchy): (hierarchy_id, content_hash)} as last synced"""
+    cur.execute("""
+        SELECT d.code, h.code, h.id, h.content_hash
+        FROM hierarchies h
+        JOIN dimensions d ON h.dimension_id = d.id
+        WHERE d.catalog_id = %s
+    """, (catalog_id,))
+    return {(dim, hier): (hier_id, content_hash) for dim, hier, hier_id, content_hash in cur.fetchall()}
+
+def save_digests(cur, hier_map: Dict[tuple, int], digest: HierarchyDigest):
+    """Record each hierarchy's content hash and member count"""
+    values = [
+        (hier_map[key], digest.hexdigest(key), digest.counts[key])
+        for key in digest.keys() if key in hier_map
+    ]
+    if values:
+        execute_values(cur, """
+            UPDATE hierarchies h
+            SET content_hash = v.content_hash, member_count = v.member_count
+            FROM (VALUES %s) AS v(id, content_hash, member_count)
+            WHERE h.id = v.id
+        """, values, page_size=len(values))
+
+def apply_staged_diff(cur, catalog_id: int, hierarchy_ids: List[int]) -> Dict[str, int]:
+    """
+    Make the members of the given hierarchies match members_stage exactly
+    
+    Set-based: deletes members no longer present, updates the ones whose
+    columns changed and inserts the new ones. Unchanged rows are not touched.
+    """
+    cur.execute("DROP TABLE IF EXISTS members_resolved")
+    cur.execute("""
+        CREATE TEMP TABLE members_resolved ON COMMIT DROP AS
+        SELECT l.id AS level_id, s.caption, s.unique_name, s.parent_unique_name,
+               s.children_cardinality, s.ordinal
+        FROM members_stage s
+        JOIN dimensions d ON d.catalog_id = %s AND d.code = s.dimension
+        JOIN hierarchies h ON h.dimension_id = d.id AND h.code = s.hierarchy
+        JOIN levels l ON l.hierarchy_id = h.id AND l.name = s.level_name
+    """, (catalog_id,))
+    cur.execute("CREATE INDEX ON members_resolved (unique_name)")
+    cur.execute("ANALYZE members_resolved")
+    
+    cur.execute("""
+        DELETE FROM members m
+        USING levels l
+        WHERE m.catalog_id = %s
+          AND m.level_id = l.id
+          AND l.hierarchy_id = ANY(%s)
+          AND NOT EXISTS (SELECT 1 FROM members_resolved r WHERE r.unique_name = m.unique_name)
+    """, (catalog_id, hierarchy_ids))
+    deleted = cur.rowcount
+    
+    cur.execute("""
+        UPDATE members m
+        SET level_id = r.level_id,
+            caption = r.caption,
+            parent_unique_name = r.parent_unique_name,
+            children_cardinality = r.children_cardinality,
+            ordinal = r.ordinal
+        FROM members_resolved r, levels l
+        WHERE m.catalog_id = %s
+          AND m.level_id = l.id
+          AND l.hierarchy_id = ANY(%s)
+          AND m.unique_name = r.unique_name
+          AND (m.level_id, m.caption, m.parent_unique_name, m.children_cardinality, m.ordinal)
+              IS DISTINCT FROM
+              (r.level_id, r.caption, r.parent_unique_name, r.children_cardinality, r.ordinal)
+    """, (catalog_id, hierarchy_ids))
+    updated = cur.rowcount
+    
+    cur.execute("""
+        INSERT INTO members (catalog_id, level_id, caption, unique_name, parent_unique_name, children_cardinality, ordinal)
+        SELECT %s, level_id, caption, unique_name, parent_unique_name, children_cardinality, ordinal
+        FROM members_resolved
+        ON CONFLICT (catalog_id, unique_name) DO NOTHING
+    """, (catalog_id,))
+    inserted = cur.rowcount
+    
+    return {'inserted': inserted, 'updated': updated, 'deleted': deleted}
+
+def update_member_paths(cur, catalog_id: int, log, table: str = 'members') -> int:
+    """Recompute the catalog's ltree paths in table (only changed rows are written)"""
+    cur.execute("SELECT rebuild_member_paths(%s, %s::regclass)", (catalog_id, table))
+    updated = cur.fetchone()[0]
+    log(f"   🌳 {updated:,} member paths updated")
+    return updated
+
+def update_level_counts(cur, catalog_id: int, log, table: str = 'members') -> int:
+    """Store each level's member count in table (read by the backend's get_dimensions)"""
+    cur.execute(sql.SQL("""
+        UPDATE levels l
+        SET member_count = counts.members
+        FROM (
+            SELECT lv.id, count(m.level_id) AS members
+            FROM levels lv
+            JOIN hierarchies h ON h.id = lv.hierarchy_id
+            JOIN dimensions d ON d.id = h.dimension_id
+            LEFT JOIN {} m ON m.catalog_id = %s AND m.level_id = lv.id
+            WHERE d.catalog_id = %s
+            GROUP BY lv.id
+        ) counts
+        WHERE l.id = counts.id AND l.member_count <> counts.members
+    """).format(sql.Identifier(table)), (catalog_id, catalog_id))
+    log(f"   🔢 {cur.rowcount:,} level counts updated")
+    return cur.rowcount
+
+def bulk_load_members(cur, catalog_id: int, csv_path: Path, columns: List[str], log,
+                      table: str = 'members') -> tuple:
+    """
+    First load (or --replace) of a catalog: stream chunks, upsert new
+    dimensions/hierarchies/levels (one statement each) and COPY each chunk's
+    members into table
+    
+    Returns:
+        (rows read, hier_map, HierarchyDigest)
+    """
+    log(f"\n4️⃣  Streaming members in chunks of {MIGRATION_CHUNK_SIZE:,} rows...")
+    dim_map, hier_map, level_map = {}, {}, {}
+    digest = HierarchyDigest()
+    rows = inserted = 0
+    for number, chunk in enumerate(read_csv_chunks(csv_path, columns), 1):
+        upsert_dimensions(cur, catalog_id, chunk, dim_map)
+        upsert_hierarchies(cur, dim_map, chunk, hier_map)
+        upsert_levels(cur, hier_map, chunk, level_map)
+        inserted += copy_members(cur, catalog_id, chunk, table)
+        digest.update(chunk)
+        rows += len(chunk)
+        log(f"   Chunk {number}: {rows:,} rows read, {inserted:,} members inserted")
+    
+    log(f"   ✅ {len(dim_map)} dimensions, {len(hier_map)} hierarchies, {len(level_map)} levels upserted")
+    log(f"   ✅ {inserted:,} members inserted")
+    return rows, hier_map, digest
+
+def sync_members(cur, catalog_id: int, csv_path: Path, columns: List[str], log) -> tuple:
+    """
+    Re-load of an existing catalog: only hierarchies whose content hash
+    changed are staged and diffed; hierarchies gone from the CSV are removed
+    
+    Returns:
+        (rows read, hier_map, HierarchyDigest)
+    """
+    log("\n4️⃣  Hashing hierarchies...")
+    digest = HierarchyDigest()
+    rows = 0
+    for chunk in read_csv_chunks(csv_path, columns):
+        digest.update(chunk)
+        rows += len(chunk)
+    
+    stored = stored_digests(cur, catalog_id)
+    changed = [key for key in digest.keys() if stored.get(key, (None, None))[1] != digest.hexdigest(key)]
+    removed = [hier_id for key, (hier_id, _) in stored.items() if key not in digest.sums]
+    log(f"   ✅ {len(digest.sums)} hierarchies: {len(changed)} changed, {len(removed)} removed")
+    
+    if removed:
+        cur.execute("DELETE FROM hierarchies WHERE id = ANY(%s)", (removed,))
+        log(f"   🗑️  {len(removed)} hierarchies removed ({cur.rowcount} rows)")
+        if not changed:
+            # Members of removed hierarchies may have been parents elsewhere
+            update_member_paths(cur, catalog_id, log)
+    
+    hier_map = {key: hier_id for key, (hier_id, _) in stored.items() if key in digest.sums}
+    if not changed:
+        log("   ✅ Members unchanged")
+        return rows, hier_map, digest
+    
+    log(f"\n5️⃣  Staging members of {len(changed)} changed hierarchies...")
+    dim_map, level_map = {}, {}
+    changed_index = pd.MultiIndex.from_tuples(changed)
+    cur.execute("DROP TABLE IF EXISTS members_stage")
+    staged = 0
+    for chunk in read_csv_chunks(csv_path, columns):
+        keys = pd.MultiIndex.from_arrays([chunk['DIMENSION'].astype(object), chunk['JERARQUIA'].astype(object)])
+        chunk = chunk[keys.isin(changed_index)]
+        if chunk.empty:
+            continue
+        upsert_dimensions(cur, catalog_id, chunk, dim_map)
+        upsert_hierarchies(cur, dim_map, chunk, hier_map)
+        upsert_levels(cur, hier_map, chunk, level_map)
+        stage_members(cur, chunk, truncate=False)
+        staged += len(chunk)
+    
+    counts = apply_staged_diff(cur, catalog_id, [hier_map[key] for key in changed])
+    log(f"   ✅ {staged:,} rows staged: {counts['inserted']:,} inserted, "
+        f"{counts['updated']:,} updated, {counts['deleted']:,} deleted")
+    update_member_paths(cur, catalog_id, log)
+    return rows, hier_map, digest
+
+def file_hash(csv_path: Path) -> str:
+    """SHA-256 of the CSV contents (used to skip catalogs already loaded)"""
+    digest = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def catalog_code_from_path(csv_path: Path) -> str:
+    """'SIS_2025_miembros_completos_v2.csv' -> 'SIS_2025'"""
+    return re.sub(r'_miembros_completos(_v\d+)?$', '', csv_path.stem)
+
+def discover_csvs(directory: Path) -> Dict[str, Path]:
+    """Every *_miembros_completos*.csv in directory -> {catalog_code: path}
+    
+    When a catalog has several versions (e.g. plain and _v2) the newest
+    format wins.
+    """
+    found = {}
+    for csv_path in sorted(directory.glob('*_miembros_completos*.csv')):
+        found[catalog_code_from_path(csv_path)] = csv_path
+    return found
+
+def already_loaded(cur, catalog_code: str, source_hash: str) -> bool:
+    """True if the catalog was loaded from a CSV with the same content hash"""
+    cur.execute(
+        "SELECT 1 FROM catalogs WHERE code = %s AND source_hash = %s",
+        (catalog_code, source_hash)
+    )
+    return cur.fetchone() is not None
+
+def prepare_catalogs(conn, catalog_codes: List[str]) -> Dict[str, int]:
+    """
+    Upsert catalog rows and create their members partitions -> {code: id}
+    
+    CREATE TABLE ... PARTITION OF takes an ACCESS EXCLUSIVE lock on members,
+    so each catalog is committed on its own before any load starts: the
+    lock is held for milliseconds, not for a whole catalog load (which would
+    serialize parallel loads and block every reader).
+    """
+    catalog_ids = {}
+    with conn.cursor() as cur:
+        for catalog_code in catalog_codes:
+            cur.execute("""
+                INSERT INTO catalogs (code, name, year)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (code) DO UPDATE SET name = EXCLUDED.name
+                RETURNING id
+            """, (catalog_code, catalog_code, extract_year(catalog_code)))
+            catalog_ids[catalog_code] = cur.fetchone()[0]
+            cur.execute("SELECT ensure_members_partition(%s)", (catalog_ids[catalog_code],))
+            conn.commit()
+    return catalog_ids
+
+def migrate_catalog(csv_path: Path, catalog_code: str, dry_run: bool = False,
+                    conn=None, force: bool = False, verbose: bool = True,
+                    replace: bool = False) -> Dict:
+    """
+    Migrate a single catalog CSV to PostgreSQL (one transaction)
     
     Args:
         csv_path: Path to CSV file
         catalog_code: Catalog code (e.g. 'SIS_2025')
         dry_run: If True, don't actually insert data
+        conn: Open connection to use (e.g. from a pool); opened and closed here if None
+        force: Reload even if the catalog was loaded from an identical CSV
+        verbose: Print step-by-step progress
+        replace: Load into a fresh table and swap it in as the catalog's
+                 partition instead of syncing the existing one
+    
+    Returns:
+        {'catalog', 'status': loaded|skipped|dry-run|failed, 'rows', 'seconds', 'error'}
     """
-    print(f"\n{'='*60}")
-    print(f"📂 Migrating: {catalog_code}")
-    print(f"📄 Source: {csv_path}")
-    print(f"{'='*60}\n")
+    log = print if verbose else (lambda *args, **kwargs: None)
+    started = time.perf_counter()
+    result = {'catalog': catalog_code, 'status': 'failed', 'rows': 0, 'seconds': 0.0, 'error': None}
+    
+    def finish(status: str, error: str = None) -> Dict:
+        result.update(status=status, error=error, seconds=time.perf_counter() - started)
+        if error and not verbose:
+            print(f"   ❌ {catalog_code}: {error}")
+        return result
     
-    # 1. Load CSV
-    print("1️⃣  Loading CSV...")
+    log(f"\n{'='*60}")
+    log(f"📂 Migrating: {catalog_code}")
+    log(f"📄 Source: {csv_path}")
+    log(f"{'='*60}\n")
+    
+    # 1. Inspect CSV (rows are streamed in chunks later, never loaded whole)
+    log("1️⃣  Inspecting CSV...")
     try:
-        df = pd.read_csv(csv_path)
-        print(f"   ✅ Loaded {len(df):,} rows, {len(df.columns)} columns")
+        columns = csv_columns(csv_path)
+        source_hash = file_hash(csv_path)
+        log(f"   ✅ {len(columns)} columns, {csv_path.stat().st_size / 1e6:,.1f} MB")
     except Exception as e:
-        print(f"   ❌ Failed to load CSV: {e}")
-        return False
+        log(f"   ❌ Failed to read CSV: {e}")
+        return finish('failed', f"Failed to read CSV: {e}")
     
     # 2. Validate required columns
-    required_cols = [
-        'CATALOGO', 'DIMENSION', 'JERARQUIA', 'NIVEL_NOMBRE', 
-        'NIVEL_NUMERO', 'MIEMBRO_CAPTION', 'MIEMBRO_UNIQUE_NAME'
-    ]
-    missing = [col for col in required_cols if col not in df.columns]
+    missing = [col for col in REQUIRED_COLUMNS if col not in columns]
     if missing:
-        print(f"   ❌ Missing columns: {missing}")
-        print(f"   Available columns: {list(df.columns)}")
-        return False
+        log(f"   ❌ Missing columns: {missing}")
+        log(f"   Available columns: {columns}")
+        return finish('failed', f"Missing columns: {missing}")
     
-    print(f"   ✅ All required columns present")
+    log(f"   ✅ All required columns present")
     
     # 3. Connect to database
-    print("\n2️⃣  Connecting to PostgreSQL...")
+    log("\n2️⃣  Connecting to PostgreSQL...")
+    own_conn = conn is None
     try:
-        conn = psycopg2.connect(DATABASE_URL)
+        if own_conn:
+            conn = psycopg2.connect(DATABASE_URL)
         cur = conn.cursor()
         host = DATABASE_URL.split('@')[1].split('/')[0]
-        print(f"   ✅ Connected to {host}")
+        log(f"   ✅ Connected to {host}")
     except Exception as e:
-        print(f"   ❌ Connection failed: {e}")
-        return False
-    
-    if dry_run:
-        print("\n🔍 DRY RUN MODE - No data will be inserted\n")
-        print(f"   Would process {len(df):,} members")
-        print(f"   Estimated time: ~{len(df) // 1000} minutes")
-        conn.close()
-        return True
+        log(f"   ❌ Connection failed: {e}")
+        return finish('failed', f"Connection failed: {e}")
     
     try:
-        # 4. Insert catalog
-        print("\n3️⃣  Inserting catalog...")
-        cur.execute("""
-            INSERT INTO catalogs (code, name, year)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (code) DO UPDATE SET name = EXCLUDED.name
-            RETURNING id
-        """, (catalog_code, catalog_code, extract_year(catalog_code)))
-        catalog_id = cur.fetchone()[0]
-        print(f"   ✅ Catalog ID: {catalog_id}")
+        if not force and already_loaded(cur, catalog_code, source_hash):
+            conn.rollback()
+            log(f"\n⏭️  {catalog_code} already loaded from this CSV (hash {source_hash[:12]}), skipping")
+            return finish('skipped')
         
-        # 5. Get unique dimensions
-        print("\n4️⃣  Processing dimensions...")
-        dimensions = df[['DIMENSION']].drop_duplicates()
-        dim_map = {}
+        if dry_run:
+            conn.rollback()
+            log("\n🔍 DRY RUN MODE - No data will be inserted\n")
+            rows = sum(len(chunk) for chunk in read_csv_chunks(csv_path, columns))
+            log(f"   Would process {rows:,} members")
+            return finish('dry-run')
         
-        for _, row in tqdm(dimensions.iterrows(), total=len(dimensions), desc="   Dimensions", unit="dim"):
-            cur.execute("""
-                INSERT INTO dimensions (catalog_id, code, name)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (catalog_id, code) DO UPDATE SET name = EXCLUDED.name
-                RETURNING id
-            """, (catalog_id, row['DIMENSION'], row['DIMENSION']))
-            dim_map[row['DIMENSION']] = cur.fetchone()[0]
-        
-        print(f"   ✅ {len(dim_map)} dimensions inserted")
-        
-        # 6. Get unique hierarchies
-        print("\n5️⃣  Processing hierarchies...")
-        hierarchies = df[['DIMENSION', 'JERARQUIA']].drop_duplicates()
-        hier_map = {}
-        
-        for _, row in tqdm(hierarchies.iterrows(), total=len(hierarchies), desc="   Hierarchies", unit="hier"):
-            dim_id = dim_map[row['DIMENSION']]
-            cur.execute("""
-                INSERT INTO hierarchies (dimension_id, code, name)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (dimension_id, code) DO UPDATE SET name = EXCLUDED.name
-                RETURNING id
-            """, (dim_id, row['JERARQUIA'], row['JERARQUIA']))
-            hier_map[(row['DIMENSION'], row['JERARQUIA'])] = cur.fetchone()[0]
-        
-        print(f"   ✅ {len(hier_map)} hierarchies inserted")
+        # 4. Insert catalog and its partition (committed on their own: creating
+        # a partition locks members, which must not last the whole load)
+        log("\n3️⃣  Inserting catalog...")
+        catalog_id = prepare_catalogs(conn, [catalog_code])[catalog_code]
+        log(f"   ✅ Catalog ID: {catalog_id} (partition {partition_name(catalog_id)})")
         
-        # 7. Get unique levels
-        print("\n6️⃣  Processing levels...")
-        levels = df[['DIMENSION', 'JERARQUIA', 'NIVEL_NOMBRE', 'NIVEL_NUMERO']].drop_duplicates()
-        level_map = {}
+        # Catalogs loaded before are synced incrementally instead of re-copied.
+        # Members from older loads (no source_hash, no content hashes) sync
+        # too: every hierarchy counts as changed, so stale members are removed
+        cur.execute("SELECT EXISTS (SELECT 1 FROM members WHERE catalog_id = %s)", (catalog_id,))
+        previously_loaded = cur.fetchone()[0]
         
-        for _, row in tqdm(levels.iterrows(), total=len(levels), desc="   Levels", unit="level"):
-            hier_id = hier_map[(row['DIMENSION'], row['JERARQUIA'])]
-            cur.execute("""
-                INSERT INTO levels (hierarchy_id, name, number)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (hierarchy_id, name) DO UPDATE SET number = EXCLUDED.number
-                RETURNING id
-            """, (hier_id, row['NIVEL_NOMBRE'], int(row['NIVEL_NUMERO'])))
-            level_map[(row['DIMENSION'], row['JERARQUIA'], row['NIVEL_NOMBRE'])] = cur.fetchone()[0]
-        
-        print(f"   ✅ {len(level_map)} levels inserted")
-        
-        # 8. Batch insert members
-        print(f"\n7️⃣  Batch inserting {len(df):,} members...")
-        member_data = []
-        
-        for _, row in df.iterrows():
-            level_id = level_map[(row['DIMENSION'], row['JERARQUIA'], row['NIVEL_NOMBRE'])]
-            member_data.append((
-                level_id,
-                row['MIEMBRO_CAPTION'],
-                row['MIEMBRO_UNIQUE_NAME'],
-                row.get('PARENT_UNIQUE_NAME'),
-                int(row.get('CHILDREN_CARDINALITY', 0)),
-                int(row.get('MIEMBRO_ORDINAL', 0))
-            ))
-        
-        # Batch insert for performance (1000 rows at a time)
-        batch_size = 1000
-        for i in tqdm(range(0, len(member_data), batch_size), desc="   Members", unit="batch"):
-            batch = member_data[i:i+batch_size]
-            execute_batch(cur, """
-                INSERT INTO members (level_id, caption, unique_name, parent_unique_name, children_cardinality, ordinal)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (unique_name) DO NOTHING
-            """, batch, page_size=1000)
-        
-        print(f"   ✅ Members inserted")
+        # 5. Members: bulk COPY on first load, per-hierarchy diff afterwards
+        load_table = None
+        if replace:
+            load_table = create_load_table(cur, catalog_id)
+            rows, hier_map, digest = bulk_load_members(cur, catalog_id, csv_path, columns, log, load_table)
+            update_member_paths(cur, catalog_id, log, load_table)
+        elif previously_loaded:
+            rows, hier_map, digest = sync_members(cur, catalog_id, csv_path, columns, log)
+        else:
+            rows, hier_map, digest = bulk_load_members(cur, catalog_id, csv_path, columns, log)
+            update_member_paths(cur, catalog_id, log)
+        update_level_counts(cur, catalog_id, log, load_table or 'members')
+        save_digests(cur, hier_map, digest)
         
-        # 9. Commit transaction
+        # 6. Record source hash and commit (one transaction per catalog)
+        cur.execute("""
+            UPDATE catalogs SET source_hash = %s, loaded_at = NOW()
+            WHERE id = %s
+        """, (source_hash, catalog_id))
+        if load_table:
+            # Last statements before commit: the swap locks members
+            swap_partition(cur, catalog_id, load_table)
+            log(f"   🔁 Partition {partition_name(catalog_id)} swapped")
         conn.commit()
-        print("\n✅ Migration complete!")
+        result['rows'] = rows
+        log("\n✅ Migration complete!")
         
-        # 10. Verify row counts
-        print("\n📊 Verification:")
-        cur.execute("""
-            SELECT COUNT(*) 
-            FROM members m
-            JOIN levels l ON m.level_id = l.id
-            JOIN hierarchies h ON l.hierarchy_id = h.id
-            JOIN dimensions d ON h.dimension_id = d.id
-            WHERE d.catalog_id = %s
-        """, (catalog_id,))
-        count = cur.fetchone()[0]
-        print(f"   Total members in DB: {count:,}")
-        print(f"   Expected from CSV: {len(df):,}")
+        if verbose:
+            verify_catalog(cur, catalog_id, catalog_code, rows)
         
-        if count == len(df):
-            print("   ✅ Counts match perfectly!")
-        else:
-            diff = abs(count - len(df))
-            print(f"   ⚠️  Mismatch: {diff:,} difference (duplicates skipped)")
+        return finish('loaded')
         
-        # 11. Count apartados
-        cur.execute("""
-            SELECT COUNT(*) 
-            FROM v_members_full
-            WHERE catalog_code = %s AND level_name = 'Apartado'
-        """, (catalog_code,))
-        apartado_count = cur.fetchone()[0]
-        print(f"\n   🎯 Apartados found: {apartado_count:,}")
+    except Exception as e:
+        log(f"\n❌ Migration failed: {e}")
+        if verbose:
+            import traceback
+            traceback.print_exc()
+        conn.rollback()
+        return finish('failed', f"Migration failed: {e}")
+    finally:
+        if own_conn:
+            conn.close()
+
+def verify_catalog(cur, catalog_id: int, catalog_code: str, expected: int):
+    """Print member and apartado counts for a freshly loaded catalog"""
+    print("\n📊 Verification:")
+    cur.execute("SELECT COUNT(*) FROM members WHERE catalog_id = %s", (catalog_id,))
+    count = cur.fetchone()[0]
+    print(f"   Total members in DB: {count:,}")
+    print(f"   Expected from CSV: {expected:,}")
+    
+    if count == expected:
+        print("   ✅ Counts match perfectly!")
+    else:
+        diff = abs(count - expected)
+        print(f"   ⚠️  Mismatch: {diff:,} difference (duplicate unique names skipped)")
+    
+    # Count apartados
+    cur.execute("""
+        SELECT COUNT(*) 
+        FROM v_members_full
+        WHERE catalog_code = %s AND level_name = 'Apartado'
+    """, (catalog_code,))
+    apartado_count = cur.fetchone()[0]
+    print(f"\n   🎯 Apartados found: {apartado_count:,}")
+
+def migrate_all(csv_paths: Dict[str, Path], workers: int = 4,
+                dry_run: bool = False, force: bool = False, replace: bool = False) -> List[Dict]:
+    """
+    Migrate several catalogs concurrently over a bounded connection pool
+    
+    Each catalog runs in its own transaction on its own pooled connection;
+    a failure only rolls back that catalog.
+    """
+    workers = max(1, min(workers, len(csv_paths)))
+    print(f"\n🚀 Migrating {len(csv_paths)} catalogs with {workers} connections\n")
+    
+    connection_pool = pool.ThreadedConnectionPool(1, workers, DATABASE_URL)
+    
+    def run(item):
+        catalog_code, csv_path = item
+        conn = connection_pool.getconn()
+        try:
+            return migrate_catalog(csv_path, catalog_code, dry_run,
+                                   conn=conn, force=force, verbose=False, replace=replace)
+        finally:
+            connection_pool.putconn(conn)
+    
+    results = []
+    started = time.perf_counter()
+    try:
+        if not dry_run:
+            # Partitions up front, one short transaction each (see prepare_catalogs)
+            conn = connection_pool.getconn()
+            try:
+                prepare_catalogs(conn, list(csv_paths))
+            finally:
+                connection_pool.putconn(conn)
         
+        # Never more threads than pooled connections: getconn() does not block
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run, item) for item in csv_paths.items()]
+            with tqdm(total=len(futures), desc="   Catalogs", unit="cat") as progress:
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    progress.set_postfix_str(f"{result['catalog']} {result['status']}")
+                    progress.update(1)
+    finally:
+        connection_pool.closeall()
+    
+    print_report(results, time.perf_counter() - started)
+    return results
+
+def print_report(results: List[Dict], elapsed: float):
+    """Aggregate report: status counts and overall rows per second"""
+    by_status = {}
+    for result in results:
+        by_status.setdefault(result['status'], []).append(result)
+    
+    total_rows = sum(r['rows'] for r in results)
+    print(f"\n{'='*60}")
+    print("📊 Migration report")
+    print(f"{'='*60}")
+    for status in ('loaded', 'skipped', 'dry-run', 'failed'):
+        if status in by_status:
+            print(f"   {status:<8} {len(by_status[status]):>4} catalogs")
+    print(f"   Rows loaded: {total_rows:,} in {elapsed:.1f}s "
+          f"({total_rows / elapsed if elapsed else 0:,.0f} rows/s)")
+    
+    for result in sorted(by_status.get('loaded', []), key=lambda r: -r['rows']):
+        rate = result['rows'] / result['seconds'] if result['seconds'] else 0
+        print(f"   ✅ {result['catalog']:<30} {result['rows']:>10,} rows {result['seconds']:>7.1f}s {rate:>10,.0f} rows/s")
+    for result in by_status.get('failed', []):
+        print(f"   ❌ {result['catalog']:<30} {result['error']}")
+
+def refresh_member_view():
+    """
+    Refresh mv_members_full without blocking readers
+    
+    Run once per invocation (not per catalog): CONCURRENTLY diffs the whole
+    view against its unique index, so batching catalogs is much cheaper.
+    """
+    print("\n🔄 Refreshing mv_members_full...")
+    started = time.perf_counter()
+    try:
+        conn = psycopg2.connect(DATABASE_URL)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_members_full")
+        finally:
+            conn.close()
+        print(f"   ✅ Refreshed in {time.perf_counter() - started:.1f}s")
         return True
-        
     except Exception as e:
-        print(f"\n❌ Migration failed: {e}")
-        import traceback
-        traceback.print_exc()
-        conn.rollback()
+        print(f"   ❌ Refresh failed: {e}")
         return False
-    finally:
-        conn.close()
 
 def main():
     parser = argparse.ArgumentParser(description='Migrate OLAP CSV to PostgreSQL')
-    parser.add_argument('--csv', required=True, help='Path to CSV file')
-    parser.add_argument('--catalog', help='Catalog code (default: extracted from filename)')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', help='Path to CSV file')
+    source.add_argument('--dir', help='Migrate every *_miembros_completos*.csv in this directory')
+    source.add_argument('--all', action='store_true', help='Same as --dir . (where the scanner writes the CSVs)')
+    parser.add_argument('--catalog', help='Catalog code (default: extracted from filename; --csv only)')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('MIGRATION_WORKERS', '4')),
+                        help='Concurrent catalogs / pooled connections (default: 4)')
+    parser.add_argument('--force', action='store_true', help='Reload catalogs even if their CSV hash is unchanged')
+    parser.add_argument('--replace', action='store_true',
+                        help='Reload into a fresh table and swap the catalog partition (instead of syncing)')
+    parser.add_argument('--no-refresh', action='store_true', help='Skip refreshing mv_members_full after loading')
     parser.add_argument('--dry-run', action='store_true', help='Validate without inserting')
     
     args = parser.parse_args()
     
-    csv_path = Path(args.csv)
-    if not csv_path.exists():
-        print(f"❌ File not found: {csv_path}")
-        sys.exit(1)
+    if args.csv:
+        csv_path = Path(args.csv)
+        if not csv_path.exists():
+            print(f"❌ File not found: {csv_path}")
+            sys.exit(1)
+        
+        catalog_code = args.catalog or catalog_code_from_path(csv_path)
+        
+        result = migrate_catalog(csv_path, catalog_code, args.dry_run, force=args.force, replace=args.replace)
+        results = [result]
+    else:
+        directory = Path(args.dir or '.')
+        csv_paths = discover_csvs(directory)
+        if not csv_paths:
+            print(f"❌ No *_miembros_completos*.csv files found in {directory.resolve()}")
+            sys.exit(1)
+        
+        results = migrate_all(csv_paths, args.workers, args.dry_run, args.force, args.replace)
     
-    catalog_code = args.catalog or csv_path.stem.replace('_miembros_completos', '')
+    refreshed = True
+    if not args.no_refresh and any(r['status'] == 'loaded' for r in results):
+        refreshed = refresh_member_view()
     
-    success = migrate_catalog(csv_path, catalog_code, args.dry_run)
-    sys.exit(0 if success else 1)
+    sys.exit(0 if refreshed and all(r['status'] != 'failed' for r in results) else 1)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,6 @@
+-- OLAP XTRCTR - Catalog load state
+-- Description: Content hash of the CSV each catalog was last loaded from,
+-- so migrate_csv_to_db.py --dir/--all can resume by skipping unchanged catalogs
+
+ALTER TABLE catalogs ADD COLUMN IF NOT EXISTS source_hash VARCHAR(64);
+ALTER TABLE catalogs ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMPTZ;
@@ -0,0 +1,6 @@
+-- OLAP XTRCTR - Per-hierarchy content hash
+-- Description: Order-independent hash of each hierarchy's member set, so
+-- re-running migrate_csv_to_db.py only diffs the hierarchies that changed
+
+ALTER TABLE hierarchies ADD COLUMN IF NOT EXISTS content_hash VARCHAR(40);
+ALTER TABLE hierarchies ADD COLUMN IF NOT EXISTS member_count INT;
@@ -0,0 +1,117 @@
+-- OLAP XTRCTR - Members partitioned by catalog
+-- Description: members becomes LIST-partitioned by a denormalized catalog_id.
+--   * unique_name is unique per catalog, not globally: the same member
+--     (e.g. [DIM TIEMPO].[Año].&[2020]) exists in many catalogs
+--   * per-catalog reads prune to a single partition
+--   * a catalog can be reloaded by loading a new table and swapping partitions
+-- Partitions are named members_c<catalog_id> and created with
+-- ensure_members_partition(catalog_id) before loading a catalog.
+
+BEGIN;
+
+DROP VIEW IF EXISTS v_members_full;
+
+ALTER TABLE members RENAME TO members_unpartitioned;
+ALTER SEQUENCE members_id_seq OWNED BY NONE;
+
+-- Free constraint/index names for the partitioned table (the old table is
+-- dropped once its rows are copied)
+ALTER TABLE members_unpartitioned DROP CONSTRAINT members_pkey;
+ALTER TABLE members_unpartitioned DROP CONSTRAINT members_unique_name_key;
+DROP INDEX idx_members_level, idx_members_parent, idx_members_caption,
+           idx_members_unique, idx_members_search;
+
+-- ============================================================================
+-- TABLE: members (partitioned)
+-- ============================================================================
+CREATE TABLE members (
+  id INT NOT NULL DEFAULT nextval('members_id_seq'),
+  catalog_id INT NOT NULL REFERENCES catalogs(id) ON DELETE CASCADE,
+  level_id INT REFERENCES levels(id) ON DELETE CASCADE,
+  caption VARCHAR(500) NOT NULL,
+  unique_name VARCHAR(500) NOT NULL,
+  parent_unique_name VARCHAR(500),
+  children_cardinality INT DEFAULT 0,
+  ordinal INT,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (catalog_id, id),
+  UNIQUE (catalog_id, unique_name)
+) PARTITION BY LIST (catalog_id);
+
+ALTER SEQUENCE members_id_seq OWNED BY members.id;
+
+-- Indexes are created on every partition automatically
+CREATE INDEX idx_members_level ON members(level_id);
+CREATE INDEX idx_members_parent ON members(catalog_id, parent_unique_name);
+CREATE INDEX idx_members_caption ON members(catalog_id, caption);
+
+-- Full-text search index for Spanish text
+CREATE INDEX idx_members_search ON members
+USING GIN(to_tsvector('spanish', caption));
+
+-- ============================================================================
+-- FUNCTION: ensure_members_partition
+-- Description: Create the catalog's partition if it does not exist yet
+-- Usage: SELECT ensure_members_partition(42);
+-- ============================================================================
+CREATE OR REPLACE FUNCTION ensure_members_partition(p_catalog_id INT)
+RETURNS TEXT AS $$
+DECLARE
+  partition_name TEXT := 'members_c' || p_catalog_id;
+BEGIN
+  IF to_regclass(partition_name) IS NULL THEN
+    EXECUTE format(
+      'CREATE TABLE %I PARTITION OF members FOR VALUES IN (%s)',
+      partition_name, p_catalog_id
+    );
+  END IF;
+  RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- DATA: move existing members into their catalog's partition
+-- ============================================================================
+SELECT ensure_members_partition(id) FROM catalogs;
+
+INSERT INTO members (id, catalog_id, level_id, caption, unique_name, parent_unique_name,
+                     children_cardinality, ordinal, created_at)
+SELECT m.id, d.catalog_id, m.level_id, m.caption, m.unique_name, m.parent_unique_name,
+       m.children_cardinality, m.ordinal, m.created_at
+FROM members_unpartitioned m
+JOIN levels l ON m.level_id = l.id
+JOIN hierarchies h ON l.hierarchy_id = h.id
+JOIN dimensions d ON h.dimension_id = d.id;
+
+DROP TABLE members_unpartitioned;
+
+-- ============================================================================
+-- VIEW: v_members_full
+-- Description: Denormalized view; catalog comes straight from members.catalog_id
+-- Usage: SELECT * FROM v_members_full WHERE catalog_code = 'SIS_2025' AND level_name = 'Apartado'
+-- ============================================================================
+CREATE VIEW v_members_full AS
+SELECT
+  m.id,
+  c.code as catalog_code,
+  c.name as catalog_name,
+  c.year as catalog_year,
+  d.code as dimension_code,
+  d.name as dimension_name,
+  h.code as hierarchy_code,
+  h.name as hierarchy_name,
+  l.name as level_name,
+  l.number as level_number,
+  m.caption,
+  m.unique_name,
+  m.parent_unique_name,
+  m.children_cardinality,
+  m.ordinal,
+  m.catalog_id
+FROM members m
+JOIN catalogs c ON m.catalog_id = c.id
+JOIN levels l ON m.level_id = l.id
+JOIN hierarchies h ON l.hierarchy_id = h.id
+JOIN dimensions d ON h.dimension_id = d.id;
+
+COMMIT;
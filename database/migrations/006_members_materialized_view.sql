@@ -0,0 +1,26 @@
+-- OLAP XTRCTR - Materialized member view
+-- Description: Denormalized copy of v_members_full with composite indexes, so
+-- the documented lookups (apartados/variables of a catalog, children of a
+-- parent) are single index scans instead of a five-table join.
+-- Refreshed by migrate_csv_to_db.py after each run:
+--   REFRESH MATERIALIZED VIEW CONCURRENTLY mv_members_full;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_members_full AS
+SELECT * FROM v_members_full
+WITH DATA;
+
+-- Required by REFRESH ... CONCURRENTLY (unique names are unique per catalog)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_members_key
+  ON mv_members_full (catalog_code, unique_name);
+
+-- WHERE catalog_code = ... AND level_name = 'Apartado' ORDER BY caption
+CREATE INDEX IF NOT EXISTS idx_mv_members_level_caption
+  ON mv_members_full (catalog_code, level_name, caption);
+
+-- WHERE catalog_code = ... AND parent_unique_name = ... ORDER BY level_number, caption
+CREATE INDEX IF NOT EXISTS idx_mv_members_parent
+  ON mv_members_full (catalog_code, parent_unique_name, level_number, caption);
+
+-- WHERE catalog_code = ... ORDER BY level_number, caption
+CREATE INDEX IF NOT EXISTS idx_mv_members_catalog
+  ON mv_members_full (catalog_code, level_number, caption);
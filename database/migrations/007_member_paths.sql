@@ -0,0 +1,122 @@
+-- OLAP XTRCTR - Materialized hierarchy paths (ltree)
+-- Description: Each member stores its root-to-member path as an ltree of
+-- member ids (e.g. '101.2050.2051'), so ancestor/descendant lookups are a
+-- single GiST-indexed predicate instead of recursive CTEs:
+--   descendants:  WHERE path <@ ancestor.path
+--   ancestors:    WHERE path @> member.path
+-- Paths are rebuilt per catalog by migrate_csv_to_db.py via rebuild_member_paths().
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS ltree;
+
+ALTER TABLE members ADD COLUMN IF NOT EXISTS path ltree;
+
+CREATE INDEX IF NOT EXISTS idx_members_path_gist ON members USING GIST (path);
+
+-- ============================================================================
+-- FUNCTION: rebuild_member_paths
+-- Description: Recompute path for every member of a catalog from
+-- parent_unique_name. Members whose parent is not in the catalog are roots.
+-- Only rows whose path changed are written. p_table defaults to members;
+-- migrate_csv_to_db.py --replace passes the standalone load table so paths
+-- are built before the partition swap.
+-- Usage: SELECT rebuild_member_paths(42);
+-- ============================================================================
+DROP FUNCTION IF EXISTS rebuild_member_paths(INT);
+
+CREATE OR REPLACE FUNCTION rebuild_member_paths(p_catalog_id INT, p_table REGCLASS DEFAULT 'members')
+RETURNS INT AS $$
+DECLARE
+  updated INT;
+BEGIN
+  EXECUTE format($sql$
+    WITH RECURSIVE tree AS (
+      SELECT m.id, m.unique_name, text2ltree(m.id::text) AS path
+      FROM %1$s m
+      WHERE m.catalog_id = $1
+        AND NOT EXISTS (
+          SELECT 1 FROM %1$s p
+          WHERE p.catalog_id = $1 AND p.unique_name = m.parent_unique_name
+        )
+      UNION ALL
+      SELECT c.id, c.unique_name, t.path || c.id::text
+      FROM tree t
+      JOIN %1$s c ON c.catalog_id = $1 AND c.parent_unique_name = t.unique_name
+      WHERE nlevel(t.path) < 64  -- guard against malformed (cyclic) parents
+    )
+    UPDATE %1$s m
+    SET path = tree.path
+    FROM tree
+    WHERE m.catalog_id = $1
+      AND m.id = tree.id
+      AND m.path IS DISTINCT FROM tree.path
+  $sql$, p_table) USING p_catalog_id;
+
+  GET DIAGNOSTICS updated = ROW_COUNT;
+  RETURN updated;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_member_paths(id) FROM catalogs;
+
+-- ============================================================================
+-- VIEWS: expose path in v_members_full and mv_members_full
+-- ============================================================================
+DROP MATERIALIZED VIEW IF EXISTS mv_members_full;
+
+CREATE OR REPLACE VIEW v_members_full AS
+SELECT
+  m.id,
+  c.code as catalog_code,
+  c.name as catalog_name,
+  c.year as catalog_year,
+  d.code as dimension_code,
+  d.name as dimension_name,
+  h.code as hierarchy_code,
+  h.name as hierarchy_name,
+  l.name as level_name,
+  l.number as level_number,
+  m.caption,
+  m.unique_name,
+  m.parent_unique_name,
+  m.children_cardinality,
+  m.ordinal,
+  m.catalog_id,
+  m.path
+FROM members m
+JOIN catalogs c ON m.catalog_id = c.id
+JOIN levels l ON m.level_id = l.id
+JOIN hierarchies h ON l.hierarchy_id = h.id
+JOIN dimensions d ON h.dimension_id = d.id;
+
+CREATE MATERIALIZED VIEW mv_members_full AS
+SELECT * FROM v_members_full
+WITH DATA;
+
+CREATE UNIQUE INDEX idx_mv_members_key
+  ON mv_members_full (catalog_code, unique_name);
+CREATE INDEX idx_mv_members_level_caption
+  ON mv_members_full (catalog_code, level_name, caption);
+CREATE INDEX idx_mv_members_parent
+  ON mv_members_full (catalog_code, parent_unique_name, level_number, caption);
+CREATE INDEX idx_mv_members_catalog
+  ON mv_members_full (catalog_code, level_number, caption);
+
+-- WHERE path <@ (ancestor paths) -- subtree of one or many members
+CREATE INDEX idx_mv_members_path
+  ON mv_members_full USING GIST (path);
+
+COMMIT;
+
+-- ============================================================================
+-- SAMPLE QUERIES
+-- ============================================================================
+
+-- All variables under a set of apartados, in one indexed statement
+-- SELECT d.caption, d.unique_name, a.caption AS apartado
+-- FROM mv_members_full a
+-- JOIN mv_members_full d ON d.path <@ a.path AND d.id <> a.id
+-- WHERE a.catalog_code = 'SIS_2025'
+--   AND a.unique_name = ANY(ARRAY['[DIM VARIABLES].[Apartado y Variable].&[1]', '...'])
+--   AND d.level_name = 'Variable';
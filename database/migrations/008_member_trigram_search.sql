@@ -0,0 +1,138 @@
+-- OLAP XTRCTR - Typo-tolerant, accent-insensitive member search
+-- Description: caption_search = lower(unaccent(caption)) with trigram GIN
+-- indexes (pg_trgm, enabled in 001), and search_members() ranking exact and
+-- prefix matches first, then word similarity, scoped by catalog, level and
+-- optionally hierarchy.
+-- Usage: SELECT * FROM search_members('SIS_2025', 'vacunacion', 'Variable', 50);
+--        SELECT * FROM search_members('SIS_2025', 'vacunacion', NULL, 50,
+--                                     '[DIM VARIABLES].[Apartado y Variable]');
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+-- unaccent() is only STABLE; the explicit dictionary makes it safe to index
+CREATE OR REPLACE FUNCTION f_unaccent(TEXT)
+RETURNS TEXT AS $$
+  SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+-- Escape LIKE wildcards in user input
+CREATE OR REPLACE FUNCTION f_like_escape(TEXT)
+RETURNS TEXT AS $$
+  SELECT replace(replace(replace($1, '\', '\\'), '%', '\%'), '_', '\_')
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+ALTER TABLE members ADD COLUMN IF NOT EXISTS caption_search TEXT
+  GENERATED ALWAYS AS (lower(f_unaccent(caption))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_members_caption_trgm
+  ON members USING GIN (caption_search gin_trgm_ops);
+
+-- ============================================================================
+-- VIEWS: expose caption_search in v_members_full and mv_members_full
+-- ============================================================================
+DROP MATERIALIZED VIEW IF EXISTS mv_members_full;
+
+CREATE OR REPLACE VIEW v_members_full AS
+SELECT
+  m.id,
+  c.code as catalog_code,
+  c.name as catalog_name,
+  c.year as catalog_year,
+  d.code as dimension_code,
+  d.name as dimension_name,
+  h.code as hierarchy_code,
+  h.name as hierarchy_name,
+  l.name as level_name,
+  l.number as level_number,
+  m.caption,
+  m.unique_name,
+  m.parent_unique_name,
+  m.children_cardinality,
+  m.ordinal,
+  m.catalog_id,
+  m.path,
+  m.caption_search
+FROM members m
+JOIN catalogs c ON m.catalog_id = c.id
+JOIN levels l ON m.level_id = l.id
+JOIN hierarchies h ON l.hierarchy_id = h.id
+JOIN dimensions d ON h.dimension_id = d.id;
+
+CREATE MATERIALIZED VIEW mv_members_full AS
+SELECT * FROM v_members_full
+WITH DATA;
+
+CREATE UNIQUE INDEX idx_mv_members_key
+  ON mv_members_full (catalog_code, unique_name);
+CREATE INDEX idx_mv_members_level_caption
+  ON mv_members_full (catalog_code, level_name, caption);
+CREATE INDEX idx_mv_members_parent
+  ON mv_members_full (catalog_code, parent_unique_name, level_number, caption);
+CREATE INDEX idx_mv_members_catalog
+  ON mv_members_full (catalog_code, level_number, caption);
+CREATE INDEX idx_mv_members_path
+  ON mv_members_full USING GIST (path);
+
+-- catalog_code (btree_gin) + trigrams: one index scan per scoped search
+CREATE INDEX idx_mv_members_search
+  ON mv_members_full USING GIN (catalog_code, caption_search gin_trgm_ops);
+
+-- ============================================================================
+-- FUNCTION: search_members
+-- Description: Substring (LIKE) or fuzzy (word similarity) matches on the
+-- unaccented, lower-cased caption, optionally scoped to a level and/or a
+-- hierarchy. Ranking: exact match, then prefix match, then word_similarity,
+-- then shorter captions. Both predicates are served by idx_mv_members_search.
+-- Shared by the Workers /search route and backend/pg_metadata.py so both
+-- rank the same query the same way.
+-- ============================================================================
+DROP FUNCTION IF EXISTS search_members(TEXT, TEXT, TEXT, INT);
+
+CREATE OR REPLACE FUNCTION search_members(
+  p_catalog_code TEXT,
+  p_query TEXT,
+  p_level TEXT DEFAULT NULL,
+  p_limit INT DEFAULT 50,
+  p_hierarchy TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+  caption VARCHAR,
+  unique_name VARCHAR,
+  hierarchy_code VARCHAR,
+  level_name VARCHAR,
+  level_number INT,
+  parent_unique_name VARCHAR,
+  children_cardinality INT,
+  score REAL
+) AS $$
+  SELECT
+    m.caption,
+    m.unique_name,
+    m.hierarchy_code,
+    m.level_name,
+    m.level_number,
+    m.parent_unique_name,
+    m.children_cardinality,
+    word_similarity(lower(f_unaccent(p_query)), m.caption_search) AS score
+  FROM mv_members_full m
+  WHERE m.catalog_code = p_catalog_code
+    AND (p_level IS NULL OR m.level_name = p_level)
+    AND (p_hierarchy IS NULL OR m.hierarchy_code = p_hierarchy)
+    AND (
+      m.caption_search LIKE '%' || f_like_escape(lower(f_unaccent(p_query))) || '%'
+      OR lower(f_unaccent(p_query)) <% m.caption_search
+    )
+  ORDER BY
+    m.caption_search = lower(f_unaccent(p_query)) DESC,
+    m.caption_search LIKE f_like_escape(lower(f_unaccent(p_query))) || '%' DESC,
+    word_similarity(lower(f_unaccent(p_query)), m.caption_search) DESC,
+    length(m.caption),
+    m.caption
+  LIMIT p_limit
+$$ LANGUAGE sql STABLE;
+
+COMMIT;
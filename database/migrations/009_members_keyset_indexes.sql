@@ -0,0 +1,12 @@
+-- OLAP XTRCTR - Keyset pagination indexes for the backend metadata provider
+-- Description: backend/pg_metadata.py pages the members of one level with
+--   WHERE catalog_code = $1 AND hierarchy_code = $2 AND level_name = $3
+--     AND (ordinal, unique_name) > ($4, $5)
+--   ORDER BY ordinal, unique_name
+-- (or by caption_search). These indexes make every page an index range scan.
+
+CREATE INDEX IF NOT EXISTS idx_mv_members_level_ordinal
+  ON mv_members_full (catalog_code, hierarchy_code, level_name, ordinal, unique_name);
+
+CREATE INDEX IF NOT EXISTS idx_mv_members_level_search
+  ON mv_members_full (catalog_code, hierarchy_code, level_name, caption_search, unique_name);
@@ -0,0 +1,23 @@
+-- OLAP XTRCTR - Job queue columns for the long-running db_runner worker
+-- Description: `python backend/db_runner.py --worker` claims PENDING jobs with
+--   SELECT ... FOR UPDATE SKIP LOCKED
+-- so any number of workers can poll the same table without double-running a
+-- job. Claimed jobs are heartbeated while RUNNING; jobs whose heartbeat goes
+-- stale (worker crashed or was killed) are requeued, or FAILED after
+-- max attempts.
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(100);
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0;
+
+-- Claim: oldest PENDING job first
+CREATE INDEX IF NOT EXISTS idx_jobs_pending
+  ON jobs (created_at)
+  WHERE status = 'PENDING';
+
+-- Requeue: RUNNING jobs with a stale heartbeat (updated_at for rows set
+-- RUNNING before this migration, which have none)
+CREATE INDEX IF NOT EXISTS idx_jobs_running_heartbeat
+  ON jobs ((coalesce(heartbeat_at, updated_at)))
+  WHERE status = 'RUNNING';
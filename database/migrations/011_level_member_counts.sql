@@ -0,0 +1,17 @@
+-- OLAP XTRCTR - Per-level member counts maintained at load time
+-- Description: backend/pg_metadata.py reports the member count of every level
+-- in get_dimensions. Counting the catalog's members partition on each request
+-- is a full scan of up to ~1.7M rows, so database/migrate_csv_to_db.py stores
+-- the count in levels.member_count after every load/sync instead.
+
+ALTER TABLE levels ADD COLUMN IF NOT EXISTS member_count INT NOT NULL DEFAULT 0;
+
+-- Backfill catalogs loaded before this migration
+UPDATE levels l
+SET member_count = counts.members
+FROM (
+  SELECT level_id, count(*) AS members
+  FROM members
+  GROUP BY level_id
+) counts
+WHERE counts.level_id = l.id;
@@ -62,7 +62,7 @@ except ImportError:
 
 # Validators (local module)
 try:
-    from validators import validate_selection, sanitize_search
+    from validators import validate_selection, sanitize_search, normalize_search
     VALIDATORS_AVAILABLE = True
 except ImportError:
     # Fallback: no validation
@@ -71,6 +71,8 @@ except ImportError:
         return True, list(map(int, inp.replace(' ','').replace('-',',').split(','))), ""
     def sanitize_search(text):
         return True, text, ""
+    def normalize_search(text):
+        return text.upper() if isinstance(text, str) else ""
 
 
 # ============================================================================
@@ -707,6 +709,12 @@ class MDXQueryTool:
         # Cargar CSV (ahora garantizado que existe)
         try:
             df = pd.read_csv(csv_path)
+            # Caption normalizado una sola vez (búsqueda sin acentos en el builder)
+            if 'MIEMBRO_CAPTION' in df.columns:
+                uniques = df['MIEMBRO_CAPTION'].dropna().unique()
+                df['MIEMBRO_CAPTION_NORM'] = df['MIEMBRO_CAPTION'].map(
+                    {v: normalize_search(v) for v in uniques}
+                ).fillna('')
             self.logger.info(f"   [OK] Cargados {len(df)} miembros del archivo {csv_filename}")
             return df
         except Exception as e:
@@ -986,10 +994,10 @@ class MDXQueryTool:
         apartados = apartados.sort_values('MIEMBRO_CAPTION')
         
         print(f"\n{Fore.YELLOW}╔═══ PASO 2: APARTADO ({len(apartados)} disponibles) ═══╗{Style.RESET_ALL}")
-        filtro = safe_input(f"{Fore.CYAN}>> Buscar (Enter=todos):{Style.RESET_ALL} ").strip().upper()
+        filtro = normalize_search(safe_input(f"{Fore.CYAN}>> Buscar (Enter=todos):{Style.RESET_ALL} ").strip())
         
         if filtro:
-            apartados_filtered = apartados[apartados['MIEMBRO_CAPTION'].str.upper().str.contains(filtro, na=False)]
+            apartados_filtered = apartados[apartados['MIEMBRO_CAPTION_NORM'].str.contains(filtro, regex=False, na=False)]
         else:
             apartados_filtered = apartados
         
@@ -1056,10 +1064,10 @@ class MDXQueryTool:
             print(f"{Fore.YELLOW}[!] Usando apartados completos (sin variables hijas){Style.RESET_ALL}")
         else:
             print(f"\n{Fore.YELLOW}╔═══ PASO 3: VARIABLE ({len(all_variables)} disponibles de {len(selected_apartados)} apartado(s)) ═══╗{Style.RESET_ALL}")
-            filtro_var = safe_input(f"{Fore.CYAN}>> Buscar (Enter=todas):{Style.RESET_ALL} ").strip().upper()
+            filtro_var = normalize_search(safe_input(f"{Fore.CYAN}>> Buscar (Enter=todas):{Style.RESET_ALL} ").strip())
             
             if filtro_var:
-                variables_filtered = all_variables[all_variables['MIEMBRO_CAPTION'].str.upper().str.contains(filtro_var, na=False)]
+                variables_filtered = all_variables[all_variables['MIEMBRO_CAPTION_NORM'].str.contains(filtro_var, regex=False, na=False)]
             else:
                 variables_filtered = all_variables
             
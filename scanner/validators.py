@@ -4,6 +4,7 @@ Provides validation and sanitization for user inputs
 """
 
 import re
+import unicodedata
 from typing import Tuple, List
 
 
@@ -69,3 +70,20 @@ def sanitize_search(text: str) -> Tuple[bool, str, str]:
     sanitized = re.sub(r'[^\w\s\-_áéíóúñÁÉÍÓÚÑ]', '', sanitized)
     
     return True, sanitized, ""
+
+
+def normalize_search(text: str) -> str:
+    """
+    Normalize text for accent/case-insensitive matching
+    ("Vacunación" -> "vacunacion")
+    
+    Args:
+        text: Raw text
+    
+    Returns:
+        Casefolded text without diacritics
+    """
+    if not isinstance(text, str):
+        return ""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
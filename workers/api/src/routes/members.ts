@@ -30,7 +30,7 @@ app.get('/:catalog', async (c) => {
           level_name,
           children_cardinality,
           parent_unique_name
-        FROM v_members_full
+        FROM mv_members_full
         WHERE catalog_code = ${catalog} 
           AND level_name = ${nivel}
           AND parent_unique_name = ${parent}
@@ -47,7 +47,7 @@ app.get('/:catalog', async (c) => {
           level_name,
           children_cardinality,
           parent_unique_name
-        FROM v_members_full
+        FROM mv_members_full
         WHERE catalog_code = ${catalog} 
           AND level_name = ${nivel}
         ORDER BY caption
@@ -64,7 +64,7 @@ app.get('/:catalog', async (c) => {
           level_number,
           children_cardinality,
           parent_unique_name
-        FROM v_members_full
+        FROM mv_members_full
         WHERE catalog_code = ${catalog}
           AND parent_unique_name = ${parent}
         ORDER BY level_number, caption
@@ -81,7 +81,7 @@ app.get('/:catalog', async (c) => {
           level_number,
           children_cardinality,
           parent_unique_name
-        FROM v_members_full
+        FROM mv_members_full
         WHERE catalog_code = ${catalog}
         ORDER BY level_number, caption
         LIMIT ${limit}
@@ -93,24 +93,24 @@ app.get('/:catalog', async (c) => {
     const countResult = nivel && parent
       ? await sql`
           SELECT COUNT(*) as total
-          FROM v_members_full
+          FROM mv_members_full
           WHERE catalog_code = ${catalog} AND level_name = ${nivel} AND parent_unique_name = ${parent}
         `
       : nivel
         ? await sql`
           SELECT COUNT(*) as total
-          FROM v_members_full
+          FROM mv_members_full
           WHERE catalog_code = ${catalog} AND level_name = ${nivel}
         `
         : parent
           ? await sql`
           SELECT COUNT(*) as total
-          FROM v_members_full
+          FROM mv_members_full
           WHERE catalog_code = ${catalog} AND parent_unique_name = ${parent}
         `
           : await sql`
           SELECT COUNT(*) as total
-          FROM v_members_full
+          FROM mv_members_full
           WHERE catalog_code = ${catalog}
         `;
 
@@ -136,4 +136,97 @@ app.get('/:catalog', async (c) => {
   }
 });
 
+// GET /api/members/:catalog/search?q=vacunacion&nivel=Variable&jerarquia=...&limit=50
+// Accent-insensitive, typo-tolerant search ranked by similarity (search_members in 008,
+// shared with the backend's PostgreSQL provider)
+app.get('/:catalog/search', async (c) => {
+  try {
+    const catalog = c.req.param('catalog');
+    const q = (c.req.query('q') || '').trim();
+    const nivel = c.req.query('nivel') || null;
+    const jerarquia = c.req.query('jerarquia') || null;
+    const limit = Math.min(parseInt(c.req.query('limit') || '50', 10), 500);
+
+    if (q.length < 2) {
+      return c.json({ error: 'Query must have at least 2 characters' }, 400);
+    }
+
+    const sql = neon(c.env.DATABASE_URL);
+
+    const members = await sql`
+      SELECT * FROM search_members(${catalog}, ${q}, ${nivel}, ${limit}, ${jerarquia})
+    `;
+
+    return c.json({
+      catalog,
+      q,
+      nivel: nivel || 'all',
+      members,
+      count: members.length,
+      limit,
+      timestamp: new Date().toISOString()
+    });
+  } catch (error) {
+    console.error('Error searching members:', error);
+    return c.json({
+      error: 'Failed to search members',
+      message: error instanceof Error ? error.message : 'Unknown error'
+    }, 500);
+  }
+});
+
+// GET /api/members/:catalog/descendants?parent=...&parent=...&nivel=Variable
+// Whole subtree of one or many members in a single statement (ltree path <@ ancestor path)
+app.get('/:catalog/descendants', async (c) => {
+  try {
+    const catalog = c.req.param('catalog');
+    const parents = c.req.queries('parent') || [];
+    const nivel = c.req.query('nivel') || null;
+    const limit = Math.min(parseInt(c.req.query('limit') || '10000', 10), 50000);
+
+    if (parents.length === 0) {
+      return c.json({ error: 'At least one parent is required' }, 400);
+    }
+
+    const sql = neon(c.env.DATABASE_URL);
+
+    const members = await sql`
+      SELECT
+        d.caption,
+        d.unique_name,
+        d.level_name,
+        d.level_number,
+        d.children_cardinality,
+        d.parent_unique_name,
+        a.unique_name AS ancestor_unique_name
+      FROM mv_members_full a
+      JOIN mv_members_full d
+        ON d.path <@ a.path
+       AND d.catalog_code = a.catalog_code
+       AND d.id <> a.id
+      WHERE a.catalog_code = ${catalog}
+        AND a.unique_name = ANY(${parents})
+        AND (${nivel}::text IS NULL OR d.level_name = ${nivel})
+      ORDER BY d.path
+      LIMIT ${limit}
+    `;
+
+    return c.json({
+      catalog,
+      parents,
+      nivel: nivel || 'all',
+      members,
+      count: members.length,
+      limit,
+      timestamp: new Date().toISOString()
+    });
+  } catch (error) {
+    console.error('Error fetching descendants:', error);
+    return c.json({
+      error: 'Failed to fetch descendants',
+      message: error instanceof Error ? error.message : 'Unknown error'
+    }, 500);
+  }
+});
+
 export default app;